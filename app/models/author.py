@@ -1,9 +1,10 @@
 """author.py model."""
 
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 from app.models.base import Base
 from app.models.material import DBMaterial
+from shared.utils.identifiers import fold_key
 
 
 class DBAuthor(Base):
@@ -13,5 +14,13 @@ class DBAuthor(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(nullable=False, unique=True, index=True)
+    # Collation key, kept in sync with name
+    name_key: Mapped[str | None] = mapped_column(nullable=True, index=True)
 
     materials: Mapped[list[DBMaterial]] = relationship(back_populates="author")
+
+    @validates("name")
+    def _validate_name(self, key: str, name: str) -> str:
+        """Keep the name collation key in sync."""
+        self.name_key = fold_key(name) if name else None
+        return name
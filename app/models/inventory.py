@@ -1,6 +1,6 @@
 """Inventory.py."""
 
-from sqlalchemy import ForeignKey, UniqueConstraint
+from sqlalchemy import ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base
@@ -14,7 +14,7 @@ class DBInventory(Base):
     __tablename__ = "inventory"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    stock: Mapped[int] = mapped_column(nullable=False, default=0)
+    stock: Mapped[int] = mapped_column(nullable=False, default=0, index=True)
     material_id: Mapped[int] = mapped_column(ForeignKey("materials.id"))
     library_id: Mapped[int] = mapped_column(ForeignKey("libraries.id"))
 
@@ -23,4 +23,6 @@ class DBInventory(Base):
 
     __table_args__ = (
         UniqueConstraint("library_id", "material_id", name="unique_library_material"),
+        # Covering index: availability lookups never read the table
+        Index("ix_inventory_availability", "material_id", "stock", "library_id"),
     )
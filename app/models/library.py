@@ -2,10 +2,12 @@
 
 from typing import TYPE_CHECKING
 
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 from app.models.base import Base
 from app.models.library_users import DBLibraryUser
+from config.settings import settings
+from shared.utils.geo import grid_cell
 
 if TYPE_CHECKING:
     from app.models.user import DBUser
@@ -21,7 +23,24 @@ class DBLibrary(Base):
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(nullable=False, unique=True, index=True)
     address: Mapped[str] = mapped_column(unique=True)
+    latitude: Mapped[float | None] = mapped_column(nullable=True, default=None)
+    longitude: Mapped[float | None] = mapped_column(nullable=True, default=None)
+
+    # Grid cell of the coordinates, kept in sync with latitude and longitude
+    grid_cell: Mapped[str | None] = mapped_column(nullable=True, index=True)
 
     users: Mapped[list[DBUser]] = relationship(
         secondary=DBLibraryUser.__table__, overlaps="libraries"
     )
+
+    @validates("latitude", "longitude")
+    def _validate_coordinates(self, key: str, value: float | None) -> float | None:
+        """Keep the grid cell in sync with the coordinates."""
+        latitude = value if key == "latitude" else self.latitude
+        longitude = value if key == "longitude" else self.longitude
+        self.grid_cell = (
+            grid_cell(latitude, longitude, settings.GEO_GRID_CELL_DEGREES)
+            if latitude is not None and longitude is not None
+            else None
+        )
+        return value
@@ -3,11 +3,12 @@
 from typing import TYPE_CHECKING
 
 from sqlalchemy import ForeignKey
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 from app.models.base import Base
 from app.models.section import DBSection
 from shared.utils.enums import MaterialType
+from shared.utils.identifiers import fold_key, normalize_isbn, normalize_issn
 
 if TYPE_CHECKING:
     from app.models.author import DBAuthor
@@ -21,16 +22,40 @@ class DBMaterial(Base):
     __tablename__ = "materials"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    type: Mapped[MaterialType]
+    type: Mapped[MaterialType] = mapped_column(index=True)
     title: Mapped[str] = mapped_column(nullable=False, index=True)
     cod_ref: Mapped[str] = mapped_column(nullable=False, unique=True, index=True)
-    price: Mapped[float] = mapped_column(nullable=False)
+    price: Mapped[float] = mapped_column(nullable=False, index=True)
     isbn: Mapped[str] = mapped_column(nullable=True, default=None)
     issn: Mapped[str] = mapped_column(nullable=True, default=None)
-    description: Mapped[str] = mapped_column(nullable=True, default=None)
+    # Up to several kilobytes, only loaded by reads that return it
+    description: Mapped[str] = mapped_column(nullable=True, default=None, deferred=True)
 
-    author_id: Mapped[int] = mapped_column(ForeignKey("authors.id"))
-    section_id: Mapped[int] = mapped_column(ForeignKey("sections.id"))
+    # Lookup keys, kept in sync with title, isbn and issn
+    title_key: Mapped[str | None] = mapped_column(nullable=True, index=True)
+    isbn_key: Mapped[str | None] = mapped_column(nullable=True, index=True)
+    issn_key: Mapped[str | None] = mapped_column(nullable=True, index=True)
+
+    author_id: Mapped[int] = mapped_column(ForeignKey("authors.id"), index=True)
+    section_id: Mapped[int] = mapped_column(ForeignKey("sections.id"), index=True)
 
     author: Mapped[DBAuthor] = relationship(back_populates="materials")
     section: Mapped[DBSection] = relationship()
+
+    @validates("title")
+    def _validate_title(self, key: str, title: str) -> str:
+        """Keep the title collation key in sync."""
+        self.title_key = fold_key(title) if title else None
+        return title
+
+    @validates("isbn")
+    def _validate_isbn(self, key: str, isbn: str | None) -> str | None:
+        """Keep the ISBN lookup key in sync."""
+        self.isbn_key = normalize_isbn(isbn) if isbn else None
+        return isbn
+
+    @validates("issn")
+    def _validate_issn(self, key: str, issn: str | None) -> str | None:
+        """Keep the ISSN lookup key in sync."""
+        self.issn_key = normalize_issn(issn) if issn else None
+        return issn
@@ -11,5 +11,5 @@ class DBSection(Base):
     __tablename__ = "sections"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    name: Mapped[str]
+    name: Mapped[str] = mapped_column(index=True)
     capacity: Mapped[int]
@@ -1,12 +1,13 @@
 """user.py model."""
 
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 from app.models.base import Base
 from app.models.library import DBLibrary
 from app.models.library_users import DBLibraryUser
 from app.models.role import DBRole
 from app.models.user_roles import DBUserRole
+from shared.utils.identifiers import fold_email, fold_key
 
 
 class DBUser(Base):
@@ -16,8 +17,12 @@ class DBUser(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     username: Mapped[str] = mapped_column(nullable=False, unique=True, index=True)
-    password: Mapped[str] = mapped_column(nullable=False)
+    # Only loaded to check credentials
+    password: Mapped[str] = mapped_column(nullable=False, deferred=True)
     email: Mapped[str] = mapped_column(nullable=False, unique=True, index=True)
+    # Collation keys, kept in sync with username and email
+    username_key: Mapped[str | None] = mapped_column(nullable=True, index=True)
+    email_key: Mapped[str | None] = mapped_column(nullable=True, index=True)
 
     libraries: Mapped[list[DBLibrary]] = relationship(
         secondary=DBLibraryUser.__table__, overlaps="users"
@@ -26,3 +31,15 @@ class DBUser(Base):
     roles: Mapped[list[DBRole]] = relationship(
         secondary=DBUserRole.__table__, overlaps="roles"
     )
+
+    @validates("username")
+    def _validate_username(self, key: str, username: str) -> str:
+        """Keep the username collation key in sync."""
+        self.username_key = fold_key(username) if username else None
+        return username
+
+    @validates("email")
+    def _validate_email(self, key: str, email: str) -> str:
+        """Keep the email lookup key in sync."""
+        self.email_key = fold_email(email) if email else None
+        return email
@@ -13,8 +13,11 @@ from app.services.auth_service import (
     create_auth_token,
     get_token_default_expire_time,
 )
-from app.services.user_service import db_read_user_roles_by_library
-from shared.utils.deps import CurrentUserDep, SessionDep
+from app.services.user_service import (
+    db_read_user_roles_by_library,
+    user_role_read_options,
+)
+from shared.utils.deps import CurrentUserDep, SessionDep, release_session
 
 router = APIRouter(tags=["Auth"])
 
@@ -25,10 +28,16 @@ router = APIRouter(tags=["Auth"])
 )
 async def login(
     session: SessionDep,
+    request: Request,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> TokenSchema:
     """Login to get an access token."""
-    user = authenticate_user(session, form_data.username, form_data.password)
+    user = authenticate_user(
+        session,
+        form_data.username,
+        form_data.password,
+        request.client.host if request.client else None,
+    )
     # Create access token
     access_token = create_auth_token(
         AccessTokenCreate(
@@ -58,14 +67,11 @@ async def read_users_me_with_role(
     session: SessionDep, current_user: CurrentUserDep, library_id: int
 ) -> list[UserRoleRead]:
     """Read current user roles."""
-    return [
-        UserRoleRead.model_validate(user_role)
-        for user_role in db_read_user_roles_by_library(
-            session,
-            current_user.id,
-            library_id,
-        )
-    ]
+    db_user_roles = db_read_user_roles_by_library(
+        session, current_user.id, library_id, user_role_read_options()
+    )
+    release_session(session)
+    return [UserRoleRead.model_validate(user_role) for user_role in db_user_roles]
 
 
 @router.post("/logout")
@@ -1,20 +1,33 @@
 """author_router.py."""
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Request, Response, status
 
 from app.schemas.author import (
     AuthorCreate,
     AuthorRead,
+    AuthorSuggestion,
     AuthorUpdate,
 )
 from app.services.author_service import (
+    author_fieldset,
     db_create_author,
     db_delete_author,
     db_read_author,
     db_read_authors,
     db_update_author,
 )
-from shared.utils.deps import CurrentUserDep, SessionDep
+from app.services.suggest_service import db_suggest_authors
+from shared.utils.cache import response_cache
+from shared.utils.deps import (
+    CommonParams,
+    CurrentUserDep,
+    SessionDep,
+    paginate_response_header,
+    release_session,
+)
+from shared.utils.fieldsets import FieldsParams, dump_fieldset
+from shared.utils.negotiation import MediaTypeDep, rows_response
+from shared.utils.serialization import json_response
 
 router = APIRouter(prefix="/author", tags=["Author"])
 
@@ -23,21 +36,50 @@ router = APIRouter(prefix="/author", tags=["Author"])
 # @authorize('author:create')
 async def create_author(session: SessionDep, author: AuthorCreate) -> AuthorRead:
     """Endpoint to create a new author."""
-    return AuthorRead.model_validate(db_create_author(session, author))
+    db_author = db_create_author(session, author)
+    release_session(session)
+    return AuthorRead.model_validate(db_author)
+
+
+@router.get("/suggest", status_code=status.HTTP_200_OK)
+async def suggest_authors(
+    session: SessionDep, prefix: str, limit: int = 10
+) -> list[AuthorSuggestion]:
+    """Endpoint to suggest authors whose name starts with a prefix."""
+    suggestions = db_suggest_authors(session, prefix, limit)
+    release_session(session)
+    return [AuthorSuggestion(id=match.id, name=match.label) for match in suggestions]
 
 
-@router.get("/{author_id}", status_code=status.HTTP_200_OK)
+@router.get("/{author_id}", status_code=status.HTTP_200_OK, response_model=AuthorRead)
 # @authorize('author:read')
-async def read_author(session: SessionDep, author_id: int) -> AuthorRead:
+async def read_author(
+    session: SessionDep, author_id: int, selection: FieldsParams
+) -> Response:
     """Endpoint to read an author."""
-    return AuthorRead.model_validate(db_read_author(session, author_id))
+    fieldset = author_fieldset(selection)
+    db_author = db_read_author(session, author_id, fieldset.options)
+    release_session(session)
+    return json_response(dump_fieldset(AuthorRead, db_author, fieldset))
 
 
-@router.get("/", status_code=status.HTTP_200_OK)
+@router.get("/", status_code=status.HTTP_200_OK, response_model=list[AuthorRead])
 # @authorize('author:read_all')
-async def read_authors(session: SessionDep) -> list[AuthorRead]:
-    """Endpoint to read all authors."""
-    return [AuthorRead.model_validate(author) for author in db_read_authors(session)]
+@response_cache.cached("authors")
+async def read_authors(
+    session: SessionDep,
+    request: Request,
+    response: Response,
+    commons: CommonParams,
+    selection: FieldsParams,
+    media_type: MediaTypeDep,
+) -> Response:
+    """Endpoint to read a page of authors."""
+    fieldset = author_fieldset(selection)
+    authors, total = db_read_authors(session, commons, fieldset.include)
+    release_session(session)
+    paginate_response_header(response, commons, total)
+    return rows_response(media_type, AuthorRead, authors, response, fieldset.include)
 
 
 @router.patch("/{author_id}", status_code=status.HTTP_200_OK)
@@ -46,9 +88,9 @@ async def update_author(
     session: SessionDep, author_id: int, author_updated: AuthorUpdate
 ) -> AuthorRead:
     """Endpoint to update a author."""
-    return AuthorRead.model_validate(
-        db_update_author(session, author_id, author_updated)
-    )
+    db_author = db_update_author(session, author_id, author_updated)
+    release_session(session)
+    return AuthorRead.model_validate(db_author)
 
 
 @router.delete("/{author_id}", status_code=status.HTTP_200_OK)
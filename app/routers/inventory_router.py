@@ -1,21 +1,40 @@
 """inventory_router.py."""
 
-from fastapi import APIRouter, status
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 
 from app.schemas.inventory import (
     InventoryCreate,
+    InventoryFilters,
     InventoryRead,
     InventoryUpdate,
+    MaterialAvailability,
 )
 from app.services.inventory_service import (
     db_add_to_inventory,
     db_delete_inventory,
+    db_read_availability,
     db_read_inventories_me,
     db_read_inventory_item,
+    db_stream_inventories_me,
     db_update_inventory,
+    inventory_fieldset,
 )
+from shared.utils.cache import response_cache
+from shared.utils.coalescing import read_coalescer
 from shared.utils.decorators import authorize
-from shared.utils.deps import CurrentUserDep, SessionDep
+from shared.utils.deps import (
+    CommonParams,
+    CurrentUserDep,
+    SessionDep,
+    paginate_response_header,
+    release_session,
+)
+from shared.utils.fieldsets import FieldsParams
+from shared.utils.negotiation import MediaTypeDep, rows_response, stream_rows
+from shared.utils.serialization import dump_rows, json_response
 
 router = APIRouter(prefix="/inventory", tags=["Inventory"])
 
@@ -26,31 +45,100 @@ async def add_to_inventory(
     session: SessionDep, inventory: InventoryCreate
 ) -> InventoryRead:
     """Endpoint to add a new item to inventory."""
-    return InventoryRead.model_validate(db_add_to_inventory(session, inventory))
+    db_inventory = db_add_to_inventory(session, inventory)
+    release_session(session)
+    return InventoryRead.model_validate(db_inventory)
+
+
+@router.get("/availability", status_code=status.HTTP_200_OK)
+@response_cache.cached("inventory", "libraries")
+async def read_availability(
+    session: SessionDep,
+    request: Request,
+    material_id: Annotated[list[int], Query()],
+) -> list[MaterialAvailability]:
+    """Endpoint to read the libraries with stock of one or more materials."""
+    availability = db_read_availability(session, material_id)
+    release_session(session)
+    return [
+        MaterialAvailability.model_validate(
+            {
+                "material_id": material,
+                "libraries": [
+                    {"library_id": library, "library_name": name, "stock": stock}
+                    for library, name, stock in libraries
+                ],
+            }
+        )
+        for material, libraries in availability.items()
+    ]
+
+
+@router.get(
+    "/export", status_code=status.HTTP_200_OK, response_model=list[InventoryRead]
+)
+async def export_inventories_me(
+    session: SessionDep,
+    current_user: CurrentUserDep,
+    filters: Annotated[InventoryFilters, Depends()],
+    selection: FieldsParams,
+    media_type: MediaTypeDep,
+) -> StreamingResponse:
+    """Endpoint to export every inventory of my libraries, streamed in batches."""
+    fieldset = inventory_fieldset(selection)
+    batches = db_stream_inventories_me(current_user.id, filters, fieldset.include)
+    release_session(session)
+    return StreamingResponse(
+        stream_rows(media_type, InventoryRead, batches, fieldset.include),
+        media_type=media_type,
+        headers={"Vary": "Accept"},
+    )
 
 
-@router.get("/item/", status_code=status.HTTP_200_OK)
+@router.get("/item/", status_code=status.HTTP_200_OK, response_model=InventoryRead)
 @authorize("inventory:read")
 async def read_inventory_item(
-    session: SessionDep, current_user: CurrentUserDep, library_id: int, material_id: int
-) -> InventoryRead:
+    session: SessionDep,
+    current_user: CurrentUserDep,
+    library_id: int,
+    material_id: int,
+    selection: FieldsParams,
+) -> Response:
     """Endpoint to read an item of an inventory."""
-    return InventoryRead.model_validate(
-        db_read_inventory_item(session, library_id, material_id)
-    )
+    fieldset = inventory_fieldset(selection)
+
+    def load_inventory_item() -> bytes:
+        inventory = db_read_inventory_item(
+            session, library_id, material_id, fieldset.include
+        )
+        release_session(session)
+        return dump_rows(inventory)
 
+    key = f"inventory:{library_id}:{material_id}:{selection.fields}:{selection.expand}"
+    return json_response(await read_coalescer.run(key, load_inventory_item))
 
-@router.get("/me/", status_code=status.HTTP_200_OK)
+
+@router.get("/me/", status_code=status.HTTP_200_OK, response_model=list[InventoryRead])
 # @authorize("inventory:read")
 async def read_inventories_me(
     session: SessionDep,
     current_user: CurrentUserDep,
-) -> list[InventoryRead]:
-    """Endpoint to read my inventories."""
-    return [
-        InventoryRead.model_validate(item)
-        for item in db_read_inventories_me(session, current_user.id)
-    ]
+    response: Response,
+    commons: CommonParams,
+    filters: Annotated[InventoryFilters, Depends()],
+    selection: FieldsParams,
+    media_type: MediaTypeDep,
+) -> Response:
+    """Endpoint to read a page of my inventories."""
+    fieldset = inventory_fieldset(selection)
+    inventories, total = db_read_inventories_me(
+        session, current_user.id, commons, filters, fieldset.include
+    )
+    release_session(session)
+    paginate_response_header(response, commons, total)
+    return rows_response(
+        media_type, InventoryRead, inventories, response, fieldset.include
+    )
 
 
 @router.patch("/{inventory_id}", status_code=status.HTTP_200_OK)
@@ -62,9 +150,9 @@ async def update_inventory(
     inventory_updated: InventoryUpdate,
 ) -> InventoryRead:
     """Endpoint to update a inventory."""
-    return InventoryRead.model_validate(
-        db_update_inventory(session, inventory_id, inventory_updated)
-    )
+    db_inventory = db_update_inventory(session, inventory_id, inventory_updated)
+    release_session(session)
+    return InventoryRead.model_validate(db_inventory)
 
 
 @router.delete("/{inventory_id}", status_code=status.HTTP_200_OK)
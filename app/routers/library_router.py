@@ -1,13 +1,19 @@
 """library_router.py."""
 
-from fastapi import APIRouter, status
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Request, Response, status
 
 from app.schemas.library import (
+    CatalogEntry,
+    CatalogFilters,
     LibraryCreate,
     LibraryRead,
     LibraryUpdate,
+    NearbyLibrary,
 )
-from app.schemas.library_user import LibraryUserRead
+from app.schemas.library_user import LibraryMemberRead, LibraryUserRead
+from app.schemas.role import RoleRead
 from app.schemas.user import UserRead
 from app.services.library_service import (
     db_add_library_user,
@@ -15,11 +21,21 @@ from app.services.library_service import (
     db_delete_library,
     db_read_libraries_me,
     db_read_library,
+    db_read_library_catalog,
     db_read_library_users,
+    db_read_nearest_libraries,
     db_update_library,
 )
+from shared.utils.cache import response_cache
 from shared.utils.decorators import authorize
-from shared.utils.deps import CurrentUserDep, SessionDep
+from shared.utils.deps import (
+    CommonParams,
+    CurrentUserDep,
+    SessionDep,
+    paginate_response_header,
+    release_session,
+)
+from shared.utils.serialization import dump_json, json_response
 
 router = APIRouter(prefix="/library", tags=["Library"])
 
@@ -31,39 +47,93 @@ async def create_library(
     library: LibraryCreate,
 ) -> LibraryRead:
     """Endpoint to create a new library."""
-    return LibraryRead.model_validate(
-        db_create_library(session, library, current_user.id)
+    db_library = db_create_library(session, library, current_user.id)
+    release_session(session)
+    return LibraryRead.model_validate(db_library)
+
+
+@router.get("/nearest", status_code=status.HTTP_200_OK)
+async def read_nearest_libraries(
+    session: SessionDep,
+    material_id: int,
+    latitude: float,
+    longitude: float,
+    limit: int = 5,
+) -> list[NearbyLibrary]:
+    """Endpoint to read the closest libraries with a material in stock."""
+    nearest = db_read_nearest_libraries(
+        session, material_id, latitude, longitude, limit
     )
+    release_session(session)
+    return [
+        NearbyLibrary(
+            **LibraryRead.model_validate(library).model_dump(),
+            stock=stock,
+            distance_km=round(distance, 3),
+        )
+        for library, stock, distance in nearest
+    ]
 
 
 @router.get(
     "/{library_id}",
     status_code=status.HTTP_200_OK,
+    response_model=LibraryRead,
     response_model_exclude_none=True,
 )
-async def read_library(session: SessionDep, library_id: int) -> LibraryRead:
+async def read_library(session: SessionDep, library_id: int) -> Response:
     """Endpoint to read a library."""
-    return LibraryRead.model_validate(db_read_library(session, library_id))
+    db_library = db_read_library(session, library_id)
+    release_session(session)
+    return json_response(dump_json(LibraryRead, db_library, exclude_none=True))
+
+
+@router.get(
+    "/{library_id}/catalog",
+    status_code=status.HTTP_200_OK,
+    response_model=list[CatalogEntry],
+)
+@response_cache.cached("libraries", "inventory", "materials", "authors", "sections")
+async def read_library_catalog(
+    session: SessionDep,
+    request: Request,
+    response: Response,
+    library_id: int,
+    commons: CommonParams,
+    filters: Annotated[CatalogFilters, Depends()],
+) -> Response:
+    """Endpoint to read a page of the materials of a library with their stock."""
+    rows, total = db_read_library_catalog(session, library_id, commons, filters)
+    release_session(session)
+    paginate_response_header(response, commons, total)
+    return json_response(dump_json(list[CatalogEntry], rows), response)
 
 
 @router.get("/users/{library_id}", status_code=status.HTTP_200_OK)
-async def read_library_users(session: SessionDep, library_id: int) -> list[UserRead]:
-    """Endpoint to read library users."""
+async def read_library_users(
+    session: SessionDep, library_id: int, response: Response, commons: CommonParams
+) -> list[LibraryMemberRead]:
+    """Endpoint to read a page of library members with their roles."""
+    members, total = db_read_library_users(session, library_id, commons)
+    release_session(session)
+    paginate_response_header(response, commons, total)
     return [
-        UserRead.model_validate(user)
-        for user in db_read_library_users(session, library_id=library_id)
+        LibraryMemberRead(
+            **UserRead.model_validate(user).model_dump(),
+            roles=[RoleRead.model_validate(role) for role in roles],
+        )
+        for user, roles in members
     ]
 
 
-@router.get("/me/", status_code=status.HTTP_200_OK)
+@router.get("/me/", status_code=status.HTTP_200_OK, response_model=list[LibraryRead])
 async def read_libraries_me(
     session: SessionDep, current_user: CurrentUserDep
-) -> list[LibraryRead]:
+) -> Response:
     """Endpoint to read my library."""
-    return [
-        LibraryRead.model_validate(library)
-        for library in db_read_libraries_me(session, current_user.id)
-    ]
+    db_libraries = db_read_libraries_me(session, current_user.id)
+    release_session(session)
+    return json_response(dump_json(list[LibraryRead], db_libraries))
 
 
 @router.post("/member", status_code=status.HTTP_201_CREATED)
@@ -71,9 +141,9 @@ async def add_library_member(
     session: SessionDep, library_id: int, user_id: int, role_id: int
 ) -> LibraryUserRead:
     """Endpoint to create a new library member."""
-    return LibraryUserRead.model_validate(
-        db_add_library_user(session, library_id, user_id, role_id)
-    )
+    db_library_user = db_add_library_user(session, library_id, user_id, role_id)
+    release_session(session)
+    return LibraryUserRead.model_validate(db_library_user)
 
 
 @router.patch("/{library_id}", status_code=status.HTTP_200_OK)
@@ -85,9 +155,9 @@ async def update_library(
     library_updated: LibraryUpdate,
 ) -> LibraryRead:
     """Endpoint to update a library."""
-    return LibraryRead.model_validate(
-        db_update_library(session, library_id, library_updated)
-    )
+    db_library = db_update_library(session, library_id, library_updated)
+    release_session(session)
+    return LibraryRead.model_validate(db_library)
 
 
 @router.delete("/{library_id}", status_code=status.HTTP_200_OK)
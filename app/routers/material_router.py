@@ -1,21 +1,53 @@
 """material_router.py."""
 
-from fastapi import APIRouter, status
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Request, Response, status
 
 from app.schemas.material import (
+    DuplicateCandidateRead,
+    DuplicatePair,
     MaterialCreate,
+    MaterialFacets,
+    MaterialFilters,
+    MaterialLookup,
     MaterialRead,
+    MaterialSearchHit,
+    MaterialSuggestion,
     MaterialUpdate,
 )
+from app.services.duplicate_service import (
+    db_find_duplicate_candidates,
+    db_read_duplicate_report,
+)
 from app.services.material_service import (
     db_create_material,
     db_delete_material,
+    db_lookup_materials,
     db_read_material,
+    db_read_material_by_cod_ref,
+    db_read_material_by_isbn,
+    db_read_material_by_issn,
+    db_read_material_facets,
     db_read_materials,
     db_update_material,
+    material_fieldset,
 )
+from app.services.search_service import db_search_materials
+from app.services.suggest_service import db_suggest_materials
+from shared.utils.cache import response_cache
+from shared.utils.coalescing import read_coalescer
 from shared.utils.decorators import authorize
-from shared.utils.deps import CurrentUserDep, SessionDep
+from shared.utils.deps import (
+    CommonParams,
+    CurrentUserDep,
+    SessionDep,
+    paginate_response_header,
+    release_session,
+)
+from shared.utils.fieldsets import FieldsParams, dump_fieldset
+from shared.utils.negotiation import MediaTypeDep, rows_response
+from shared.utils.serialization import dump_json, json_response
 
 router = APIRouter(prefix="/material", tags=["Material"])
 
@@ -23,28 +55,180 @@ router = APIRouter(prefix="/material", tags=["Material"])
 @router.post("/", status_code=status.HTTP_201_CREATED)
 # @authorize('material:create')
 async def create_material(
-    session: SessionDep, material: MaterialCreate
+    session: SessionDep, response: Response, material: MaterialCreate
 ) -> MaterialRead:
     """Endpoint to create a new material."""
-    return MaterialRead.model_validate(db_create_material(session, material))
+    candidates = db_find_duplicate_candidates(session, material.title)
+    db_material = db_create_material(session, material)
+    release_session(session)
+    if candidates:
+        response.headers["X-Possible-Duplicates"] = ",".join(
+            str(candidate.id) for candidate in candidates
+        )
+    return MaterialRead.model_validate(db_material)
+
+
+@router.get("/duplicates/report", status_code=status.HTTP_200_OK)
+@response_cache.cached("materials")
+async def read_duplicate_report(
+    session: SessionDep, request: Request, response: Response, commons: CommonParams
+) -> list[DuplicatePair]:
+    """Endpoint to read a page of the pairs of materials with similar titles."""
+    pairs = db_read_duplicate_report(session)
+    release_session(session)
+    paginate_response_header(response, commons, len(pairs))
+    page = pairs[commons.offset : commons.offset + commons.limit]
+    return [
+        DuplicatePair(material_id=material_id, duplicate_id=other_id, similarity=score)
+        for material_id, other_id, score in page
+    ]
+
+
+@router.get(
+    "/search", status_code=status.HTTP_200_OK, response_model=list[MaterialSearchHit]
+)
+async def search_materials(
+    session: SessionDep, response: Response, commons: CommonParams
+) -> Response:
+    """
+    Endpoint to search materials by title and description.
+
+    Matches are only counted up to a cap: when `X-Total-Capped` is `true`,
+    `X-Total` and `X-Pages` are lower bounds, and only `X-Next` tells whether
+    another page exists.
+    """
+    if not commons.q:
+        raise ValueError("Query parameter 'q' is required.")
+    hits, total, capped = db_search_materials(
+        session, commons.q, commons.offset, commons.limit
+    )
+    release_session(session)
+    paginate_response_header(response, commons, total)
+    response.headers["X-Total-Capped"] = str(capped).lower()
+    return json_response(dump_json(list[MaterialSearchHit], hits), response)
+
+
+@router.get("/facets", status_code=status.HTTP_200_OK)
+@response_cache.cached("materials")
+async def read_material_facets(
+    session: SessionDep,
+    request: Request,
+    commons: CommonParams,
+    filters: Annotated[MaterialFilters, Depends()],
+) -> MaterialFacets:
+    """Endpoint to count the materials matching the filters by facet."""
+    facets = db_read_material_facets(session, commons, filters)
+    release_session(session)
+    return MaterialFacets.model_validate(
+        {
+            name: [{"value": value, "count": total} for value, total in counts]
+            for name, counts in facets.items()
+        }
+    )
+
+
+@router.get("/suggest", status_code=status.HTTP_200_OK)
+async def suggest_materials(
+    session: SessionDep, prefix: str, limit: int = 10
+) -> list[MaterialSuggestion]:
+    """Endpoint to suggest materials whose title starts with a prefix."""
+    suggestions = db_suggest_materials(session, prefix, limit)
+    release_session(session)
+    return [MaterialSuggestion(id=match.id, title=match.label) for match in suggestions]
+
+
+@router.get("/isbn/{isbn}", status_code=status.HTTP_200_OK, response_model=MaterialRead)
+async def read_material_by_isbn(session: SessionDep, isbn: str) -> Response:
+    """Endpoint to read a material by ISBN-10 or ISBN-13."""
+    db_material = db_read_material_by_isbn(session, isbn)
+    release_session(session)
+    return json_response(dump_json(MaterialRead, db_material))
 
 
-@router.get("/{material_id}", status_code=status.HTTP_200_OK)
+@router.get("/issn/{issn}", status_code=status.HTTP_200_OK, response_model=MaterialRead)
+async def read_material_by_issn(session: SessionDep, issn: str) -> Response:
+    """Endpoint to read a material by ISSN."""
+    db_material = db_read_material_by_issn(session, issn)
+    release_session(session)
+    return json_response(dump_json(MaterialRead, db_material))
+
+
+@router.get(
+    "/cod_ref/{cod_ref}", status_code=status.HTTP_200_OK, response_model=MaterialRead
+)
+async def read_material_by_cod_ref(session: SessionDep, cod_ref: str) -> Response:
+    """Endpoint to read a material by reference code."""
+    db_material = db_read_material_by_cod_ref(session, cod_ref)
+    release_session(session)
+    return json_response(dump_json(MaterialRead, db_material))
+
+
+@router.post(
+    "/lookup", status_code=status.HTTP_200_OK, response_model=list[MaterialRead]
+)
+async def lookup_materials(session: SessionDep, lookup: MaterialLookup) -> Response:
+    """Endpoint to resolve up to 1000 ISBN, ISSN and reference codes at once."""
+    db_materials = db_lookup_materials(session, lookup)
+    release_session(session)
+    return json_response(dump_json(list[MaterialRead], db_materials))
+
+
+@router.get(
+    "/{material_id}", status_code=status.HTTP_200_OK, response_model=MaterialRead
+)
 # @authorize('material:read')
-async def read_material(session: SessionDep, material_id: int) -> MaterialRead:
+async def read_material(
+    session: SessionDep, material_id: int, selection: FieldsParams
+) -> Response:
     """Endpoint to read an material."""
-    return MaterialRead.model_validate(db_read_material(session, material_id))
+    fieldset = material_fieldset(selection)
 
+    def load_material() -> bytes:
+        db_material = db_read_material(session, material_id, fieldset.options)
+        release_session(session)
+        return dump_fieldset(MaterialRead, db_material, fieldset)
 
-@router.get("/", status_code=status.HTTP_200_OK)
-# @authorize('material:read_all')
-async def read_materials(session: SessionDep) -> list[MaterialRead]:
-    """Endpoint to read all materials."""
+    key = f"material:{material_id}:{selection.fields}:{selection.expand}"
+    return json_response(await read_coalescer.run(key, load_material))
+
+
+@router.get("/{material_id}/duplicates", status_code=status.HTTP_200_OK)
+async def read_material_duplicates(
+    session: SessionDep, material_id: int, limit: int = 10
+) -> list[DuplicateCandidateRead]:
+    """Endpoint to read the materials whose title is similar to a material's."""
+    db_material = db_read_material(session, material_id)
+    candidates = db_find_duplicate_candidates(
+        session, db_material.title, exclude_id=material_id, limit=limit
+    )
+    release_session(session)
     return [
-        MaterialRead.model_validate(material) for material in db_read_materials(session)
+        DuplicateCandidateRead.model_validate(candidate) for candidate in candidates
     ]
 
 
+@router.get("/", status_code=status.HTTP_200_OK, response_model=list[MaterialRead])
+# @authorize('material:read_all')
+@response_cache.cached("materials", "authors", "sections")
+async def read_materials(
+    session: SessionDep,
+    request: Request,
+    response: Response,
+    commons: CommonParams,
+    filters: Annotated[MaterialFilters, Depends()],
+    selection: FieldsParams,
+    media_type: MediaTypeDep,
+) -> Response:
+    """Endpoint to read a page of materials."""
+    fieldset = material_fieldset(selection)
+    materials, total = db_read_materials(session, commons, filters, fieldset.include)
+    release_session(session)
+    paginate_response_header(response, commons, total)
+    return rows_response(
+        media_type, MaterialRead, materials, response, fieldset.include
+    )
+
+
 @router.patch("/{material_id}", status_code=status.HTTP_200_OK)
 @authorize("material:update")
 async def update_material(
@@ -54,9 +238,9 @@ async def update_material(
     material_updated: MaterialUpdate,
 ) -> MaterialRead:
     """Endpoint to update a material."""
-    return MaterialRead.model_validate(
-        db_update_material(session, material_id, material_updated)
-    )
+    db_material = db_update_material(session, material_id, material_updated)
+    release_session(session)
+    return MaterialRead.model_validate(db_material)
 
 
 @router.delete("/{material_id}", status_code=status.HTTP_200_OK)
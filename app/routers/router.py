@@ -9,6 +9,7 @@ from app.routers import (
     library_router,
     material_router,
     section_router,
+    system_router,
     user_router,
 )
 
@@ -20,3 +21,4 @@ app_router.include_router(author_router.router)
 app_router.include_router(inventory_router.router)
 app_router.include_router(material_router.router)
 app_router.include_router(section_router.router)
+app_router.include_router(system_router.router)
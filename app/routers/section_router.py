@@ -1,6 +1,6 @@
 """section_router.py."""
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Request, Response, status
 
 from app.schemas.section import (
     SectionCreate,
@@ -13,8 +13,19 @@ from app.services.section_service import (
     db_read_section,
     db_read_sections,
     db_update_section,
+    section_fieldset,
 )
-from shared.utils.deps import CurrentUserDep, SessionDep
+from shared.utils.cache import response_cache
+from shared.utils.deps import (
+    CommonParams,
+    CurrentUserDep,
+    SessionDep,
+    paginate_response_header,
+    release_session,
+)
+from shared.utils.fieldsets import FieldsParams, dump_fieldset
+from shared.utils.negotiation import MediaTypeDep, rows_response
+from shared.utils.serialization import json_response
 
 router = APIRouter(prefix="/section", tags=["Section"])
 
@@ -23,23 +34,40 @@ router = APIRouter(prefix="/section", tags=["Section"])
 # @authorize('section:create')
 async def create_section(session: SessionDep, section: SectionCreate) -> SectionRead:
     """Endpoint to create a new section."""
-    return SectionRead.model_validate(db_create_section(session, section))
+    db_section = db_create_section(session, section)
+    release_session(session)
+    return SectionRead.model_validate(db_section)
 
 
-@router.get("/{section_id}", status_code=status.HTTP_200_OK)
+@router.get("/{section_id}", status_code=status.HTTP_200_OK, response_model=SectionRead)
 # @authorize('section:read')
-async def read_section(session: SessionDep, section_id: int) -> SectionRead:
+async def read_section(
+    session: SessionDep, section_id: int, selection: FieldsParams
+) -> Response:
     """Endpoint to read an section."""
-    return SectionRead.model_validate(db_read_section(session, section_id))
+    fieldset = section_fieldset(selection)
+    db_section = db_read_section(session, section_id, fieldset.options)
+    release_session(session)
+    return json_response(dump_fieldset(SectionRead, db_section, fieldset))
 
 
-@router.get("/", status_code=status.HTTP_200_OK)
+@router.get("/", status_code=status.HTTP_200_OK, response_model=list[SectionRead])
 # @authorize('section:read_all')
-async def read_sections(session: SessionDep) -> list[SectionRead]:
-    """Endpoint to read all sections."""
-    return [
-        SectionRead.model_validate(section) for section in db_read_sections(session)
-    ]
+@response_cache.cached("sections")
+async def read_sections(
+    session: SessionDep,
+    request: Request,
+    response: Response,
+    commons: CommonParams,
+    selection: FieldsParams,
+    media_type: MediaTypeDep,
+) -> Response:
+    """Endpoint to read a page of sections."""
+    fieldset = section_fieldset(selection)
+    sections, total = db_read_sections(session, commons, fieldset.include)
+    release_session(session)
+    paginate_response_header(response, commons, total)
+    return rows_response(media_type, SectionRead, sections, response, fieldset.include)
 
 
 @router.patch("/{section_id}", status_code=status.HTTP_200_OK)
@@ -48,9 +76,9 @@ async def update_section(
     session: SessionDep, section_id: int, section_updated: SectionUpdate
 ) -> SectionRead:
     """Endpoint to update a section."""
-    return SectionRead.model_validate(
-        db_update_section(session, section_id, section_updated)
-    )
+    db_section = db_update_section(session, section_id, section_updated)
+    release_session(session)
+    return SectionRead.model_validate(db_section)
 
 
 @router.delete("/{section_id}", status_code=status.HTTP_200_OK)
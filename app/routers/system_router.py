@@ -0,0 +1,46 @@
+"""system_router.py."""
+
+from typing import Any
+
+from fastapi import APIRouter, Depends, status
+
+from shared.utils.cache import response_cache
+from shared.utils.coalescing import read_coalescer
+from shared.utils.deps import get_current_user
+from shared.utils.ratelimit import rate_limiter
+from shared.utils.shedding import load_shedder
+from shared.utils.throttle import login_throttle
+
+router = APIRouter(
+    prefix="/system", tags=["System"], dependencies=[Depends(get_current_user)]
+)
+
+
+@router.get("/cache", status_code=status.HTTP_200_OK)
+async def read_cache_stats() -> dict[str, Any]:
+    """Endpoint to read the response cache metrics."""
+    return response_cache.stats()
+
+
+@router.get("/coalescing", status_code=status.HTTP_200_OK)
+async def read_coalescing_stats() -> dict[str, Any]:
+    """Endpoint to read the single-flight coalescing metrics."""
+    return read_coalescer.stats()
+
+
+@router.get("/ratelimit", status_code=status.HTTP_200_OK)
+async def read_rate_limit_stats() -> dict[str, Any]:
+    """Endpoint to read the rate limiter metrics."""
+    return rate_limiter.stats()
+
+
+@router.get("/login-throttle", status_code=status.HTTP_200_OK)
+async def read_login_throttle_stats() -> dict[str, Any]:
+    """Endpoint to read the login throttling metrics."""
+    return login_throttle.stats()
+
+
+@router.get("/shedding", status_code=status.HTTP_200_OK)
+async def read_shedding_stats() -> dict[str, Any]:
+    """Endpoint to read the adaptive concurrency limits per route class."""
+    return load_shedder.stats()
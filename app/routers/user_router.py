@@ -1,6 +1,6 @@
 """user_router.py."""
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Response, status
 
 from app.schemas.library import (
     LibraryRead,
@@ -14,11 +14,15 @@ from app.services.user_service import (
     db_read_user_by_username,
     db_read_user_libraries,
     db_read_user_library_roles,
+    db_read_users,
     db_update_user,
 )
 from shared.utils.deps import (
+    CommonParams,
     CurrentUserDep,
     SessionDep,
+    paginate_response_header,
+    release_session,
 )
 
 router = APIRouter(prefix="/user", tags=["User"])
@@ -27,21 +31,39 @@ router = APIRouter(prefix="/user", tags=["User"])
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_user(session: SessionDep, user: UserCreate) -> UserRead:
     """Endpoint to create a new user."""
-    return UserRead.model_validate(db_create_user(session, user))
+    db_user = db_create_user(session, user)
+    release_session(session)
+    return UserRead.model_validate(db_user)
+
+
+@router.get("/", status_code=status.HTTP_200_OK)
+async def read_users(
+    session: SessionDep,
+    current_user: CurrentUserDep,
+    response: Response,
+    commons: CommonParams,
+) -> list[UserRead]:
+    """Endpoint to read a page of users, searched by username or email prefix."""
+    db_users, total = db_read_users(session, commons)
+    release_session(session)
+    paginate_response_header(response, commons, total)
+    return [UserRead.model_validate(user) for user in db_users]
 
 
 @router.get("/{user_id}", status_code=status.HTTP_200_OK)
 async def read_user(session: SessionDep, user_id: int) -> UserRead:
     """Endpoint to read a user."""
-    return UserRead.model_validate(db_read_user(session, user_id))
+    db_user = db_read_user(session, user_id)
+    release_session(session)
+    return UserRead.model_validate(db_user)
 
 
 @router.get("/username/{username}", status_code=status.HTTP_200_OK)
 async def read_user_by_username(username: str, session: SessionDep) -> UserRead:
     """Endpoint to read a user by username."""
-    return UserRead.model_validate(
-        db_read_user_by_username(session=session, username=username)
-    )
+    db_user = db_read_user_by_username(session=session, username=username)
+    release_session(session)
+    return UserRead.model_validate(db_user)
 
 
 @router.get("/email/{email}", status_code=status.HTTP_200_OK)
@@ -50,7 +72,9 @@ async def read_user_by_email(
     session: SessionDep, current_user: CurrentUserDep, email: str
 ) -> UserRead:
     """Endpoint to read a user by email."""
-    return UserRead.model_validate(db_read_user_by_email(session, email))
+    db_user = db_read_user_by_email(session, email)
+    release_session(session)
+    return UserRead.model_validate(db_user)
 
 
 @router.get("/me/libraries/", response_model_exclude_none=True)
@@ -59,10 +83,9 @@ async def read_user_me_libraries(
     current_user: CurrentUserDep,
 ) -> list[LibraryRead]:
     """Endpoint to read user libraries."""
-    return [
-        LibraryRead.model_validate(library)
-        for library in db_read_user_libraries(session, current_user.id)
-    ]
+    db_libraries = db_read_user_libraries(session, current_user.id)
+    release_session(session)
+    return [LibraryRead.model_validate(library) for library in db_libraries]
 
 
 @router.get("/me/library/role", status_code=status.HTTP_200_OK)
@@ -70,10 +93,9 @@ async def read_user_me_library_roles(
     session: SessionDep, current_user: CurrentUserDep, library_id: int
 ) -> list[RoleRead]:
     """Endpoint to read user library roles."""
-    return [
-        RoleRead.model_validate(role)
-        for role in db_read_user_library_roles(session, current_user.id, library_id)
-    ]
+    db_roles = db_read_user_library_roles(session, current_user.id, library_id)
+    release_session(session)
+    return [RoleRead.model_validate(role) for role in db_roles]
 
 
 @router.patch("/{user_id}", status_code=status.HTTP_200_OK)
@@ -84,4 +106,6 @@ async def update_user(
     user_updated: UserUpdate,
 ) -> UserRead:
     """Endpoint to update a user."""
-    return UserRead.model_validate(db_update_user(session, user_id, user_updated))
+    db_user = db_update_user(session, user_id, user_updated)
+    release_session(session)
+    return UserRead.model_validate(db_user)
@@ -27,3 +27,10 @@ class AuthorUpdate(ConfigModel):
     """AuthorUpdate schema."""
 
     name: str | None = None
+
+
+class AuthorSuggestion(ConfigModel):
+    """AuthorSuggestion schema."""
+
+    id: int
+    name: str
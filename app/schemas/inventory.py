@@ -4,6 +4,8 @@ from app.schemas.library import LibraryRead
 from app.schemas.material import MaterialRead
 from shared.utils.deps import ConfigModel
 
+MAX_AVAILABILITY_LOOKUP = 1000
+
 
 class InventoryBase(ConfigModel):
     """InventoryBase schema."""
@@ -36,3 +38,27 @@ class InventoryUpdate(ConfigModel):
     stock: int | None = None
     material_id: int | None = None
     library_id: int | None = None
+
+
+class InventoryFilters(ConfigModel):
+    """InventoryFilters schema."""
+
+    material_id: int | None = None
+    library_id: int | None = None
+    stock_min: int | None = None
+    stock_max: int | None = None
+
+
+class LibraryStock(ConfigModel):
+    """LibraryStock schema."""
+
+    library_id: int
+    library_name: str
+    stock: int
+
+
+class MaterialAvailability(ConfigModel):
+    """MaterialAvailability schema."""
+
+    material_id: int
+    libraries: list[LibraryStock]
@@ -1,6 +1,10 @@
 """Library.py schemas."""
 
+from pydantic import Field
+
+from app.schemas.material import MaterialFilters
 from shared.utils.deps import ConfigModel
+from shared.utils.enums import MaterialType
 
 
 class LibraryBase(ConfigModel):
@@ -8,6 +12,8 @@ class LibraryBase(ConfigModel):
 
     name: str
     address: str
+    latitude: float | None = Field(default=None, ge=-90, le=90)
+    longitude: float | None = Field(default=None, ge=-180, le=180)
 
 
 class LibraryCreate(LibraryBase):
@@ -29,3 +35,34 @@ class LibraryUpdate(ConfigModel):
 
     name: str | None = None
     address: str | None = None
+    latitude: float | None = Field(default=None, ge=-90, le=90)
+    longitude: float | None = Field(default=None, ge=-180, le=180)
+
+
+class CatalogFilters(MaterialFilters):
+    """CatalogFilters schema."""
+
+    stock_min: int | None = None
+    stock_max: int | None = None
+
+
+class CatalogEntry(ConfigModel):
+    """CatalogEntry schema."""
+
+    id: int
+    type: MaterialType
+    title: str
+    cod_ref: str
+    price: float
+    author_id: int
+    author_name: str
+    section_id: int
+    section_name: str
+    stock: int
+
+
+class NearbyLibrary(LibraryRead):
+    """NearbyLibrary schema."""
+
+    stock: int
+    distance_km: float
@@ -1,5 +1,7 @@
 """library_user.py schemas."""
 
+from app.schemas.role import RoleRead
+from app.schemas.user import UserRead
 from shared.utils.deps import ConfigModel
 
 
@@ -28,3 +30,9 @@ class LibraryUserUpdate(ConfigModel):
 
     library_id: int | None = None
     user_id: int | None = None
+
+
+class LibraryMemberRead(UserRead):
+    """LibraryMemberRead schema."""
+
+    roles: list[RoleRead]
@@ -1,10 +1,14 @@
 """Material.py schemas."""
 
+from pydantic import Field, model_validator
+
 from app.schemas.author import AuthorRead
 from app.schemas.section import SectionRead
 from shared.utils.deps import ConfigModel
 from shared.utils.enums import MaterialType
 
+MAX_MATERIAL_LOOKUP = 1000
+
 
 class MaterialBase(ConfigModel):
     """MaterialBase schema."""
@@ -51,3 +55,85 @@ class MaterialUpdate(ConfigModel):
 
     author_id: int | None = None
     section_id: int | None = None
+
+
+class MaterialSearchHit(ConfigModel):
+    """MaterialSearchHit schema."""
+
+    id: int
+    type: MaterialType
+    title: str
+    cod_ref: str
+    rank: float
+    snippet: str | None = None
+
+
+class TypeFacet(ConfigModel):
+    """TypeFacet schema."""
+
+    value: MaterialType
+    count: int
+
+
+class IdFacet(ConfigModel):
+    """IdFacet schema."""
+
+    value: int
+    count: int
+
+
+class MaterialFacets(ConfigModel):
+    """MaterialFacets schema."""
+
+    type: list[TypeFacet]
+    section_id: list[IdFacet]
+    author_id: list[IdFacet]
+
+
+class DuplicateCandidateRead(ConfigModel):
+    """DuplicateCandidateRead schema."""
+
+    id: int
+    title: str
+    cod_ref: str
+    similarity: float
+
+
+class DuplicatePair(ConfigModel):
+    """DuplicatePair schema."""
+
+    material_id: int
+    duplicate_id: int
+    similarity: float
+
+
+class MaterialSuggestion(ConfigModel):
+    """MaterialSuggestion schema."""
+
+    id: int
+    title: str
+
+
+class MaterialLookup(ConfigModel):
+    """MaterialLookup schema: identifiers to resolve in one batch."""
+
+    isbn: list[str] = Field(default_factory=list)
+    issn: list[str] = Field(default_factory=list)
+    cod_ref: list[str] = Field(default_factory=list)
+
+    @model_validator(mode="after")
+    def validate_batch_size(self) -> "MaterialLookup":
+        """Limit the batch to MAX_MATERIAL_LOOKUP codes."""
+        if len(self.isbn) + len(self.issn) + len(self.cod_ref) > MAX_MATERIAL_LOOKUP:
+            raise ValueError(f"At most {MAX_MATERIAL_LOOKUP} codes per lookup.")
+        return self
+
+
+class MaterialFilters(ConfigModel):
+    """MaterialFilters schema."""
+
+    type: MaterialType | None = None
+    author_id: int | None = None
+    section_id: int | None = None
+    price_min: float | None = None
+    price_max: float | None = None
@@ -7,13 +7,14 @@ class UserBase(ConfigModel):
     """UserBase schema."""
 
     username: str
-    password: str
     email: str
 
 
 class UserCreate(UserBase):
     """UserCreate schema."""
 
+    password: str
+
 
 class User(UserBase):
     """User schema."""
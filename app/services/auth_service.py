@@ -4,17 +4,17 @@ from datetime import datetime, timedelta, timezone
 
 from jose import jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, undefer
 
-from app.models.permission import DBPermission
 from app.models.user import DBUser
 from app.schemas.token import (
     AccessToken,
     AccessTokenCreate,
 )
+from app.services.reference_service import reference_data
 from app.services.user_service import (
     db_read_user_by_email_or_username,
-    db_read_user_permissions_by_library,
+    db_read_user_roles_by_library,
 )
 from config.settings import settings
 from shared.utils.deps import CurrentUserDep
@@ -23,22 +23,35 @@ from shared.utils.errors import (
     InvalidCredentialsError,
     NotFoundError,
 )
+from shared.utils.throttle import login_throttle
 
 
 def authenticate_user(
     session: Session,
     username: str,
     password: str,
+    client_ip: str | None = None,
 ) -> DBUser:
-    """Authenticate user."""
+    """
+    Authenticate user.
+
+    Attempts throttled after repeated failures of the username or the client
+    IP are rejected before the user is read or the password hashed.
+    """
+    login_throttle.check(username, client_ip)
     try:
         user = db_read_user_by_email_or_username(
-            session=session, email_or_username=username
+            session=session,
+            email_or_username=username,
+            options=[undefer(DBUser.password)],
         )
     except NotFoundError:
+        login_throttle.record_failure(username, client_ip)
         raise InvalidCredentialsError
     if not verify_password(password, user.password):
+        login_throttle.record_failure(username, client_ip)
         raise InvalidCredentialsError
+    login_throttle.record_success(username)
     return user
 
 
@@ -95,25 +108,17 @@ def check_permissions(
     session: Session,
 ) -> bool:
     """Check permissions."""
-    user_permissions = db_read_user_permissions_by_library(
+    user_roles = db_read_user_roles_by_library(
         session=session,
         user_id=current_user.id,
         library_id=library_id,
     )
+    role_ids = [user_role.role_id for user_role in user_roles]
 
-    if not user_permissions:
+    reference = reference_data.get()
+    if not reference.permission_ids(role_ids):
         raise AuthorizationError("Any permission for this library")
 
-    permissions = (
-        session.query(DBPermission)
-        .filter(
-            DBPermission.id.in_(
-                [permission.permission_id for permission in user_permissions]
-            )
-        )
-        .all()
-    )
-    for permission in permissions:
-        if permission.name == permission_name:
-            return True
+    if permission_name in reference.permission_names(role_ids):
+        return True
     raise AuthorizationError("Permission denied for this library")
@@ -1,16 +1,33 @@
 """author_service.py."""
 
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.models.author import DBAuthor
-from app.schemas.author import AuthorCreate, AuthorUpdate
-from shared.utils.deps import commit_and_refresh
+from app.schemas.author import AuthorCreate, AuthorRead, AuthorUpdate
+from shared.utils.deps import CommonParameters, commit_and_refresh
 from shared.utils.errors import DeleteError, NotFoundError
+from shared.utils.fieldsets import FieldSelection, Fieldset, Tree, build_fieldset
+from shared.utils.projection import project
+from shared.utils.query import QuerySpec, db_read_row_page
 from shared.utils.validations import (
     validate_entity_existence,
     validate_unique_constraints,
 )
 
+AUTHOR_QUERY = QuerySpec(
+    filters={"id": DBAuthor.id, "name": DBAuthor.name},
+    sortable={"id": DBAuthor.id, "name": DBAuthor.name},
+)
+
+
+def author_fieldset(selection: FieldSelection) -> Fieldset:
+    """Compile the `fields` of an author read."""
+    return build_fieldset(AuthorRead, DBAuthor, selection)
+
 
 def db_create_author(session: Session, author: AuthorCreate) -> DBAuthor:
     """Create a new author in the database."""
@@ -19,14 +36,30 @@ def db_create_author(session: Session, author: AuthorCreate) -> DBAuthor:
     return commit_and_refresh(session, new_author)
 
 
-def db_read_author(session: Session, author_id: int) -> DBAuthor:
-    """Read a author by id from the database."""
-    return validate_entity_existence(session, DBAuthor, author_id)
+def db_read_author(
+    session: Session, author_id: int, options: Sequence[Any] = ()
+) -> DBAuthor:
+    """Read a author by id from the database, with optional loader options."""
+    return validate_entity_existence(session, DBAuthor, author_id, options)
+
+
+def db_read_authors(
+    session: Session, commons: CommonParameters, include: Tree | None = None
+) -> tuple[list[dict[str, Any]], int]:
+    """Read a page of authors, restricted to `include`, and the total."""
+    projection = project(AuthorRead, DBAuthor, include)
+    rows, total = db_read_row_page(session, projection.select(), AUTHOR_QUERY, commons)
+    return projection.build(rows), total
 
 
-def db_read_authors(session: Session) -> list[DBAuthor]:
-    """Read all authors from the database."""
-    return session.query(DBAuthor).all()
+def db_backfill_author_keys(session: Session) -> int:
+    """Fill the name collation keys of authors created without them."""
+    authors = session.scalars(select(DBAuthor).where(DBAuthor.name_key.is_(None))).all()
+    for author in authors:
+        # Reassigning runs the model validator that computes the key
+        author.name = author.name
+    session.commit()
+    return len(authors)
 
 
 def db_update_author(
@@ -0,0 +1,212 @@
+"""
+duplicate_service.py.
+
+Near-duplicate detection of materials by title trigram similarity. Postgres
+uses pg_trgm with a GIN index on the folded title; other databases use an
+in-process trigram inverted index, rebuilt in the background after writes
+to materials, so it may miss titles written during the last rebuild.
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from sqlalchemy import Engine, select, text
+from sqlalchemy.orm import Session
+
+from app.models.material import DBMaterial
+from config.settings import settings
+from shared.utils.identifiers import fold_key
+from shared.utils.invalidation import invalidation_bus
+from shared.utils.snapshot import SnapshotStore
+
+MAX_DUPLICATE_CANDIDATES = 50
+
+POSTGRES_CANDIDATES_QUERY = """
+    SELECT id, title, cod_ref, similarity(title_key, :key) AS similarity
+    FROM materials
+    WHERE title_key % :key AND id <> :exclude_id
+    ORDER BY similarity DESC, id
+    LIMIT :limit
+"""
+
+POSTGRES_REPORT_QUERY = """
+    SELECT a.id, b.id, similarity(a.title_key, b.title_key) AS similarity
+    FROM materials AS a JOIN materials AS b
+      ON a.title_key % b.title_key AND a.id < b.id
+    ORDER BY similarity DESC, a.id, b.id
+"""
+
+
+def trigrams(text: str) -> frozenset[str]:
+    """Return the trigrams of the folded words of `text`, as pg_trgm does."""
+    grams: set[str] = set()
+    for word in re.findall(r"\w+", fold_key(text)):
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def similarity(first: frozenset[str], second: frozenset[str]) -> float:
+    """Return the share of trigrams two titles have in common."""
+    if not first or not second:
+        return 0.0
+    shared = len(first & second)
+    return shared / (len(first) + len(second) - shared)
+
+
+@dataclass(frozen=True)
+class DuplicateCandidate:
+    """A material similar to a title."""
+
+    id: int
+    title: str
+    cod_ref: str
+    similarity: float
+
+
+@dataclass(frozen=True)
+class TrigramIndex:
+    """
+    Immutable trigram inverted index of material titles.
+
+    Grams shared by more than `max_posting` titles carry little signal and
+    are skipped when collecting candidates, which keeps each lookup close to
+    constant time and the whole-catalog report close to linear.
+    """
+
+    grams: dict[int, frozenset[str]]
+    materials: dict[int, tuple[str, str]]
+    postings: dict[str, tuple[int, ...]]
+    max_posting: int
+
+    def candidates(
+        self,
+        grams: frozenset[str],
+        threshold: float,
+        exclude_id: int | None = None,
+    ) -> list[tuple[int, float]]:
+        """Return the ids and similarity of the titles close to `grams`."""
+        hits: Counter[int] = Counter()
+        for gram in grams:
+            posting = self.postings.get(gram, ())
+            if len(posting) <= self.max_posting:
+                hits.update(posting)
+        if exclude_id is not None:
+            hits.pop(exclude_id, None)
+        scored = [
+            (material_id, similarity(grams, self.grams[material_id]))
+            for material_id in hits
+        ]
+        return sorted(
+            (
+                (material_id, score)
+                for material_id, score in scored
+                if score >= threshold
+            ),
+            key=lambda item: (-item[1], item[0]),
+        )
+
+
+class DuplicateIndexStore(SnapshotStore[TrigramIndex]):
+    """Holds the trigram index of material titles, rebuilt after writes."""
+
+    def __init__(self, max_posting: int) -> None:
+        """Initialize the store."""
+        super().__init__()
+        self.max_posting = max_posting
+
+    def build(self, session: Session) -> TrigramIndex:
+        """Build the trigram index of every material title with `session`."""
+        grams: dict[int, frozenset[str]] = {}
+        materials: dict[int, tuple[str, str]] = {}
+        postings: dict[str, list[int]] = {}
+        for material_id, title, cod_ref in session.execute(
+            select(DBMaterial.id, DBMaterial.title, DBMaterial.cod_ref)
+        ):
+            grams[material_id] = trigrams(title)
+            materials[material_id] = (title, cod_ref)
+            for gram in grams[material_id]:
+                postings.setdefault(gram, []).append(material_id)
+        return TrigramIndex(
+            grams=grams,
+            materials=materials,
+            postings={gram: tuple(ids) for gram, ids in postings.items()},
+            max_posting=self.max_posting,
+        )
+
+    def invalidate(self, tags: frozenset[str]) -> None:
+        """Rebuild the index in the background if materials changed."""
+        if DBMaterial.__tablename__ in tags:
+            self.refresh()
+
+
+duplicate_index = DuplicateIndexStore(settings.DUPLICATE_MAX_POSTING)
+invalidation_bus.subscribe(duplicate_index.invalidate)
+
+
+def create_material_duplicate_index(engine: Engine) -> None:
+    """Create the trigram index of material titles on Postgres."""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_materials_title_trgm "
+                "ON materials USING GIN (title_key gin_trgm_ops)"
+            )
+        )
+
+
+def _set_postgres_threshold(session: Session) -> None:
+    """Make the pg_trgm `%` operator use the configured similarity."""
+    session.execute(
+        text("SELECT set_config('pg_trgm.similarity_threshold', :threshold, true)"),
+        {"threshold": str(settings.DUPLICATE_SIMILARITY)},
+    )
+
+
+def db_find_duplicate_candidates(
+    session: Session,
+    title: str,
+    exclude_id: int | None = None,
+    limit: int = 10,
+) -> list[DuplicateCandidate]:
+    """Find the materials whose title is similar to `title`."""
+    if not 0 < limit <= MAX_DUPLICATE_CANDIDATES:
+        raise ValueError(f"Limit must be between 1 and {MAX_DUPLICATE_CANDIDATES}.")
+    if session.get_bind().dialect.name == "postgresql":
+        _set_postgres_threshold(session)
+        rows = session.execute(
+            text(POSTGRES_CANDIDATES_QUERY),
+            {"key": fold_key(title), "exclude_id": exclude_id or 0, "limit": limit},
+        )
+        return [DuplicateCandidate(*row) for row in rows]
+
+    index = duplicate_index.get()
+    return [
+        DuplicateCandidate(material_id, *index.materials[material_id], score)
+        for material_id, score in index.candidates(
+            trigrams(title), settings.DUPLICATE_SIMILARITY, exclude_id
+        )[:limit]
+    ]
+
+
+def db_read_duplicate_report(session: Session) -> list[tuple[int, int, float]]:
+    """Find every pair of materials with similar titles."""
+    if session.get_bind().dialect.name == "postgresql":
+        _set_postgres_threshold(session)
+        rows = session.execute(text(POSTGRES_REPORT_QUERY))
+        return [(material_id, other_id, score) for material_id, other_id, score in rows]
+
+    index = duplicate_index.get()
+    pairs = [
+        (material_id, other_id, score)
+        for material_id, grams in index.grams.items()
+        for other_id, score in index.candidates(
+            grams, settings.DUPLICATE_SIMILARITY, material_id
+        )
+        if material_id < other_id
+    ]
+    return sorted(pairs, key=lambda pair: (-pair[2], pair[0], pair[1]))
@@ -1,23 +1,66 @@
 """inventory_service.py."""
 
+from collections.abc import Iterator
+from typing import Any
+
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.models.inventory import DBInventory
-from app.schemas.inventory import InventoryCreate, InventoryUpdate
-from app.services.user_service import db_read_user
-from shared.utils.deps import commit_and_refresh
+from app.models.library import DBLibrary
+from app.models.library_users import DBLibraryUser
+from app.schemas.inventory import (
+    MAX_AVAILABILITY_LOOKUP,
+    InventoryCreate,
+    InventoryFilters,
+    InventoryRead,
+    InventoryUpdate,
+)
+from config.settings import settings
+from db.database import engine
+from shared.utils.deps import CommonParameters, commit_and_refresh
 from shared.utils.errors import DeleteError, NotFoundError
+from shared.utils.fieldsets import (
+    FieldSelection,
+    Fieldset,
+    Tree,
+    build_fieldset,
+    reload_profiled,
+)
+from shared.utils.projection import project
+from shared.utils.query import QuerySpec, apply_filters, db_read_row_page
 from shared.utils.validations import (
     validate_entity_existence,
     validate_unique_constraints,
 )
 
+INVENTORY_QUERY = QuerySpec(
+    filters={
+        "id": DBInventory.id,
+        "stock": DBInventory.stock,
+        "material_id": DBInventory.material_id,
+        "library_id": DBInventory.library_id,
+    },
+    sortable={
+        "id": DBInventory.id,
+        "stock": DBInventory.stock,
+        "material_id": DBInventory.material_id,
+        "library_id": DBInventory.library_id,
+    },
+)
+
+
+def inventory_fieldset(selection: FieldSelection) -> Fieldset:
+    """Compile the `fields` and `expand` of an inventory read."""
+    return build_fieldset(InventoryRead, DBInventory, selection)
+
 
 def db_add_to_inventory(session: Session, inventory: InventoryCreate) -> DBInventory:
     """Add a new item to inventory in the database."""
     validate_unique_constraints(session, DBInventory, inventory)
     new_inventory_item = DBInventory(**inventory.model_dump(exclude_none=True))
-    return commit_and_refresh(session, new_inventory_item)
+    commit_and_refresh(session, new_inventory_item)
+    return reload_profiled(session, new_inventory_item, InventoryRead)
 
 
 def db_read_inventory(session: Session, inventory_id: int) -> DBInventory:
@@ -26,33 +69,111 @@ def db_read_inventory(session: Session, inventory_id: int) -> DBInventory:
 
 
 def db_read_inventory_item(
-    session: Session, library_id: int, material_id: int
-) -> DBInventory:
-    """Read a inventory by id from the database."""
-    inventory = (
-        session.query(DBInventory)
-        .filter_by(library_id=library_id, material_id=material_id)
-        .first()
-    )
+    session: Session,
+    library_id: int,
+    material_id: int,
+    include: Tree | None = None,
+) -> dict[str, Any]:
+    """Read an inventory item, restricted to `include`, from the database."""
+    projection = project(InventoryRead, DBInventory, include)
+    row = session.execute(
+        projection.select().where(
+            DBInventory.library_id == library_id,
+            DBInventory.material_id == material_id,
+        )
+    ).first()
+    inventory = projection.build([row])[0] if row else None
     if not inventory:
         raise NotFoundError("inventory")
     return inventory
 
 
-def db_read_inventories_me(session: Session, current_user_id: int) -> list[DBInventory]:
-    """Read a my inventories from the database."""
-    user = db_read_user(session, current_user_id)
-    libraries = user.libraries
-
-    inventories = (
-        session.query(DBInventory)
-        .filter(DBInventory.library_id.in_([library.id for library in libraries]))
-        .all()
+def db_read_inventories_me(
+    session: Session,
+    current_user_id: int,
+    commons: CommonParameters,
+    filters: InventoryFilters,
+    include: Tree | None = None,
+) -> tuple[list[dict[str, Any]], int]:
+    """Read a page of the inventories of my libraries, and the total."""
+    library_ids = select(DBLibraryUser.library_id).where(
+        DBLibraryUser.user_id == current_user_id
     )
+    projection = project(InventoryRead, DBInventory, include)
+    stmt = projection.select().where(DBInventory.library_id.in_(library_ids))
+    rows, total = db_read_row_page(session, stmt, INVENTORY_QUERY, commons, filters)
+    inventories = projection.build(rows)
 
-    if not inventories:
+    if not total:
         raise NotFoundError("inventories")
-    return inventories
+    return inventories, total
+
+
+def db_stream_inventories_me(
+    current_user_id: int,
+    filters: InventoryFilters,
+    include: Tree | None = None,
+) -> Iterator[list[dict[str, Any]]]:
+    """
+    Read every inventory of my libraries, in batches of `EXPORT_BATCH_ROWS`.
+
+    The batches are fetched lazily with their own session, since they are
+    consumed while the response streams, after the request's session closed.
+    """
+    library_ids = select(DBLibraryUser.library_id).where(
+        DBLibraryUser.user_id == current_user_id
+    )
+    projection = project(InventoryRead, DBInventory, include)
+    stmt = apply_filters(
+        projection.select().where(DBInventory.library_id.in_(library_ids)),
+        INVENTORY_QUERY,
+        CommonParameters(),
+        filters,
+    ).order_by(DBInventory.id)
+
+    def batches() -> Iterator[list[dict[str, Any]]]:
+        with Session(engine) as session:
+            result = session.execute(
+                stmt.execution_options(yield_per=settings.EXPORT_BATCH_ROWS)
+            )
+            for rows in result.partitions():
+                yield projection.build(rows)
+
+    return batches()
+
+
+def db_read_availability(
+    session: Session, material_ids: list[int]
+) -> dict[int, list[tuple[int, str, int]]]:
+    """
+    Read the libraries holding stock of each material.
+
+    One query answered from the covering availability index, plus the
+    primary key lookups of the library names.
+    """
+    if not material_ids:
+        raise ValueError("At least one material_id is required.")
+    if len(material_ids) > MAX_AVAILABILITY_LOOKUP:
+        raise ValueError(
+            f"At most {MAX_AVAILABILITY_LOOKUP} material ids can be looked up at once."
+        )
+    rows = session.execute(
+        select(
+            DBInventory.material_id,
+            DBInventory.library_id,
+            DBLibrary.name,
+            DBInventory.stock,
+        )
+        .join(DBLibrary, DBLibrary.id == DBInventory.library_id)
+        .where(DBInventory.material_id.in_(set(material_ids)), DBInventory.stock > 0)
+        .order_by(DBInventory.material_id, DBInventory.library_id)
+    )
+    availability: dict[int, list[tuple[int, str, int]]] = {
+        material_id: [] for material_id in material_ids
+    }
+    for material_id, library_id, library_name, stock in rows:
+        availability[material_id].append((library_id, library_name, stock))
+    return availability
 
 
 def db_update_inventory(
@@ -66,7 +187,8 @@ def db_update_inventory(
     inventory_data = inventory_updated.model_dump(exclude_unset=True)
     for field, value in inventory_data.items():
         setattr(db_inventory, field, value)
-    return commit_and_refresh(session, db_inventory)
+    commit_and_refresh(session, db_inventory)
+    return reload_profiled(session, db_inventory, InventoryRead)
 
 
 def db_delete_inventory(session: Session, inventory_id: int) -> bool:
@@ -1,26 +1,53 @@
 """library_service.py."""
 
+from typing import Any
+
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.models.author import DBAuthor
+from app.models.inventory import DBInventory
 from app.models.library import DBLibrary
 from app.models.library_users import DBLibraryUser
+from app.models.material import DBMaterial
+from app.models.section import DBSection
 from app.models.user import DBUser
 from app.models.user_roles import DBUserRole
 from app.schemas.library import (
+    CatalogFilters,
     LibraryCreate,
     LibraryUpdate,
 )
-from app.services.role_service import db_read_role
-from app.services.user_service import db_read_user
+from app.services.material_service import MATERIAL_QUERY
+from app.services.reference_service import RoleRef, reference_data
+from app.services.user_service import USER_QUERY, db_read_user, user_prefix_clause
+from config.settings import settings
 from shared.utils.deps import (
+    CommonParameters,
     commit_and_refresh,
 )
 from shared.utils.errors import DeleteError, NotFoundError
+from shared.utils.geo import haversine_km, ring_cells, ring_min_distance_km
+from shared.utils.query import (
+    QuerySpec,
+    apply_query_params,
+    apply_sort,
+    count_rows,
+    db_read_row_page,
+    paginate,
+)
 from shared.utils.validations import (
     validate_entity_existence,
     validate_unique_constraints,
 )
 
+MAX_NEAREST_LIBRARIES = 50
+
+CATALOG_QUERY = QuerySpec(
+    filters={**MATERIAL_QUERY.filters, "stock": DBInventory.stock},
+    sortable={**MATERIAL_QUERY.sortable, "stock": DBInventory.stock},
+)
+
 
 def db_create_library(
     session: Session, library: LibraryCreate, user_id: int
@@ -45,11 +72,140 @@ def db_read_library(
     return validate_entity_existence(session, DBLibrary, library_id)
 
 
-def db_read_library_users(session: Session, library_id: int) -> list[DBUser]:
-    """Read the users of an library from the database."""
-    library = db_read_library(session=session, library_id=library_id)
+def db_read_library_users(
+    session: Session, library_id: int, commons: CommonParameters
+) -> tuple[list[tuple[DBUser, list[RoleRef]]], int]:
+    """
+    Read a page of the members of an library with their roles, and the total.
+
+    `q` searches by username or email prefix. The page of member ids is a
+    subquery joined to their roles in the library, so the members and their
+    roles are read by a single statement.
+    """
+    db_read_library(session=session, library_id=library_id)
+    members = select(DBUser.id).join(
+        DBLibraryUser,
+        (DBLibraryUser.user_id == DBUser.id) & (DBLibraryUser.library_id == library_id),
+    )
+    if commons.q:
+        members = members.where(user_prefix_clause(commons.q))
+    members = apply_query_params(members, USER_QUERY, commons)
+    total = count_rows(session, members)
+    page = paginate(members, commons).subquery()
+
+    stmt = (
+        select(DBUser, DBUserRole.role_id)
+        .join(page, page.c.id == DBUser.id)
+        .outerjoin(
+            DBUserRole,
+            (DBUserRole.user_id == DBUser.id) & (DBUserRole.library_id == library_id),
+        )
+    )
+    roles_by_id = reference_data.get().roles_by_id
+    users: dict[int, tuple[DBUser, list[RoleRef]]] = {}
+    for user, role_id in session.execute(apply_sort(stmt, USER_QUERY, commons)):
+        _, roles = users.setdefault(user.id, (user, []))
+        if role_id is not None:
+            roles.append(roles_by_id[role_id])
+    return list(users.values()), total
+
+
+def db_read_library_catalog(
+    session: Session,
+    library_id: int,
+    commons: CommonParameters,
+    filters: CatalogFilters,
+) -> tuple[list[Any], int]:
+    """
+    Read a page of the materials held by a library with their stock, and the total.
+
+    A single joined query that projects only the catalog columns, so no
+    material, author or section entity is loaded.
+    """
+    db_read_library(session=session, library_id=library_id)
+    stmt = (
+        select(
+            DBMaterial.id,
+            DBMaterial.type,
+            DBMaterial.title,
+            DBMaterial.cod_ref,
+            DBMaterial.price,
+            DBMaterial.author_id,
+            DBAuthor.name.label("author_name"),
+            DBMaterial.section_id,
+            DBSection.name.label("section_name"),
+            DBInventory.stock,
+        )
+        .select_from(DBInventory)
+        .join(DBMaterial, DBMaterial.id == DBInventory.material_id)
+        .join(DBAuthor, DBAuthor.id == DBMaterial.author_id)
+        .join(DBSection, DBSection.id == DBMaterial.section_id)
+        .where(DBInventory.library_id == library_id)
+    )
+    return db_read_row_page(session, stmt, CATALOG_QUERY, commons, filters)
+
+
+def db_read_nearest_libraries(
+    session: Session, material_id: int, latitude: float, longitude: float, limit: int
+) -> list[tuple[DBLibrary, int, float]]:
+    """
+    Read the libraries closest to a point that have a material in stock.
 
-    return library.users
+    Grid rings around the point's cell are searched outwards, one query per
+    ring, until no library in a farther ring can beat the current results.
+    Returns each library with its stock and distance in kilometres.
+    """
+    if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        raise ValueError(f"Invalid coordinates: {latitude}, {longitude}.")
+    if not 0 < limit <= MAX_NEAREST_LIBRARIES:
+        raise ValueError(f"Limit must be between 1 and {MAX_NEAREST_LIBRARIES}.")
+    validate_entity_existence(session, DBMaterial, material_id)
+
+    size = settings.GEO_GRID_CELL_DEGREES
+    found: list[tuple[float, DBLibrary, int]] = []
+    seen: set[int] = set()
+    for ring in range(settings.GEO_MAX_RINGS + 1):
+        cells = ring_cells(latitude, longitude, size, ring)
+        rows = session.execute(
+            select(DBLibrary, DBInventory.stock)
+            .join(DBInventory, DBInventory.library_id == DBLibrary.id)
+            .where(
+                DBLibrary.grid_cell.in_(cells),
+                DBInventory.material_id == material_id,
+                DBInventory.stock > 0,
+            )
+        ).all()
+        # Rings wrap around the antimeridian, so a cell can come up twice
+        found += [
+            (
+                haversine_km(latitude, longitude, library.latitude, library.longitude),
+                library,
+                stock,
+            )
+            for library, stock in rows
+            if library.id not in seen
+        ]
+        seen.update(library.id for library, _ in rows)
+        found.sort(key=lambda item: (item[0], item[1].id))
+        if len(found) >= limit and found[limit - 1][0] <= ring_min_distance_km(
+            latitude, size, ring
+        ):
+            break
+    return [(library, stock, distance) for distance, library, stock in found[:limit]]
+
+
+def db_backfill_library_cells(session: Session) -> int:
+    """Recompute the grid cells of libraries, e.g. after the cell size changed."""
+    libraries = session.scalars(
+        select(DBLibrary).where(
+            DBLibrary.latitude.is_not(None), DBLibrary.longitude.is_not(None)
+        )
+    ).all()
+    for library in libraries:
+        # Reassigning runs the model validator that computes the cell
+        library.latitude = library.latitude
+    session.commit()
+    return len(libraries)
 
 
 def db_read_libraries_me(session: Session, current_user_id: int) -> list[DBLibrary]:
@@ -69,7 +225,7 @@ def db_add_library_user(
     user = db_read_user(session=session, user_id=user_id)
     if not user:
         raise NotFoundError(DBUser.__name__, "id", user_id)
-    role = db_read_role(session=session, role_id=role_id)
+    role = reference_data.get().get_role(role_id)
 
     library_user = (
         session.query(DBLibraryUser)
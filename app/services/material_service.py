@@ -1,32 +1,222 @@
 """material_service.py."""
 
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import func, or_, select, tuple_
 from sqlalchemy.orm import Session
 
 from app.models.material import DBMaterial
-from app.schemas.material import MaterialCreate, MaterialUpdate
-from shared.utils.deps import commit_and_refresh
+from app.schemas.material import (
+    MaterialCreate,
+    MaterialFilters,
+    MaterialLookup,
+    MaterialRead,
+    MaterialUpdate,
+)
+from shared.utils.deps import CommonParameters, commit_and_refresh
 from shared.utils.errors import DeleteError, NotFoundError
+from shared.utils.fieldsets import (
+    FieldSelection,
+    Fieldset,
+    Tree,
+    build_fieldset,
+    load_profile,
+    reload_profiled,
+)
+from shared.utils.identifiers import normalize_isbn, normalize_issn
+from shared.utils.projection import project
+from shared.utils.query import QuerySpec, apply_filters, db_read_row_page
 from shared.utils.validations import (
     validate_entity_existence,
     validate_unique_constraints,
 )
 
+MATERIAL_QUERY = QuerySpec(
+    filters={
+        "id": DBMaterial.id,
+        "type": DBMaterial.type,
+        "title": DBMaterial.title,
+        "cod_ref": DBMaterial.cod_ref,
+        "price": DBMaterial.price,
+        "author_id": DBMaterial.author_id,
+        "section_id": DBMaterial.section_id,
+    },
+    sortable={
+        "id": DBMaterial.id,
+        "type": DBMaterial.type,
+        "title": DBMaterial.title,
+        "cod_ref": DBMaterial.cod_ref,
+        "price": DBMaterial.price,
+    },
+)
+
+MATERIAL_FACETS = {
+    "type": DBMaterial.type,
+    "section_id": DBMaterial.section_id,
+    "author_id": DBMaterial.author_id,
+}
+
+
+def material_fieldset(selection: FieldSelection) -> Fieldset:
+    """Compile the `fields` and `expand` of a material read."""
+    return build_fieldset(MaterialRead, DBMaterial, selection)
+
 
 def db_create_material(session: Session, material: MaterialCreate) -> DBMaterial:
     """Create a new material in the database."""
     validate_unique_constraints(session, DBMaterial, material)
     new_material = DBMaterial(**material.model_dump(exclude_none=True))
-    return commit_and_refresh(session, new_material)
+    commit_and_refresh(session, new_material)
+    return reload_profiled(session, new_material, MaterialRead)
+
+
+def db_read_material(
+    session: Session, material_id: int, options: Sequence[Any] = ()
+) -> DBMaterial:
+    """Read a material by id from the database, with optional loader options."""
+    return validate_entity_existence(session, DBMaterial, material_id, options)
+
+
+def db_read_material_by_isbn(session: Session, isbn: str) -> DBMaterial:
+    """Read a material by ISBN-10 or ISBN-13, with or without hyphens."""
+    key = normalize_isbn(isbn)
+    material = key and (
+        session.query(DBMaterial)
+        .options(*load_profile(MaterialRead, DBMaterial))
+        .filter(DBMaterial.isbn_key == key)
+        .first()
+    )
+    if not material:
+        raise NotFoundError("Material", "isbn", isbn)
+    return material
+
+
+def db_read_material_by_issn(session: Session, issn: str) -> DBMaterial:
+    """Read a material by ISSN, with or without hyphen."""
+    key = normalize_issn(issn)
+    material = key and (
+        session.query(DBMaterial)
+        .options(*load_profile(MaterialRead, DBMaterial))
+        .filter(DBMaterial.issn_key == key)
+        .first()
+    )
+    if not material:
+        raise NotFoundError("Material", "issn", issn)
+    return material
+
+
+def db_read_material_by_cod_ref(session: Session, cod_ref: str) -> DBMaterial:
+    """Read a material by reference code."""
+    material = (
+        session.query(DBMaterial)
+        .options(*load_profile(MaterialRead, DBMaterial))
+        .filter(DBMaterial.cod_ref == cod_ref)
+        .first()
+    )
+    if not material:
+        raise NotFoundError("Material", "cod_ref", cod_ref)
+    return material
+
+
+def db_lookup_materials(session: Session, lookup: MaterialLookup) -> list[DBMaterial]:
+    """Read the materials matching any of the given identifiers in one query."""
+    conditions = []
+    # Values without identifier characters have no key and match nothing
+    isbn_keys = {normalize_isbn(isbn) for isbn in lookup.isbn} - {None}
+    issn_keys = {normalize_issn(issn) for issn in lookup.issn} - {None}
+    if isbn_keys:
+        conditions.append(DBMaterial.isbn_key.in_(isbn_keys))
+    if issn_keys:
+        conditions.append(DBMaterial.issn_key.in_(issn_keys))
+    if lookup.cod_ref:
+        conditions.append(DBMaterial.cod_ref.in_(set(lookup.cod_ref)))
+    if not conditions:
+        return []
+    return (
+        session.query(DBMaterial)
+        .options(*load_profile(MaterialRead, DBMaterial))
+        .filter(or_(*conditions))
+        .all()
+    )
+
+
+def db_backfill_material_keys(session: Session) -> int:
+    """Fill the lookup keys of materials created without them."""
+    materials = (
+        session.query(DBMaterial)
+        .filter(
+            or_(
+                DBMaterial.title_key.is_(None),
+                DBMaterial.isbn.is_not(None) & DBMaterial.isbn_key.is_(None),
+                DBMaterial.issn.is_not(None) & DBMaterial.issn_key.is_(None),
+            )
+        )
+        .all()
+    )
+    for material in materials:
+        # Reassigning runs the model validators that compute the keys
+        material.title = material.title
+        material.isbn = material.isbn
+        material.issn = material.issn
+    session.commit()
+    return len(materials)
+
+
+def db_read_materials(
+    session: Session,
+    commons: CommonParameters,
+    filters: MaterialFilters,
+    include: Tree | None = None,
+) -> tuple[list[dict[str, Any]], int]:
+    """Read a page of materials, restricted to `include`, and the total."""
+    projection = project(MaterialRead, DBMaterial, include)
+    rows, total = db_read_row_page(
+        session, projection.select(), MATERIAL_QUERY, commons, filters
+    )
+    return projection.build(rows), total
 
 
-def db_read_material(session: Session, material_id: int) -> DBMaterial:
-    """Read a material by id from the database."""
-    return validate_entity_existence(session, DBMaterial, material_id)
+def db_read_material_facets(
+    session: Session, commons: CommonParameters, filters: MaterialFilters
+) -> dict[str, list[tuple[Any, int]]]:
+    """
+    Count the materials matching a list request by type, section and author.
 
+    Postgres computes every facet in one GROUPING SETS query; other databases
+    run one GROUP BY per facet.
+    """
+    count = func.count().label("count")
+    if session.get_bind().dialect.name == "postgresql":
+        columns = list(MATERIAL_FACETS.values())
+        stmt = select(*columns, *(func.grouping(c) for c in columns), count).group_by(
+            func.grouping_sets(*(tuple_(c) for c in columns))
+        )
+        stmt = apply_filters(stmt, MATERIAL_QUERY, commons, filters)
+        facets: dict[str, list[tuple[Any, int]]] = {
+            name: [] for name in MATERIAL_FACETS
+        }
+        for row in session.execute(stmt.order_by(count.desc())):
+            values, grouping = row[: len(columns)], row[len(columns) : -1]
+            # GROUPING() is 0 for the column the row is grouped by
+            position = list(grouping).index(0)
+            facets[list(MATERIAL_FACETS)[position]].append((values[position], row[-1]))
+        return facets
 
-def db_read_materials(session: Session) -> list[DBMaterial]:
-    """Read all materials from the database."""
-    return session.query(DBMaterial).all()
+    return {
+        name: [
+            (value, total)
+            for value, total in session.execute(
+                apply_filters(
+                    select(column, count).group_by(column),
+                    MATERIAL_QUERY,
+                    commons,
+                    filters,
+                ).order_by(count.desc(), column)
+            )
+        ]
+        for name, column in MATERIAL_FACETS.items()
+    }
 
 
 def db_update_material(
@@ -38,7 +228,8 @@ def db_update_material(
     material_data = material_updated.model_dump(exclude_unset=True)
     for field, value in material_data.items():
         setattr(db_material, field, value)
-    return commit_and_refresh(session, db_material)
+    commit_and_refresh(session, db_material)
+    return reload_profiled(session, db_material, MaterialRead)
 
 
 def db_delete_material(session: Session, material_id: int) -> bool:
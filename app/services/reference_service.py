@@ -0,0 +1,146 @@
+"""
+reference_service.py.
+
+Roles and permissions are tiny and almost static, so they are loaded once into
+frozen lookup maps and reloaded only when the invalidation bus reports a write
+to one of their tables.
+"""
+
+import threading
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.permission import DBPermission
+from app.models.role import DBRole
+from app.models.role_permissions import DBRolePermission
+from db.database import engine
+from shared.utils.errors import NotFoundError
+from shared.utils.invalidation import invalidation_bus
+
+REFERENCE_TABLES = frozenset(
+    {DBRole.__tablename__, DBPermission.__tablename__, DBRolePermission.__tablename__}
+)
+
+
+@dataclass(frozen=True)
+class RoleRef:
+    """Immutable role."""
+
+    id: int
+    name: str
+    code: str
+    description: str | None
+
+
+@dataclass(frozen=True)
+class PermissionRef:
+    """Immutable permission."""
+
+    id: int
+    name: str
+    code: str
+    description: str | None
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    """Frozen lookup maps of roles, permissions and their assignments."""
+
+    roles_by_id: Mapping[int, RoleRef]
+    roles_by_name: Mapping[str, RoleRef]
+    roles_by_code: Mapping[str, RoleRef]
+    permissions_by_id: Mapping[int, PermissionRef]
+    permissions_by_name: Mapping[str, PermissionRef]
+    permissions_by_code: Mapping[str, PermissionRef]
+    role_permissions: Mapping[int, frozenset[int]]
+
+    def get_role(self, role_id: int) -> RoleRef:
+        """Return a role by id."""
+        if role_id <= 0:
+            raise ValueError(f"ID invalid: {role_id}.")
+        role = self.roles_by_id.get(role_id)
+        if role is None:
+            raise NotFoundError(DBRole.__name__, "id", role_id)
+        return role
+
+    def permission_ids(self, role_ids: Iterable[int]) -> frozenset[int]:
+        """Return the ids of the permissions granted by any of the roles."""
+        return frozenset().union(
+            *(self.role_permissions.get(role_id, frozenset()) for role_id in role_ids)
+        )
+
+    def permission_names(self, role_ids: Iterable[int]) -> frozenset[str]:
+        """Return the names of the permissions granted by any of the roles."""
+        return frozenset(
+            self.permissions_by_id[permission_id].name
+            for permission_id in self.permission_ids(role_ids)
+        )
+
+
+def load_reference_data(session: Session) -> ReferenceData:
+    """Read roles, permissions and role permissions into frozen maps."""
+    roles = [
+        RoleRef(role.id, role.name, role.code, role.description)
+        for role in session.scalars(select(DBRole))
+    ]
+    permissions = [
+        PermissionRef(
+            permission.id, permission.name, permission.code, permission.description
+        )
+        for permission in session.scalars(select(DBPermission))
+    ]
+    role_permissions: dict[int, set[int]] = {}
+    for role_id, permission_id in session.execute(
+        select(DBRolePermission.role_id, DBRolePermission.permission_id)
+    ):
+        role_permissions.setdefault(role_id, set()).add(permission_id)
+
+    return ReferenceData(
+        roles_by_id=MappingProxyType({role.id: role for role in roles}),
+        roles_by_name=MappingProxyType({role.name: role for role in roles}),
+        roles_by_code=MappingProxyType({role.code: role for role in roles}),
+        permissions_by_id=MappingProxyType({perm.id: perm for perm in permissions}),
+        permissions_by_name=MappingProxyType({perm.name: perm for perm in permissions}),
+        permissions_by_code=MappingProxyType({perm.code: perm for perm in permissions}),
+        role_permissions=MappingProxyType(
+            {role_id: frozenset(ids) for role_id, ids in role_permissions.items()}
+        ),
+    )
+
+
+class ReferenceDataStore:
+    """Holds the current reference data and reloads it after changes."""
+
+    def __init__(self) -> None:
+        """Initialize the store."""
+        self._data: ReferenceData | None = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def load(self, session: Session) -> ReferenceData:
+        """Load the reference data with `session`."""
+        with self._lock:
+            self._stale = False
+            self._data = load_reference_data(session)
+            return self._data
+
+    def get(self) -> ReferenceData:
+        """Return the reference data, reloading it if a change was reported."""
+        data = self._data
+        if data is None or self._stale:
+            with Session(engine) as session:
+                data = self.load(session)
+        return data
+
+    def invalidate(self, tags: frozenset[str]) -> None:
+        """Mark the maps stale if any reference table changed."""
+        if tags & REFERENCE_TABLES:
+            self._stale = True
+
+
+reference_data = ReferenceDataStore()
+invalidation_bus.subscribe(reference_data.invalidate)
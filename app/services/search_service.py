@@ -0,0 +1,177 @@
+"""
+search_service.py.
+
+Full-text search over materials. SQLite uses an FTS5 external-content table
+kept in sync by triggers, with prefix indexes for the prefix queries; Postgres
+uses a GIN index over a tsvector expression.
+
+Matches are ranked to pick a page, but only the hits of that page are joined
+to materials and get a snippet, and the total is counted only up to a cap.
+"""
+
+import re
+from typing import Any
+
+from sqlalchemy import Engine, text
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+
+SEARCH_DOCUMENT = (
+    "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))"
+)
+
+SQLITE_SEARCH_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS materials_fts USING fts5("
+    "title, description, content='materials', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')"
+)
+
+SQLITE_SEARCH_DDL = [
+    (
+        "CREATE TRIGGER IF NOT EXISTS materials_fts_ai AFTER INSERT ON materials BEGIN "
+        "INSERT INTO materials_fts(rowid, title, description) "
+        "VALUES (new.id, new.title, new.description); END"
+    ),
+    (
+        "CREATE TRIGGER IF NOT EXISTS materials_fts_ad AFTER DELETE ON materials BEGIN "
+        "INSERT INTO materials_fts(materials_fts, rowid, title, description) "
+        "VALUES ('delete', old.id, old.title, old.description); END"
+    ),
+    (
+        "CREATE TRIGGER IF NOT EXISTS materials_fts_au "
+        "AFTER UPDATE OF title, description ON materials BEGIN "
+        "INSERT INTO materials_fts(materials_fts, rowid, title, description) "
+        "VALUES ('delete', old.id, old.title, old.description); "
+        "INSERT INTO materials_fts(rowid, title, description) "
+        "VALUES (new.id, new.title, new.description); END"
+    ),
+]
+
+SQLITE_SEARCH_QUERY = """
+    WITH page AS (
+        SELECT rowid AS id, -bm25(materials_fts, 10.0, 1.0) AS rank
+        FROM materials_fts
+        WHERE materials_fts MATCH :query
+        ORDER BY rank DESC, rowid
+        LIMIT :limit OFFSET :offset
+    )
+    SELECT m.id, m.type, m.title, m.cod_ref, page.rank,
+           snippet(materials_fts, -1, '<b>', '</b>', '...', 12) AS snippet
+    FROM page
+    JOIN materials_fts ON materials_fts.rowid = page.id
+    JOIN materials AS m ON m.id = page.id
+    WHERE materials_fts MATCH :query
+    ORDER BY page.rank DESC, m.id
+"""
+
+SQLITE_COUNT_QUERY = """
+    SELECT COUNT(*) FROM (
+        SELECT 1 FROM materials_fts WHERE materials_fts MATCH :query LIMIT :cap
+    )
+"""
+
+POSTGRES_SEARCH_QUERY = f"""
+    WITH page AS (
+        SELECT id, ts_rank({SEARCH_DOCUMENT}, to_tsquery('simple', :query)) AS rank
+        FROM materials
+        WHERE {SEARCH_DOCUMENT} @@ to_tsquery('simple', :query)
+        ORDER BY rank DESC, id
+        LIMIT :limit OFFSET :offset
+    )
+    SELECT m.id, m.type, m.title, m.cod_ref, page.rank,
+           ts_headline(
+               'simple',
+               coalesce(title, '') || ' ' || coalesce(description, ''),
+               to_tsquery('simple', :query),
+               'StartSel=<b>, StopSel=</b>, MaxWords=12, MinWords=4'
+           ) AS snippet
+    FROM page JOIN materials AS m ON m.id = page.id
+    ORDER BY page.rank DESC, m.id
+"""
+
+POSTGRES_COUNT_QUERY = f"""
+    SELECT COUNT(*) FROM (
+        SELECT 1 FROM materials
+        WHERE {SEARCH_DOCUMENT} @@ to_tsquery('simple', :query)
+        LIMIT :cap
+    ) AS matches
+"""
+
+
+def create_material_search_index(engine: Engine) -> None:
+    """Create the full-text index of materials if it does not exist."""
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_materials_search "
+                    f"ON materials USING GIN ({SEARCH_DOCUMENT})"
+                )
+            )
+            return
+
+        existing = conn.execute(
+            text("SELECT sql FROM sqlite_master WHERE name = 'materials_fts'")
+        ).scalar()
+        if existing is not None and "prefix=" not in existing:
+            # Created before the prefix indexes: options are fixed at creation
+            conn.execute(text("DROP TABLE materials_fts"))
+            existing = None
+        is_new = existing is None
+        conn.execute(text(SQLITE_SEARCH_TABLE))
+        for statement in SQLITE_SEARCH_DDL:
+            conn.execute(text(statement))
+        if is_new:
+            conn.execute(
+                text("INSERT INTO materials_fts(materials_fts) VALUES ('rebuild')")
+            )
+
+
+def reindex_material_search(session: Session) -> None:
+    """Rebuild the full-text index of materials from the materials table."""
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(text("REINDEX INDEX ix_materials_search"))
+    else:
+        session.execute(
+            text("INSERT INTO materials_fts(materials_fts) VALUES ('rebuild')")
+        )
+    session.commit()
+
+
+def _build_search_query(q: str, dialect: str) -> str:
+    """Turn free text into a prefix query: every word must match."""
+    words = re.findall(r"\w+", q)
+    if not words:
+        raise ValueError("Search query must contain at least one word.")
+    if dialect == "postgresql":
+        return " & ".join(f"{word}:*" for word in words)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def db_search_materials(
+    session: Session, q: str, offset: int, limit: int
+) -> tuple[list[Any], int, bool]:
+    """
+    Search materials by title and description, ranked by relevance.
+
+    Return the page of hits, the total and whether the total was capped. The
+    total is exact up to `SEARCH_COUNT_LIMIT` matches; past it, counting stops
+    there or one past the page, enough to tell that a next page exists.
+    """
+    dialect = session.get_bind().dialect.name
+    query = _build_search_query(q, dialect)
+    if dialect == "postgresql":
+        search_sql, count_sql = POSTGRES_SEARCH_QUERY, POSTGRES_COUNT_QUERY
+    else:
+        search_sql, count_sql = SQLITE_SEARCH_QUERY, SQLITE_COUNT_QUERY
+
+    cap = max(offset + limit + 1, settings.SEARCH_COUNT_LIMIT)
+    # One more than the cap, to tell a total of exactly `cap` from a capped one
+    counted: int = session.execute(
+        text(count_sql), {"query": query, "cap": cap + 1}
+    ).scalar_one()
+    hits = session.execute(
+        text(search_sql), {"query": query, "offset": offset, "limit": limit}
+    ).all()
+    return list(hits), min(counted, cap), counted > cap
@@ -1,16 +1,32 @@
 """section_service.py."""
 
+from collections.abc import Sequence
+from typing import Any
+
 from sqlalchemy.orm import Session
 
 from app.models.section import DBSection
-from app.schemas.section import SectionCreate, SectionUpdate
-from shared.utils.deps import commit_and_refresh
+from app.schemas.section import SectionCreate, SectionRead, SectionUpdate
+from shared.utils.deps import CommonParameters, commit_and_refresh
 from shared.utils.errors import DeleteError, NotFoundError
+from shared.utils.fieldsets import FieldSelection, Fieldset, Tree, build_fieldset
+from shared.utils.projection import project
+from shared.utils.query import QuerySpec, db_read_row_page
 from shared.utils.validations import (
     validate_entity_existence,
     validate_unique_constraints,
 )
 
+SECTION_QUERY = QuerySpec(
+    filters={"id": DBSection.id, "name": DBSection.name},
+    sortable={"id": DBSection.id, "name": DBSection.name},
+)
+
+
+def section_fieldset(selection: FieldSelection) -> Fieldset:
+    """Compile the `fields` of a section read."""
+    return build_fieldset(SectionRead, DBSection, selection)
+
 
 def db_create_section(session: Session, section: SectionCreate) -> DBSection:
     """Create a new section in the database."""
@@ -19,14 +35,20 @@ def db_create_section(session: Session, section: SectionCreate) -> DBSection:
     return commit_and_refresh(session, new_section)
 
 
-def db_read_section(session: Session, section_id: int) -> DBSection:
-    """Read a section by id from the database."""
-    return validate_entity_existence(session, DBSection, section_id)
+def db_read_section(
+    session: Session, section_id: int, options: Sequence[Any] = ()
+) -> DBSection:
+    """Read a section by id from the database, with optional loader options."""
+    return validate_entity_existence(session, DBSection, section_id, options)
 
 
-def db_read_sections(session: Session) -> list[DBSection]:
-    """Read all sections from the database."""
-    return session.query(DBSection).all()
+def db_read_sections(
+    session: Session, commons: CommonParameters, include: Tree | None = None
+) -> tuple[list[dict[str, Any]], int]:
+    """Read a page of sections, restricted to `include`, and the total."""
+    projection = project(SectionRead, DBSection, include)
+    rows, total = db_read_row_page(session, projection.select(), SECTION_QUERY, commons)
+    return projection.build(rows), total
 
 
 def db_update_section(
@@ -0,0 +1,121 @@
+"""
+suggest_service.py.
+
+Prefix autocomplete over material titles and author names. Matches are read
+from the folded key columns with an index range scan or, when enabled, from
+an in-memory sorted snapshot rebuilt in the background after writes to the
+source table.
+"""
+
+import bisect
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.orm import InstrumentedAttribute, Session
+
+from app.models.author import DBAuthor
+from app.models.material import DBMaterial
+from config.settings import settings
+from shared.utils.identifiers import fold_key, prefix_upper_bound
+from shared.utils.invalidation import invalidation_bus
+from shared.utils.query import bytewise
+from shared.utils.snapshot import SnapshotStore
+
+MAX_SUGGESTIONS = 50
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    """A prefix match."""
+
+    id: int
+    label: str
+
+
+@dataclass(frozen=True)
+class SuggestIndex:
+    """Immutable snapshot of the keys of a table, sorted for prefix lookups."""
+
+    keys: tuple[tuple[str, int], ...]
+    labels: tuple[str, ...]
+
+    def match(self, prefix: str, limit: int) -> list[Suggestion]:
+        """Return the first `limit` entries whose key starts with `prefix`."""
+        start = bisect.bisect_left(self.keys, (prefix, 0))
+        stop = bisect.bisect_left(self.keys, (prefix_upper_bound(prefix), 0))
+        return [
+            Suggestion(self.keys[i][1], self.labels[i])
+            for i in range(start, min(stop, start + limit))
+        ]
+
+
+class SuggestSource(SnapshotStore[SuggestIndex]):
+    """Prefix matches over the folded key column of one table."""
+
+    def __init__(
+        self,
+        key: InstrumentedAttribute[Any],
+        id: InstrumentedAttribute[Any],
+        label: InstrumentedAttribute[Any],
+    ) -> None:
+        """Initialize the source."""
+        super().__init__()
+        self.key = key
+        self.id = id
+        self.label = label
+        self.table = key.class_.__tablename__
+
+    def build(self, session: Session) -> SuggestIndex:
+        """Build the in-memory snapshot of the table with `session`."""
+        rows = session.execute(
+            select(self.key, self.id, self.label)
+            .where(self.key.is_not(None))
+            .order_by(bytewise(self.key), self.id)
+        ).all()
+        return SuggestIndex(
+            keys=tuple((key, row_id) for key, row_id, _ in rows),
+            labels=tuple(label for _, _, label in rows),
+        )
+
+    def invalidate(self, tags: frozenset[str]) -> None:
+        """Rebuild the snapshot in the background if the source table changed."""
+        if self.table in tags:
+            self.refresh()
+
+    def suggest(self, session: Session, prefix: str, limit: int) -> list[Suggestion]:
+        """Return up to `limit` rows whose folded label starts with `prefix`."""
+        key = fold_key(prefix)
+        if not key:
+            raise ValueError("Query parameter 'prefix' must not be empty.")
+        if not 0 < limit <= MAX_SUGGESTIONS:
+            raise ValueError(f"Limit must be between 1 and {MAX_SUGGESTIONS}.")
+        if settings.SUGGEST_IN_MEMORY:
+            return self.get().match(key, limit)
+
+        column = bytewise(self.key)
+        rows = session.execute(
+            select(self.id, self.label)
+            .where(column >= key, column < prefix_upper_bound(key))
+            .order_by(column, self.id)
+            .limit(limit)
+        ).all()
+        return [Suggestion(row_id, label) for row_id, label in rows]
+
+
+material_suggestions = SuggestSource(
+    DBMaterial.title_key, DBMaterial.id, DBMaterial.title
+)
+author_suggestions = SuggestSource(DBAuthor.name_key, DBAuthor.id, DBAuthor.name)
+invalidation_bus.subscribe(material_suggestions.invalidate)
+invalidation_bus.subscribe(author_suggestions.invalidate)
+
+
+def db_suggest_materials(session: Session, prefix: str, limit: int) -> list[Suggestion]:
+    """Suggest materials whose title starts with `prefix`."""
+    return material_suggestions.suggest(session, prefix, limit)
+
+
+def db_suggest_authors(session: Session, prefix: str, limit: int) -> list[Suggestion]:
+    """Suggest authors whose name starts with `prefix`."""
+    return author_suggestions.suggest(session, prefix, limit)
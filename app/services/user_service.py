@@ -1,16 +1,23 @@
 """contact_service.py."""
 
+from collections.abc import Sequence
+from typing import Any
+
 from passlib.context import CryptContext
+from sqlalchemy import ColumnElement, or_, select
 from sqlalchemy.orm import Session
 
 from app.models.library import DBLibrary
-from app.models.role import DBRole
-from app.models.role_permissions import DBRolePermission
 from app.models.user import DBUser
 from app.models.user_roles import DBUserRole
 from app.schemas.user import UserCreate, UserUpdate
-from shared.utils.deps import commit_and_refresh
+from app.schemas.user_role import UserRoleRead
+from app.services.reference_service import RoleRef, reference_data
+from shared.utils.deps import CommonParameters, commit_and_refresh
 from shared.utils.errors import AuthorizationError, NotFoundError
+from shared.utils.fieldsets import load_profile
+from shared.utils.identifiers import fold_email, fold_key, prefix_upper_bound
+from shared.utils.query import QuerySpec, bytewise, db_read_page
 from shared.utils.validations import (
     validate_email_format,
     validate_entity_existence,
@@ -19,6 +26,11 @@ from shared.utils.validations import (
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+USER_QUERY = QuerySpec(
+    filters={"id": DBUser.id, "username": DBUser.username, "email": DBUser.email},
+    sortable={"id": DBUser.id, "username": DBUser.username, "email": DBUser.email},
+)
+
 
 def get_password_hash(password: str) -> str:
     """Get password hash."""
@@ -43,17 +55,64 @@ def db_read_user(session: Session, user_id: int) -> DBUser:
     return validate_entity_existence(session, DBUser, user_id)
 
 
-def db_read_user_by_email(session: Session, email: str) -> DBUser:
+def user_prefix_clause(prefix: str) -> ColumnElement[bool]:
+    """Match users whose username or email starts with `prefix`, as index ranges."""
+    key = fold_key(prefix)
+    if not key:
+        raise ValueError("Search prefix must not be empty.")
+    email = fold_email(prefix)
+    username_key, email_key = bytewise(DBUser.username_key), bytewise(DBUser.email_key)
+    return or_(
+        (username_key >= key) & (username_key < prefix_upper_bound(key)),
+        (email_key >= email) & (email_key < prefix_upper_bound(email)),
+    )
+
+
+def db_read_users(
+    session: Session, commons: CommonParameters
+) -> tuple[list[DBUser], int]:
+    """Read a page of users, optionally by username or email prefix `q`."""
+    stmt = select(DBUser)
+    if commons.q:
+        stmt = stmt.where(user_prefix_clause(commons.q))
+    return db_read_page(session, stmt, USER_QUERY, commons)
+
+
+def db_backfill_user_keys(session: Session) -> int:
+    """Fill the username and email keys of users created without them."""
+    users = session.scalars(
+        select(DBUser).where(
+            or_(DBUser.username_key.is_(None), DBUser.email_key.is_(None))
+        )
+    ).all()
+    for user in users:
+        # Reassigning runs the model validators that compute the keys
+        user.username = user.username
+        user.email = user.email
+    session.commit()
+    return len(users)
+
+
+def db_read_user_by_email(
+    session: Session, email: str, options: Sequence[Any] = ()
+) -> DBUser:
     """Read a user from the database by email."""
-    user = session.query(DBUser).filter(DBUser.email == email).first()
+    user = session.query(DBUser).options(*options).filter(DBUser.email == email).first()
     if not user:
         raise NotFoundError("User")
     return user
 
 
-def db_read_user_by_username(session: Session, username: str) -> DBUser:
+def db_read_user_by_username(
+    session: Session, username: str, options: Sequence[Any] = ()
+) -> DBUser:
     """Read a user from the database by username."""
-    user = session.query(DBUser).filter(DBUser.username == username).first()
+    user = (
+        session.query(DBUser)
+        .options(*options)
+        .filter(DBUser.username == username)
+        .first()
+    )
     if not user:
         raise NotFoundError("User", "username", username)
 
@@ -61,18 +120,27 @@ def db_read_user_by_username(session: Session, username: str) -> DBUser:
 
 
 def db_read_user_by_email_or_username(
-    session: Session, email_or_username: str
+    session: Session, email_or_username: str, options: Sequence[Any] = ()
 ) -> DBUser:
     """Read a user from the database by email or username."""
     try:
-        user = db_read_user_by_email(session=session, email=email_or_username)
+        user = db_read_user_by_email(
+            session=session, email=email_or_username, options=options
+        )
     except NotFoundError:
-        user = db_read_user_by_username(session=session, username=email_or_username)
+        user = db_read_user_by_username(
+            session=session, username=email_or_username, options=options
+        )
     return user
 
 
+def user_role_read_options() -> tuple[Any, ...]:
+    """Return the loader options of user roles read with their role."""
+    return load_profile(UserRoleRead, DBUserRole)
+
+
 def db_read_user_roles_by_library(
-    session: Session, user_id: int, library_id: int
+    session: Session, user_id: int, library_id: int, options: Sequence[Any] = ()
 ) -> list[DBUserRole]:
     """Read the roles of a user in a library from the database."""
     user = db_read_user(session=session, user_id=user_id)
@@ -80,28 +148,13 @@ def db_read_user_roles_by_library(
         raise AuthorizationError
     user_roles = (
         session.query(DBUserRole)
+        .options(*options)
         .filter(DBUserRole.user_id == user_id, DBUserRole.library_id == library_id)
         .all()
     )
     return user_roles
 
 
-def db_read_user_permissions_by_library(
-    session: Session, user_id: int, library_id: int
-) -> list[DBRolePermission]:
-    """Read the permissions of a user in an library from the database."""
-    user_roles = db_read_user_roles_by_library(
-        session=session, user_id=user_id, library_id=library_id
-    )
-    roles_ids = [role.role_id for role in user_roles]
-    permissions = (
-        session.query(DBRolePermission)
-        .filter(DBRolePermission.role_id.in_(roles_ids))
-        .all()
-    )
-    return permissions
-
-
 def db_read_user_libraries(session: Session, user_id: int) -> list[DBLibrary]:
     """Read the libraries of a user from the database."""
     user = db_read_user(session=session, user_id=user_id)
@@ -110,7 +163,7 @@ def db_read_user_libraries(session: Session, user_id: int) -> list[DBLibrary]:
 
 def db_read_user_library_roles(
     session: Session, user_id: int, library_id: int
-) -> list[DBRole]:
+) -> list[RoleRef]:
     """Read the roles of a user in an library from the database."""
     user = db_read_user(session=session, user_id=user_id)
     if library_id not in [org.id for org in user.libraries]:
@@ -122,13 +175,14 @@ def db_read_user_library_roles(
     )
     if not user_roles:
         raise NotFoundError("Roles")
-    roles: list[DBRole] = [user_role.role for user_role in user_roles]
+    roles_by_id = reference_data.get().roles_by_id
+    roles: list[RoleRef] = [roles_by_id[user_role.role_id] for user_role in user_roles]
     return roles
 
 
 def db_read_user_library_with_roles(
     session: Session, user_id: int, library_id: int
-) -> list[DBRole]:
+) -> list[RoleRef]:
     """Read the roles of a user in an library from the database."""
     user = db_read_user(session=session, user_id=user_id)
     if library_id not in [org.id for org in user.libraries]:
@@ -141,7 +195,8 @@ def db_read_user_library_with_roles(
     if not user_roles:
         raise NotFoundError("Roles")
 
-    roles: list[DBRole] = [user_role.role for user_role in user_roles]
+    roles_by_id = reference_data.get().roles_by_id
+    roles: list[RoleRef] = [roles_by_id[user_role.role_id] for user_role in user_roles]
     return roles
 
 
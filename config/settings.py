@@ -39,5 +39,96 @@ class Settings:
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
+    # Response cache: "memory" (LRU per worker) or "sqlite" (shared by workers)
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_SQLITE_PATH: str = os.getenv("CACHE_SQLITE_PATH", "cache.db")
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES", "67108864"))  # 64 MiB
+    CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+
+    # Cache invalidation bus: "local", "socket", "sqlite" or "postgres"
+    INVALIDATION_TRANSPORT: str = os.getenv("INVALIDATION_TRANSPORT", "local")
+    INVALIDATION_SOCKET_DIR: str = os.getenv("INVALIDATION_SOCKET_DIR", "")
+    INVALIDATION_POLL_INTERVAL_MS: int = int(
+        os.getenv("INVALIDATION_POLL_INTERVAL_MS", "50")
+    )
+    INVALIDATION_CHANNEL: str = os.getenv("INVALIDATION_CHANNEL", "cache_invalidation")
+
+    # Single-flight coalescing of hot reads
+    COALESCE_MAX_WAIT_MS: int = int(os.getenv("COALESCE_MAX_WAIT_MS", "2000"))
+    COALESCE_MAX_TRACKED_KEYS: int = int(os.getenv("COALESCE_MAX_TRACKED_KEYS", "1024"))
+
+    # Full-text search: matches counted exactly up to this many, past it the
+    # total only reaches one past the requested page
+    SEARCH_COUNT_LIMIT: int = int(os.getenv("SEARCH_COUNT_LIMIT", "1000"))
+
+    # Prefix autocomplete from an in-memory snapshot instead of index scans
+    SUGGEST_IN_MEMORY: bool = os.getenv("SUGGEST_IN_MEMORY", "true").lower() == "true"
+
+    # Near-duplicate detection of material titles by trigram similarity
+    DUPLICATE_SIMILARITY: float = float(os.getenv("DUPLICATE_SIMILARITY", "0.6"))
+    DUPLICATE_MAX_POSTING: int = int(os.getenv("DUPLICATE_MAX_POSTING", "1000"))
+
+    # Nearest-library search: grid cell size and how many rings to expand
+    GEO_GRID_CELL_DEGREES: float = float(os.getenv("GEO_GRID_CELL_DEGREES", "0.5"))
+    GEO_MAX_RINGS: int = int(os.getenv("GEO_MAX_RINGS", "40"))
+
+    # Rows per database fetch and per Arrow record batch of bulk responses
+    EXPORT_BATCH_ROWS: int = int(os.getenv("EXPORT_BATCH_ROWS", "10000"))
+
+    # Response compression: bodies below the minimum size are sent as is
+    COMPRESSION_MINIMUM_SIZE: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1000"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+    COMPRESSION_ZSTD_LEVEL: int = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+    # Rate limiting: token buckets per user, or per IP when anonymous, spent
+    # locally and flushed to a "memory" (per worker) or "database" store
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_PER_MINUTE", "100"))
+    RATE_LIMIT_BURST: float = float(os.getenv("RATE_LIMIT_BURST", "100"))
+    RATE_LIMIT_STORE: str = os.getenv("RATE_LIMIT_STORE", "memory")
+    RATE_LIMIT_SYNC_MS: int = int(os.getenv("RATE_LIMIT_SYNC_MS", "250"))
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+
+    # Login throttling: failed attempts per username and per IP in a sliding
+    # window, kept in "memory" (per worker) or in the "database"
+    LOGIN_THROTTLE_STORE: str = os.getenv("LOGIN_THROTTLE_STORE", "memory")
+    LOGIN_THROTTLE_WINDOW_SECONDS: float = float(
+        os.getenv("LOGIN_THROTTLE_WINDOW_SECONDS", "900")
+    )
+    LOGIN_THROTTLE_USER_FAILURES: int = int(
+        os.getenv("LOGIN_THROTTLE_USER_FAILURES", "5")
+    )
+    LOGIN_THROTTLE_IP_FAILURES: int = int(os.getenv("LOGIN_THROTTLE_IP_FAILURES", "20"))
+    LOGIN_THROTTLE_BACKOFF_SECONDS: float = float(
+        os.getenv("LOGIN_THROTTLE_BACKOFF_SECONDS", "30")
+    )
+    LOGIN_THROTTLE_MAX_BACKOFF_SECONDS: float = float(
+        os.getenv("LOGIN_THROTTLE_MAX_BACKOFF_SECONDS", "3600")
+    )
+    LOGIN_THROTTLE_MAX_KEYS: int = int(os.getenv("LOGIN_THROTTLE_MAX_KEYS", "10000"))
+
+    # Load shedding: adaptive (AIMD) limit of requests in flight per route
+    # class; requests over it wait up to SHEDDING_MAX_QUEUE_MS, then get a 503
+    SHEDDING_ENABLED: bool = os.getenv("SHEDDING_ENABLED", "true").lower() == "true"
+    SHEDDING_INITIAL_LIMIT: float = float(os.getenv("SHEDDING_INITIAL_LIMIT", "20"))
+    SHEDDING_MIN_LIMIT: float = float(os.getenv("SHEDDING_MIN_LIMIT", "2"))
+    SHEDDING_MAX_LIMIT: float = float(os.getenv("SHEDDING_MAX_LIMIT", "200"))
+    SHEDDING_READ_TARGET_MS: float = float(os.getenv("SHEDDING_READ_TARGET_MS", "500"))
+    SHEDDING_WRITE_TARGET_MS: float = float(
+        os.getenv("SHEDDING_WRITE_TARGET_MS", "1000")
+    )
+    SHEDDING_AUTH_TARGET_MS: float = float(os.getenv("SHEDDING_AUTH_TARGET_MS", "1500"))
+    SHEDDING_MAX_QUEUE_MS: float = float(os.getenv("SHEDDING_MAX_QUEUE_MS", "100"))
+    SHEDDING_MAX_QUEUE: int = int(os.getenv("SHEDDING_MAX_QUEUE", "50"))
+    # Share of the limit authenticated writes may use on top of it
+    SHEDDING_PRIORITY_HEADROOM: float = float(
+        os.getenv("SHEDDING_PRIORITY_HEADROOM", "0.25")
+    )
+    SHEDDING_RETRY_AFTER_SECONDS: int = int(
+        os.getenv("SHEDDING_RETRY_AFTER_SECONDS", "1")
+    )
+
 
 settings = Settings()
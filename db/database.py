@@ -1,7 +1,8 @@
 """database.py."""
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateColumn
 
 from app.models.base import Base
 
@@ -11,9 +12,42 @@ sqlite_url = f"sqlite:///{sqlite_file_name}"
 engine = create_engine(sqlite_url, echo=False)
 SessionLocal = sessionmaker(bind=engine)
 
+# Indexes once declared in the models and since superseded by others
+RETIRED_INDEXES = (
+    # Replaced by ix_inventory_availability, which leads with material_id
+    "ix_inventory_material_id",
+)
+
 
 def create_db_and_tables() -> None:
     """Create the database and tables."""
     from app import models  # noqa: F401 #  type: ignore
 
     Base.metadata.create_all(engine)
+    upgrade_db_schema()
+
+
+def upgrade_db_schema() -> None:
+    """
+    Add the columns and indexes declared in the models but missing in the database.
+
+    `create_all` only creates missing tables, so databases created before a
+    model gained a nullable column or an index are brought up to date here.
+    Retired indexes are dropped, so they stop slowing down writes.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    conn.execute(
+                        text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}")
+                    )
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+        for name in RETIRED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
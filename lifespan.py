@@ -19,9 +19,19 @@ from app.models.role_permissions import DBRolePermission
 from app.models.section import DBSection
 from app.models.user import DBUser
 from app.models.user_roles import DBUserRole
+from app.services.author_service import db_backfill_author_keys
+from app.services.duplicate_service import create_material_duplicate_index
+from app.services.library_service import db_backfill_library_cells
+from app.services.material_service import db_backfill_material_keys
+from app.services.reference_service import reference_data
+from app.services.search_service import create_material_search_index
+from app.services.user_service import db_backfill_user_keys
 from db.database import create_db_and_tables, engine
-from shared.utils.deps import commit_and_refresh
+from shared.utils.deps import commit_and_refresh, release_session
 from shared.utils.enums import MaterialType
+from shared.utils.invalidation import invalidation_bus
+from shared.utils.query import create_bytewise_indexes
+from shared.utils.ratelimit import rate_limiter
 
 entities: dict[str, Any] = {
     "user1": DBUser(
@@ -282,6 +292,13 @@ async def lifespan(life_app: FastAPI) -> AsyncGenerator[None, None]:
     """Lifespan context manager."""
     life_app.version = "0.1.0"
     create_db_and_tables()
+    create_material_search_index(engine)
+    create_material_duplicate_index(engine)
+    create_bytewise_indexes(
+        DBMaterial.title_key, DBAuthor.name_key, DBUser.username_key, DBUser.email_key
+    )
+    invalidation_bus.start()
+    rate_limiter.start()
     session: Session | None = None
     try:
         with Session(engine) as session:
@@ -294,6 +311,12 @@ async def lifespan(life_app: FastAPI) -> AsyncGenerator[None, None]:
                     create_entity(session, entity)
 
                 session.close_all()
+            db_backfill_material_keys(session)
+            db_backfill_author_keys(session)
+            db_backfill_library_cells(session)
+            db_backfill_user_keys(session)
+            reference_data.load(session)
+            release_session(session)
             yield
     except SQLAlchemyError as e:
         if session is not None:
@@ -303,6 +326,8 @@ async def lifespan(life_app: FastAPI) -> AsyncGenerator[None, None]:
     finally:
         if session is not None:
             session.close()
+        invalidation_bus.stop()
+        rate_limiter.stop()
 
 
 def create_entity(
@@ -0,0 +1,40 @@
+"""manage.py.
+
+Maintenance commands, e.g. `uv run python manage.py reindex-search`.
+"""
+
+import argparse
+
+from sqlalchemy.orm import Session
+
+from app.services.search_service import (
+    create_material_search_index,
+    reindex_material_search,
+)
+from db.database import create_db_and_tables, engine
+
+
+def reindex_search() -> None:
+    """Rebuild the full-text index of materials."""
+    create_db_and_tables()
+    create_material_search_index(engine)
+    with Session(engine) as session:
+        reindex_material_search(session)
+    print("Material search index rebuilt")
+
+
+COMMANDS = {
+    "reindex-search": reindex_search,
+}
+
+
+def main() -> None:
+    """Run a maintenance command."""
+    parser = argparse.ArgumentParser(description="library-api maintenance commands")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    COMMANDS[args.command]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,492 @@
+"""
+cache.py.
+
+Response cache for read endpoints. Serialized bodies are stored by route and
+query params and grouped by tags (table names); the invalidation bus evicts
+every response built from a table once a write to it commits.
+"""
+
+import inspect
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+
+from config.settings import settings
+from shared.utils.compression import add_vary, choose_encoding, compress_body
+from shared.utils.invalidation import invalidation_bus
+from shared.utils.negotiation import preferred_media_type
+from shared.utils.serialization import get_adapter
+
+
+@dataclass
+class CacheEntry:
+    """A cached response body."""
+
+    body: bytes
+    tags: frozenset[str]
+    expires_at: float
+
+
+class CacheBackend(ABC):
+    """Base class for response cache backends."""
+
+    name = "base"
+
+    @abstractmethod
+    def get(self, key: str) -> bytes | None:
+        """Return the body stored under `key`, or None."""
+
+    @abstractmethod
+    def generations(self, tags: Sequence[str]) -> tuple[int, ...]:
+        """Return the invalidation count of each of `tags`."""
+
+    @abstractmethod
+    def set(
+        self,
+        key: str,
+        body: bytes,
+        tags: Sequence[str],
+        ttl: float,
+        generations: tuple[int, ...] | None = None,
+    ) -> None:
+        """
+        Store `body` under `key`, indexed by `tags`.
+
+        With `generations`, the body is only stored if none of `tags` was
+        invalidated since they were read, so a response built while a write
+        was landing is not cached after its tags were already evicted.
+        """
+
+    @abstractmethod
+    def invalidate_tags(self, tags: Sequence[str]) -> int:
+        """
+        Evict every entry indexed by any of `tags` and bump their generations.
+
+        Return the evicted count.
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Evict every entry."""
+
+    @abstractmethod
+    def size(self) -> tuple[int, int]:
+        """Return the number of entries and the bytes they hold."""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-worker LRU cache bounded by entry count and byte size."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        """Initialize the backend."""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._tags: dict[str, set[str]] = {}
+        self._generations: dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        """Return the body stored under `key`, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry.body
+
+    def generations(self, tags: Sequence[str]) -> tuple[int, ...]:
+        """Return the invalidation count of each of `tags`."""
+        with self._lock:
+            return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def set(
+        self,
+        key: str,
+        body: bytes,
+        tags: Sequence[str],
+        ttl: float,
+        generations: tuple[int, ...] | None = None,
+    ) -> None:
+        """Store `body` under `key`, indexed by `tags`, if they are unchanged."""
+        if len(body) > self.max_bytes:
+            return
+        entry = CacheEntry(body, frozenset(tags), time.monotonic() + ttl)
+        with self._lock:
+            if generations is not None and generations != tuple(
+                self._generations.get(tag, 0) for tag in tags
+            ):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_tags(self, tags: Sequence[str]) -> int:
+        """Evict every entry indexed by any of `tags`. Return the evicted count."""
+        evicted = 0
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                for key in self._tags.pop(tag, set()):
+                    if key in self._entries:
+                        self._remove(key)
+                        evicted += 1
+        return evicted
+
+    def clear(self) -> None:
+        """Evict every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def size(self) -> tuple[int, int]:
+        """Return the number of entries and the bytes they hold."""
+        return len(self._entries), self._bytes
+
+    def _remove(self, key: str) -> None:
+        """Drop `key` from the entries and the tag index. Caller holds the lock."""
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class SqliteCacheBackend(CacheBackend):
+    """
+    Cache shared by every worker on a host through a SQLite file.
+
+    Tag generations live in the file too, so the race guard of `set` holds
+    across workers: a worker never stores a response whose tags another
+    worker invalidated while it was being built.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, max_entries: int, max_bytes: int) -> None:
+        """Initialize the backend and create its tables."""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "key TEXT PRIMARY KEY, body BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_tags ("
+                "tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS cache_tags_key ON cache_tags (key)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_generations ("
+                "tag TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+            )
+            # However an entry goes (expiry, eviction, invalidation of another
+            # of its tags), its tag rows go with it
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS cache_entries_delete "
+                "AFTER DELETE ON cache_entries BEGIN "
+                "DELETE FROM cache_tags WHERE key = OLD.key; END"
+            )
+            # Tag rows orphaned before the trigger existed
+            self._conn.execute(
+                "DELETE FROM cache_tags WHERE key NOT IN (SELECT key FROM cache_entries)"
+            )
+
+    def get(self, key: str) -> bytes | None:
+        """Return the body stored under `key`, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM cache_entries WHERE key = ? AND expires_at >= ?",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def generations(self, tags: Sequence[str]) -> tuple[int, ...]:
+        """Return the invalidation count of each of `tags`."""
+        placeholders = ", ".join("?" for _ in tags)
+        with self._lock:
+            rows = dict(
+                self._conn.execute(
+                    "SELECT tag, generation FROM cache_generations "
+                    f"WHERE tag IN ({placeholders})",
+                    tags,
+                ).fetchall()
+            )
+        return tuple(rows.get(tag, 0) for tag in tags)
+
+    def set(
+        self,
+        key: str,
+        body: bytes,
+        tags: Sequence[str],
+        ttl: float,
+        generations: tuple[int, ...] | None = None,
+    ) -> None:
+        """Store `body` under `key`, indexed by `tags`, if they are unchanged."""
+        if len(body) > self.max_bytes:
+            return
+        now = time.time()
+        placeholders = ", ".join("?" for _ in tags)
+        with self._lock, self._conn:
+            if generations is None:
+                stored = self._conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?)",
+                    (key, body, now + ttl),
+                ).rowcount
+            else:
+                # Generations only grow, so equal sums mean equal generations;
+                # checked in the insert itself, atomically with other workers
+                stored = self._conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries SELECT ?, ?, ? WHERE ("
+                    "SELECT COALESCE(SUM(generation), 0) FROM cache_generations "
+                    f"WHERE tag IN ({placeholders})) = ?",
+                    (key, body, now + ttl, *tags, sum(generations)),
+                ).rowcount
+            if not stored:
+                return
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO cache_tags VALUES (?, ?)",
+                [(tag, key) for tag in tags],
+            )
+            self._conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE key IN ("
+                "SELECT key FROM cache_entries ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            # Evict the entries closest to expiry beyond the byte budget
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE key IN (SELECT key FROM ("
+                "SELECT key, SUM(LENGTH(body)) OVER ("
+                "ORDER BY expires_at DESC, key) AS total FROM cache_entries"
+                ") WHERE total > ?)",
+                (self.max_bytes,),
+            )
+
+    def invalidate_tags(self, tags: Sequence[str]) -> int:
+        """Evict every entry indexed by any of `tags`. Return the evicted count."""
+        placeholders = ", ".join("?" for _ in tags)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO cache_generations VALUES (?, 1) ON CONFLICT (tag) "
+                "DO UPDATE SET generation = generation + 1",
+                [(tag,) for tag in tags],
+            )
+            evicted = self._conn.execute(
+                "DELETE FROM cache_entries WHERE key IN ("
+                f"SELECT key FROM cache_tags WHERE tag IN ({placeholders}))",
+                tags,
+            ).rowcount
+        return evicted
+
+    def clear(self) -> None:
+        """Evict every entry."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache_entries")
+            self._conn.execute("DELETE FROM cache_tags")
+
+    def size(self) -> tuple[int, int]:
+        """Return the number of entries and the bytes they hold."""
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM cache_entries"
+            ).fetchone()
+        return count, size
+
+
+# Recomputed for every response, so never replayed from the cache
+UNCACHED_HEADERS = frozenset({"content-length", "x-cache"})
+
+
+def _pack(headers: dict[str, str], body: bytes) -> bytes:
+    """Join the headers and body of a response into one cache value."""
+    return json.dumps(headers).encode() + b"\n" + body
+
+
+def _unpack(value: bytes) -> tuple[dict[str, str], bytes]:
+    """Split a cache value into the headers and body of a response."""
+    headers, _, body = value.partition(b"\n")
+    return json.loads(headers), body
+
+
+def _cached_response(headers: dict[str, str], body: bytes, status: str) -> Response:
+    """Build the response of a cached body."""
+    return Response(
+        body, media_type="application/json", headers={**headers, "X-Cache": status}
+    )
+
+
+class ResponseCache:
+    """Tag-invalidated cache of serialized response bodies."""
+
+    def __init__(self, backend: CacheBackend, ttl: float) -> None:
+        """Initialize the cache."""
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(request: Request) -> str:
+        """Build the cache key of a request from its path, sorted params and format."""
+        params = sorted(request.query_params.multi_items())
+        return f"{request.url.path}?{urlencode(params)}#{preferred_media_type(request)}"
+
+    def invalidate(self, *tags: str) -> int:
+        """Evict every response built from any of `tags`."""
+        return self.backend.invalidate_tags(tags)
+
+    def clear(self) -> None:
+        """Evict every response."""
+        self.backend.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit rate and size metrics."""
+        entries, size = self.backend.size()
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def cached(
+        self, *tags: str
+    ) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+        """
+        Create a Decorator that caches the serialized response of a route.
+
+        The route must declare a `request: Request` parameter. Routes on the
+        fast path return a pre-serialized `Response`, which is cached as is;
+        other results are serialized with the route's return annotation.
+        Headers the route sets on its `response: Response` parameter (e.g.
+        pagination) are cached too.
+        """
+
+        def decorator(
+            func: Callable[..., Awaitable[Any]],
+        ) -> Callable[..., Awaitable[Any]]:
+            return_annotation = inspect.signature(func).return_annotation
+
+            @wraps(func)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                request: Request = kwargs["request"]
+                key = self.make_key(request)
+                encoding = choose_encoding(request.headers.get("accept-encoding"))
+                generations = self.backend.generations(tags)
+                if encoding is not None:
+                    stored = self.backend.get(f"{key}|{encoding}")
+                    if stored is not None:
+                        self.hits += 1
+                        headers, body = _unpack(stored)
+                        return _cached_response(headers, body, "HIT")
+
+                stored = self.backend.get(key)
+                if stored is not None:
+                    self.hits += 1
+                    headers, body = _unpack(stored)
+                    status = "HIT"
+                else:
+                    self.misses += 1
+                    result = await func(*args, **kwargs)
+                    source: Response | None
+                    if isinstance(result, Response):
+                        body, source = bytes(result.body), result
+                    else:
+                        body = get_adapter(return_annotation).dump_json(result)
+                        source = kwargs.get("response")
+                    headers = (
+                        {
+                            name: value
+                            for name, value in source.headers.items()
+                            if name not in UNCACHED_HEADERS
+                        }
+                        if isinstance(source, Response)
+                        else {}
+                    )
+                    # Model results are served as JSON, see `_cached_response`
+                    headers.setdefault("content-type", "application/json")
+                    status = "MISS"
+                    self.backend.set(
+                        key, _pack(headers, body), tags, self.ttl, generations
+                    )
+
+                # Store the compressed variant too, so later hits skip compression
+                compressed = compress_body(encoding, body, headers.get("content-type"))
+                if encoding is not None and compressed is not None:
+                    body = compressed
+                    headers = {
+                        **headers,
+                        "content-encoding": encoding,
+                        "vary": add_vary(headers.get("vary"), "Accept-Encoding"),
+                    }
+                    self.backend.set(
+                        f"{key}|{encoding}",
+                        _pack(headers, body),
+                        tags,
+                        self.ttl,
+                        generations,
+                    )
+                return _cached_response(headers, body, status)
+
+            return wrapper
+
+        return decorator
+
+
+def build_cache_backend() -> CacheBackend:
+    """Build the cache backend selected in the settings."""
+    if settings.CACHE_BACKEND == "sqlite":
+        return SqliteCacheBackend(
+            settings.CACHE_SQLITE_PATH,
+            settings.CACHE_MAX_ENTRIES,
+            settings.CACHE_MAX_BYTES,
+        )
+    return MemoryCacheBackend(settings.CACHE_MAX_ENTRIES, settings.CACHE_MAX_BYTES)
+
+
+response_cache = ResponseCache(build_cache_backend(), settings.CACHE_TTL_SECONDS)
+
+
+def _invalidate_responses(tags: frozenset[str]) -> None:
+    """Evict the cached responses built from the invalidated tables."""
+    response_cache.invalidate(*tags)
+
+
+invalidation_bus.subscribe(_invalidate_responses)
@@ -0,0 +1,112 @@
+"""
+coalescing.py.
+
+Single-flight coalescing for hot reads: concurrent lookups of the same key
+share one in-flight database call, run in the threadpool, and its result.
+"""
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from typing import Any, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+
+from config.settings import settings
+
+T = TypeVar("T")
+
+
+@dataclass
+class KeyMetrics:
+    """Counters of a coalesced key."""
+
+    leaders: int = 0
+    followers: int = 0
+    timeouts: int = 0
+
+
+class RequestCoalescer:
+    """Share in-flight loads of the same key between concurrent requests."""
+
+    def __init__(self, max_wait: float, max_tracked_keys: int) -> None:
+        """Initialize the coalescer."""
+        self.max_wait = max_wait
+        self.max_tracked_keys = max_tracked_keys
+        self._inflight: dict[str, asyncio.Future[Any]] = {}
+        self._metrics: OrderedDict[str, KeyMetrics] = OrderedDict()
+
+    async def run(self, key: str, loader: Callable[[], T]) -> T:
+        """
+        Return the result of `loader`, sharing it with concurrent calls on `key`.
+
+        The loader must return a value that does not depend on the caller's
+        session (e.g. a validated schema). Followers wait at most `max_wait`
+        seconds for the leader before running their own loader; if the leader
+        is cancelled, one of them takes over and the others follow it.
+        """
+        metrics = self._key_metrics(key)
+        while (inflight := self._inflight.get(key)) is not None:
+            metrics.followers += 1
+            done, _ = await asyncio.wait({inflight}, timeout=self.max_wait)
+            if not done:
+                metrics.timeouts += 1
+                return await run_in_threadpool(loader)
+            if not inflight.cancelled():
+                return inflight.result()
+            # The leader was cancelled: the first follower to get here leads
+
+        metrics.leaders += 1
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await run_in_threadpool(loader)
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if not future.done():
+                # Cancelled (e.g. the client left): release the followers
+                future.cancel()
+            del self._inflight[key]
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Return the in-flight count and the counters summed over tracked keys.
+
+        Keys embed ids and user-scoped lookups, so they are never exposed.
+        """
+        return {
+            "inflight": len(self._inflight),
+            "tracked_keys": len(self._metrics),
+            "leaders": sum(metrics.leaders for metrics in self._metrics.values()),
+            "followers": sum(metrics.followers for metrics in self._metrics.values()),
+            "timeouts": sum(metrics.timeouts for metrics in self._metrics.values()),
+        }
+
+    def key_stats(self, key: str) -> dict[str, int] | None:
+        """Return the counters of `key`, or None when it is not tracked."""
+        metrics = self._metrics.get(key)
+        return asdict(metrics) if metrics is not None else None
+
+    def _key_metrics(self, key: str) -> KeyMetrics:
+        """Return the counters of `key`, evicting the least recent key if full."""
+        metrics = self._metrics.get(key)
+        if metrics is None:
+            metrics = self._metrics[key] = KeyMetrics()
+            if len(self._metrics) > self.max_tracked_keys:
+                self._metrics.popitem(last=False)
+        else:
+            self._metrics.move_to_end(key)
+        return metrics
+
+
+read_coalescer = RequestCoalescer(
+    settings.COALESCE_MAX_WAIT_MS / 1000, settings.COALESCE_MAX_TRACKED_KEYS
+)
@@ -0,0 +1,173 @@
+"""
+compression.py.
+
+Response compression with zstd, Brotli and gzip, chosen from the request's
+`Accept-Encoding`. zstd and Brotli are optional dependencies (`zstandard`,
+`brotli`, in the `compression` extra) and only offered when installed. Responses that already carry a
+`Content-Encoding`, such as precompressed bodies from the response cache,
+and streaming responses are passed through untouched.
+"""
+
+import gzip
+import importlib
+from collections.abc import Callable
+from importlib.util import find_spec
+from types import ModuleType
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.settings import settings
+
+# Optional dependencies, installed with the `compression` extra
+brotli: ModuleType | None = (
+    importlib.import_module("brotli") if find_spec("brotli") else None
+)
+zstandard: ModuleType | None = (
+    importlib.import_module("zstandard") if find_spec("zstandard") else None
+)
+
+# Media types worth compressing; images, archives and the like already are
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/msgpack",
+    "application/vnd.apache.arrow.stream",
+    "application/javascript",
+    "application/xml",
+)
+
+
+def _available_encoders() -> dict[str, Callable[[bytes], bytes]]:
+    """Return the installed encoders, in order of preference."""
+    encoders: dict[str, Callable[[bytes], bytes]] = {}
+    if zstandard is not None:
+        encoders["zstd"] = lambda body: zstandard.ZstdCompressor(
+            level=settings.COMPRESSION_ZSTD_LEVEL
+        ).compress(body)
+    if brotli is not None:
+        encoders["br"] = lambda body: brotli.compress(
+            body, quality=settings.COMPRESSION_BROTLI_QUALITY
+        )
+    encoders["gzip"] = lambda body: gzip.compress(
+        body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0
+    )
+    return encoders
+
+
+ENCODERS = _available_encoders()
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """
+    Return the encoding to use for an `Accept-Encoding` header, or None.
+
+    The highest quality wins; ties go to the server's preference
+    (zstd, then br, then gzip). `*` matches any installed encoding.
+    """
+    if not accept_encoding:
+        return None
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            qualities[name.lower()] = quality
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in ENCODERS:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(content_type: str | None, size: int) -> bool:
+    """Return True if a body of this type and size is worth compressing."""
+    return (
+        size >= settings.COMPRESSION_MINIMUM_SIZE
+        and content_type is not None
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+    )
+
+
+def compress_body(
+    encoding: str | None, body: bytes, content_type: str | None
+) -> bytes | None:
+    """Compress `body` with `encoding`, or return None if it is not worth it."""
+    if encoding is None or not is_compressible(content_type, len(body)):
+        return None
+    return ENCODERS[encoding](body)
+
+
+def add_vary(vary: str | None, header: str) -> str:
+    """Add `header` to the value of a `Vary` header."""
+    if not vary:
+        return header
+    if header.lower() in (name.strip().lower() for name in vary.split(",")):
+        return vary
+    return f"{vary}, {header}"
+
+
+class CompressionMiddleware:
+    """
+    Compress complete responses with the client's preferred encoding.
+
+    Only responses that declare a `Content-Length` are buffered and
+    compressed; streaming responses, which have none, are sent as produced,
+    so exports are never held in memory.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Initialize the middleware."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Compress the response of an HTTP request if the client accepts it."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        chunks: list[bytes] = []
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                size = headers.get("content-length")
+                if "content-encoding" not in headers and size is not None:
+                    # Sent compressed to clients that accept it, so caches
+                    # must key it on the header even when not compressed
+                    headers["Vary"] = add_vary(headers.get("vary"), "Accept-Encoding")
+                    if is_compressible(headers.get("content-type"), int(size)):
+                        start = message
+                        return
+            elif start is not None and message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                body = b"".join(chunks)
+                headers = MutableHeaders(raw=start["headers"])
+                compressed = compress_body(encoding, body, headers.get("content-type"))
+                if compressed is not None:
+                    body = compressed
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -9,7 +9,7 @@ from typing import Annotated, Any
 from fastapi import Depends, HTTPException, Response
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from pydantic import BaseModel, ConfigDict, ValidationError
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
 from sqlalchemy.orm import Session
 
 from app.models.user import DBUser
@@ -17,6 +17,7 @@ from app.schemas.token import AccessToken
 from config.settings import settings
 from db.database import engine
 from shared.utils.errors import InvalidCredentialsError, InvalidTokenError
+from shared.utils.invalidation import has_pending_writes
 
 
 class ConfigModel(BaseModel):
@@ -45,13 +46,17 @@ class CommonParameters(BaseModel):
 
     Attributes:
         - q (str | None): Consulta de búsqueda opcional. Si no se proporciona, se establece en None.
-        - offset (int): Índice de inicio de la consulta paginada. Por defecto es 0.
-        - limit (int): Número máximo de resultados devueltos por la consulta paginada. Por defecto es 30.
+        - offset (int): Índice de inicio de la consulta paginada, no negativo. Por defecto es 0.
+        - limit (int): Número máximo de resultados devueltos por la consulta paginada, mayor que 0. Por defecto es 30.
+        - sort (str | None): Columna por la que se ordena. Si no se proporciona, se usa la del listado.
+        - order (SortEnum): Sentido de la ordenación. Por defecto es ascendente.
+        - filter (str | None): Columna por la que se filtra, con el valor de `filter_value`.
     """
 
     q: str | None = None
-    offset: int = 0
-    limit: int = 30
+    offset: int = Field(default=0, ge=0)
+    limit: int = Field(default=30, gt=0)
+    sort: str | None = None
     order: SortEnum = SortEnum.ASC
     filter: str | None = None
     filter_value: str | None = None
@@ -68,8 +73,6 @@ def paginate_response_header(
     response: Response, commons: CommonParameters, total: int
 ) -> None:
     """Add pagination headers to the response."""
-    if commons.limit < 0:
-        commons.limit = total
     page = (
         (commons.offset + commons.limit) // commons.limit
         if total > 0 and commons.limit != 0
@@ -114,15 +117,67 @@ def commit_and_refresh(db: Session, instance: Any, commit: bool = True) -> Any:
         raise
 
 
+class LazySession:
+    """
+    Session proxy that is only opened on first use.
+
+    Requests answered from a cache or rejected before reaching a service never
+    create a session nor check out a connection. Attributes not defined here
+    are forwarded to the underlying `Session`.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the proxy."""
+        self._session: Session | None = None
+
+    @property
+    def session(self) -> Session:
+        """Return the underlying session, opening it if needed."""
+        if self._session is None:
+            # Loaded objects must stay readable after `release_session`
+            self._session = Session(engine, expire_on_commit=False)
+        return self._session
+
+    def __getattr__(self, name: str) -> Any:
+        """Forward attribute access to the underlying session."""
+        return getattr(self.session, name)
+
+    def in_transaction(self) -> bool:
+        """Return True if the underlying session holds a transaction."""
+        return self._session is not None and self._session.in_transaction()
+
+    def close(self) -> None:
+        """Close the underlying session if it was opened."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+def release_session(session: Session) -> None:
+    """
+    Return the session's connection to the pool.
+
+    Called as soon as a service returns, so the connection is not held while
+    the result is validated and encoded. A transaction with writes is
+    committed; a read-only one is just closed, which rolls it back and keeps
+    loaded objects readable but detached, so reads must eager load what they
+    serialize. A later query transparently checks out a connection again.
+    """
+    if not session.in_transaction():
+        return
+    if session.new or session.dirty or session.deleted or has_pending_writes(session):
+        session.commit()
+    else:
+        session.close()
+
+
 def get_session() -> Any:
-    """Get a database session."""
-    session = None
+    """Get a lazily opened database session."""
+    session = LazySession()
     try:
-        with Session(engine) as session:
-            yield session
+        yield session
     finally:
-        if session and session.is_active:
-            session.close()
+        session.close()
 
 
 SessionDep = Annotated[Session, Depends(get_session)]
@@ -108,3 +108,23 @@ class DeleteError(Exception):
         """Initialize the exception."""
         self.message = f"Error deleting {entity_name}"
         super().__init__(self.message)
+
+
+class NotAcceptableError(Exception):
+    """Exception raised when no media type in the Accept header can be produced."""
+
+    def __init__(self, available: list[str]) -> None:
+        """Initialize the exception."""
+        self.available = available
+        self.message = f"Not acceptable. Available media types: {', '.join(available)}"
+        super().__init__(self.message)
+
+
+class TooManyAttemptsError(Exception):
+    """Exception raised when logins are throttled after repeated failures."""
+
+    def __init__(self, retry_after: float) -> None:
+        """Initialize the exception."""
+        self.retry_after = retry_after
+        self.message = "Too many failed login attempts, try again later"
+        super().__init__(self.message)
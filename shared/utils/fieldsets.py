@@ -0,0 +1,252 @@
+"""
+fieldsets.py.
+
+Sparse fieldsets (`fields=`) and relationship expansion (`expand=`) for read
+endpoints. A selection is compiled into loader options, so only the requested
+columns are selected and only the expanded relationships are joined, and into
+the matching subset of the response schema.
+"""
+
+from collections.abc import Hashable
+from dataclasses import dataclass
+from functools import cache
+from typing import Annotated, Any, cast, get_args
+
+from fastapi import Depends
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import (
+    Session,
+    joinedload,
+    load_only,
+    noload,
+    object_mapper,
+    selectinload,
+    undefer,
+)
+
+from shared.utils.deps import ConfigModel
+from shared.utils.serialization import dump_json, get_adapter
+
+# Dotted paths parsed into nested dicts: "stock,material.title" becomes
+# {"stock": {}, "material": {"title": {}}}
+Tree = dict[str, "Tree"]
+
+
+class FieldSelection(ConfigModel):
+    """
+    Parámetros para seleccionar los campos de una respuesta.
+
+    Attributes:
+        - fields (str | None): Campos a devolver separados por comas; los anidados con punto (ej. `stock,material.title`).
+        - expand (str | None): Relaciones a incluir separadas por comas (ej. `material,material.author`).
+
+    Si se indica alguno de los dos, solo se cargan y devuelven las relaciones que nombran.
+    """
+
+    fields: str | None = None
+    expand: str | None = None
+
+
+FieldsParams = Annotated[FieldSelection, Depends()]
+
+
+@dataclass(frozen=True)
+class Fieldset:
+    """Loader options and schema subset of a field selection."""
+
+    options: tuple[Any, ...] = ()
+    # None means the whole schema
+    include: Tree | None = None
+
+
+def _parse(value: str | None) -> Tree | None:
+    """Parse comma-separated dotted paths into a tree."""
+    if value is None:
+        return None
+    tree: Tree = {}
+    for path in value.split(","):
+        node = tree
+        for part in filter(None, path.strip().split(".")):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def nested_schema(annotation: Any) -> type[BaseModel] | None:
+    """Return the schema nested in an annotation like `X`, `list[X]` or `X | None`."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in get_args(annotation):
+        schema = nested_schema(arg)
+        if schema is not None:
+            return schema
+    return None
+
+
+def _plan(
+    schema: type[BaseModel],
+    model: type[Any],
+    fields: Tree | None,
+    expand: Tree,
+    loader: Any,
+) -> tuple[list[Any], Tree]:
+    """Return the loader options and the include tree of one schema level."""
+    mapper = inspect(model)
+    relationships = {
+        name: nested_schema(info.annotation)
+        for name, info in schema.model_fields.items()
+        if name in mapper.relationships and nested_schema(info.annotation)
+    }
+    for name in {**(fields or {}), **expand}:
+        if name not in schema.model_fields:
+            raise ValueError(f"Unknown field '{name}'.")
+    for name in expand:
+        if name not in relationships:
+            raise ValueError(f"Field '{name}' is not an expandable relationship.")
+
+    columns = [
+        name
+        for name in schema.model_fields
+        if name not in relationships
+        and (fields is None or name in fields or name == "id")
+    ]
+    include: Tree = {name: {} for name in columns}
+    options: list[Any] = []
+    if fields is not None:
+        attributes = [
+            getattr(model, name) for name in columns if name in mapper.column_attrs
+        ]
+        options.append(
+            loader.load_only(*attributes) if loader else load_only(*attributes)
+        )
+    else:
+        options += _undefer_columns(schema, model, loader)
+
+    for name, child_schema in relationships.items():
+        attribute = getattr(model, name)
+        if name not in (fields or {}) and name not in expand:
+            options.append(loader.noload(attribute) if loader else noload(attribute))
+            continue
+        child_loader = loader.joinedload(attribute) if loader else joinedload(attribute)
+        child_options, include[name] = _plan(
+            child_schema,  # type: ignore[arg-type]
+            mapper.relationships[name].mapper.class_,
+            (fields or {}).get(name) or None,
+            expand.get(name, {}),
+            child_loader,
+        )
+        options += [child_loader, *child_options]
+    return options, include
+
+
+def _undefer_columns(
+    schema: type[BaseModel], model: type[Any], loader: Any
+) -> list[Any]:
+    """Return the options loading the deferred columns `schema` serializes."""
+    attributes = inspect(model).column_attrs
+    return [
+        loader.undefer(getattr(model, name))
+        if loader
+        else undefer(getattr(model, name))
+        for name in schema.model_fields
+        if name in attributes and attributes[name].deferred
+    ]
+
+
+def _profile(schema: type[BaseModel], model: type[Any], loader: Any) -> list[Any]:
+    """Return the loading profile of one schema level and its nested schemas."""
+    mapper = inspect(model)
+    options = _undefer_columns(schema, model, loader)
+    for name, info in schema.model_fields.items():
+        child_schema = nested_schema(info.annotation)
+        if name in mapper.relationships and child_schema is not None:
+            relationship = mapper.relationships[name]
+            attribute = getattr(model, name)
+            # Collections in a second query, so parent rows are not repeated
+            if relationship.uselist:
+                child_loader = (
+                    loader.selectinload(attribute)
+                    if loader
+                    else selectinload(attribute)
+                )
+            else:
+                child_loader = (
+                    loader.joinedload(attribute) if loader else joinedload(attribute)
+                )
+            options += [
+                child_loader,
+                *_profile(child_schema, relationship.mapper.class_, child_loader),
+            ]
+    return options
+
+
+@cache
+def load_profile(schema: type[BaseModel], model: type[Any]) -> tuple[Any, ...]:
+    """
+    Return the loader options of an ORM read serialized as `schema`.
+
+    The relationships `schema` nests are eager loaded, since mappers load them
+    lazily. Columns mapped as deferred are only loaded where `schema`, or one
+    of the schemas it nests, serializes them.
+    """
+    return tuple(_profile(schema, model, None))
+
+
+def reload_profiled[T](session: Session, instance: T, schema: type[BaseModel]) -> T:
+    """
+    Reload `instance` with the loading profile of `schema`.
+
+    Writes get their instances back without the relationships the response
+    serializes; they are loaded here, before the connection is released.
+    """
+    model = type(instance)
+    reloaded = session.get(
+        model,
+        object_mapper(instance).primary_key_from_instance(instance),
+        options=load_profile(schema, cast(Hashable, model)),
+        populate_existing=True,
+    )
+    return reloaded if reloaded is not None else instance
+
+
+def build_fieldset(
+    schema: type[BaseModel], model: type[Any], selection: FieldSelection
+) -> Fieldset:
+    """Compile a field selection of `schema`, read from `model`, into a fieldset."""
+    fields, expand = _parse(selection.fields), _parse(selection.expand)
+    if fields is None and expand is None:
+        # A mapped class is hashable, which `type[Any]` does not tell mypy
+        return Fieldset(load_profile(schema, cast(Hashable, model)))
+    options, include = _plan(schema, model, fields, expand or {}, None)
+    return Fieldset(tuple(options), include)
+
+
+def _construct(schema: type[BaseModel], obj: Any, include: Tree) -> BaseModel:
+    """Build a partial schema instance from the included attributes of `obj`."""
+    values: dict[str, Any] = {}
+    for name, subtree in include.items():
+        value = getattr(obj, name)
+        child_schema = nested_schema(schema.model_fields[name].annotation)
+        if child_schema is None or value is None:
+            values[name] = value
+        elif isinstance(value, list):
+            values[name] = [_construct(child_schema, item, subtree) for item in value]
+        else:
+            values[name] = _construct(child_schema, value, subtree)
+    return schema.model_construct(**values)
+
+
+def dump_fieldset(schema: Any, value: Any, fieldset: Fieldset) -> bytes:
+    """Serialize `value` as `schema`, restricted to the fields of `fieldset`."""
+    if fieldset.include is None:
+        return dump_json(schema, value)
+    item_schema = nested_schema(schema)
+    if item_schema is None:
+        raise TypeError(f"Cannot select fields of {schema}: it nests no schema.")
+    if isinstance(value, list):
+        partial: Any = [
+            _construct(item_schema, item, fieldset.include) for item in value
+        ]
+    else:
+        partial = _construct(item_schema, value, fieldset.include)
+    return get_adapter(schema).dump_json(partial, exclude_unset=True)
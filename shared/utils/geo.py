@@ -0,0 +1,69 @@
+"""
+geo.py.
+
+Great-circle distances and a fixed latitude/longitude grid used to prune
+nearest-neighbour searches without an external geo service.
+"""
+
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Return the great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _cell_of(lat: float, lon: float, size: float) -> tuple[int, int]:
+    """Return the row and column of the grid cell containing a point."""
+    rows, columns = math.ceil(180 / size), math.ceil(360 / size)
+    row = min(int((lat + 90) // size), rows - 1)
+    column = int((lon + 180) // size) % columns
+    return row, column
+
+
+def grid_cell(lat: float, lon: float, size: float) -> str:
+    """Return the key of the grid cell of `size` degrees containing a point."""
+    row, column = _cell_of(lat, lon, size)
+    return f"{row}:{column}"
+
+
+def ring_cells(lat: float, lon: float, size: float, ring: int) -> list[str]:
+    """
+    Return the keys of the cells at Chebyshev distance `ring` from a point's cell.
+
+    Columns wrap around the antimeridian; rows beyond the poles are dropped.
+    """
+    rows, columns = math.ceil(180 / size), math.ceil(360 / size)
+    row, column = _cell_of(lat, lon, size)
+    cells: set[tuple[int, int]] = set()
+    for offset in range(-ring, ring + 1):
+        for dr, dc in (
+            (-ring, offset),
+            (ring, offset),
+            (offset, -ring),
+            (offset, ring),
+        ):
+            if 0 <= row + dr < rows:
+                cells.add((row + dr, (column + dc) % columns))
+    return [f"{r}:{c}" for r, c in sorted(cells)]
+
+
+def ring_min_distance_km(lat: float, size: float, ring: int) -> float:
+    """
+    Return a lower bound of the distance from a point to any cell past `ring`.
+
+    Cells narrow towards the poles, so the bound uses the width of a
+    longitude degree at the farthest latitude the rings reach.
+    """
+    farthest = min(90.0, abs(lat) + (ring + 1) * size)
+    return ring * size * KM_PER_DEGREE * math.cos(math.radians(farthest))
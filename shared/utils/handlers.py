@@ -1,12 +1,21 @@
-"""handlers.py."""
+"""
+handlers.py.
 
+Exception handlers. Each returns its JSON error response directly instead of
+raising an `HTTPException` for a second dispatch; bodies keep the
+`{"message": detail}` shape.
+"""
+
+import json
 import logging
+import math
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass
 from typing import Any
 
 from email_validator import EmailNotValidError
-from fastapi import FastAPI, HTTPException, Request, status
+from fastapi import FastAPI, HTTPException, Request, Response, status
 from fastapi.exceptions import RequestValidationError, ResponseValidationError
-from fastapi.responses import JSONResponse
 from pydantic import ValidationError
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
@@ -17,7 +26,9 @@ from shared.utils.errors import (
     EntityAlreadyExistsError,
     InvalidCredentialsError,
     InvalidTokenError,
+    NotAcceptableError,
     NotFoundError,
+    TooManyAttemptsError,
 )
 
 # pyright: reportGeneralTypeIssues=false
@@ -26,170 +37,155 @@ from shared.utils.errors import (
 # pyright: reportUnusedFunction=false
 
 
+@dataclass(frozen=True)
+class ErrorSpec:
+    """Status code and headers of the response to an application error."""
+
+    status_code: int
+    headers: dict[str, str] | None = None
+
+
+# Application errors, all carrying a `message`, and the responses they map to
+ERROR_CATALOG: dict[type[Exception], ErrorSpec] = {
+    EmailError: ErrorSpec(status.HTTP_422_UNPROCESSABLE_ENTITY),
+    DeleteError: ErrorSpec(status.HTTP_409_CONFLICT),
+    InvalidTokenError: ErrorSpec(status.HTTP_401_UNAUTHORIZED),
+    AuthorizationError: ErrorSpec(status.HTTP_401_UNAUTHORIZED),
+    InvalidCredentialsError: ErrorSpec(
+        status.HTTP_401_UNAUTHORIZED, {"WWW-Authenticate": "Bearer"}
+    ),
+    NotFoundError: ErrorSpec(status.HTTP_404_NOT_FOUND),
+    NotAcceptableError: ErrorSpec(status.HTTP_406_NOT_ACCEPTABLE),
+    EntityAlreadyExistsError: ErrorSpec(status.HTTP_409_CONFLICT),
+}
+
+
+def encode_error(detail: Any) -> bytes:
+    """Encode an error body exactly as `JSONResponse` would."""
+    return json.dumps(
+        {"message": detail},
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+# Bodies of the default messages, which never vary, encoded once
+FIXED_BODIES: dict[str, bytes] = {
+    message: encode_error(message)
+    for message in (
+        # Raised by OAuth2PasswordBearer when no token is sent
+        "Not authenticated",
+        InvalidTokenError().message,
+        AuthorizationError().message,
+        InvalidCredentialsError().message,
+    )
+}
+
+
+def error_response(
+    status_code: int, detail: Any, headers: Mapping[str, str] | None = None
+) -> Response:
+    """Return the JSON error response of `detail`."""
+    body = FIXED_BODIES.get(detail) if isinstance(detail, str) else None
+    return Response(
+        body if body is not None else encode_error(detail),
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+def _catalog_handler(
+    spec: ErrorSpec,
+) -> Callable[[Request, Exception], Awaitable[Response]]:
+    """Return the handler of an application error of the catalog."""
+
+    async def handler(request: Request, exc: Exception) -> Response:
+        return error_response(spec.status_code, exc.message, spec.headers)  # type: ignore[attr-defined]
+
+    return handler
+
+
+def _validation_errors(exc: RequestValidationError | ResponseValidationError) -> Any:
+    """Return the errors of a request or response validation error."""
+    return [
+        {"loc": error["loc"], "message": error["msg"], "type": error["type"]}
+        for error in exc.errors()
+    ]
+
+
 # Custom exception handlers
 def register_exception_handlers(app: FastAPI) -> None:
     """Register exception handlers for the application."""
-
-    @app.exception_handler(EmailError)
-    async def email_exception_handler(
-        request: Request, exc: EmailError
-    ) -> HTTPException:
-        """Handle EmailError exceptions."""
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=exc.message,
-        ) from exc
-
-    @app.exception_handler(DeleteError)
-    async def delete_error_exception_handler(
-        request: Request, exc: DeleteError
-    ) -> HTTPException:
-        """Handle DeleteError exceptions."""
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=exc.message,
-        ) from exc
-
-    @app.exception_handler(InvalidTokenError)
-    async def invalid_token_exception_handler(
-        request: Request, exc: InvalidTokenError
-    ) -> HTTPException:
-        """Handle InvalidTokenError exceptions."""
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=exc.message,
-        ) from exc
-
-    @app.exception_handler(AuthorizationError)
-    async def authorization_exception_handler(
-        request: Request, exc: AuthorizationError
-    ) -> HTTPException:
-        """Handle AuthorizationError exceptions."""
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=exc.message,
-        ) from exc
-
-    @app.exception_handler(InvalidCredentialsError)
-    async def invalid_credentials_exception_handler(
-        request: Request, exc: InvalidCredentialsError
-    ) -> HTTPException:
-        """Handle InvalidCredentialsError exceptions."""
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=exc.message,
-            headers={"WWW-Authenticate": "Bearer"},
-        ) from exc
+    for exc_type, spec in ERROR_CATALOG.items():
+        app.add_exception_handler(exc_type, _catalog_handler(spec))
+
+    @app.exception_handler(TooManyAttemptsError)
+    async def too_many_attempts_exception_handler(
+        request: Request, exc: TooManyAttemptsError
+    ) -> Response:
+        """Handle TooManyAttemptsError exceptions."""
+        return error_response(
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            exc.message,
+            {"Retry-After": str(math.ceil(exc.retry_after))},
+        )
 
     @app.exception_handler(RequestValidationError)
     async def request_validation_exception_handler(
         request: Request, exc: RequestValidationError
-    ) -> HTTPException:
+    ) -> Response:
         """Handle validation errors."""
-        errors: Any = []
-        for error in exc.errors():
-            errors.append(
-                {
-                    "loc": error["loc"],
-                    "message": error["msg"],
-                    "type": error["type"],
-                }
-            )
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail={"errors": errors},
+        return error_response(
+            status.HTTP_422_UNPROCESSABLE_ENTITY, {"errors": _validation_errors(exc)}
         )
 
     @app.exception_handler(ResponseValidationError)
     async def response_validation_exception_handler(
         request: Request, exc: ResponseValidationError
-    ) -> HTTPException:
+    ) -> Response:
         """Handle validation errors."""
-        errors: Any = []
-        for error in exc.errors():
-            errors.append(
-                {
-                    "loc": error["loc"],
-                    "message": error["msg"],
-                    "type": error["type"],
-                }
-            )
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail={"errors": errors},
-        ) from exc
-
-    @app.exception_handler(NotFoundError)
-    async def notfound_exception_handler(
-        request: Request, exc: NotFoundError
-    ) -> HTTPException:
-        """Handle NotFoundError exceptions."""
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=exc.message,
-        ) from exc
-
-    @app.exception_handler(EntityAlreadyExistsError)
-    async def entity_exists_exception_handler(
-        request: Request, exc: EntityAlreadyExistsError
-    ) -> HTTPException:
-        """Handle EntityAlreadyExistsError exceptions."""
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=exc.message,
-        ) from exc
+        return error_response(
+            status.HTTP_422_UNPROCESSABLE_ENTITY, {"errors": _validation_errors(exc)}
+        )
 
     @app.exception_handler(IntegrityError)
     async def integrity_error_exception_handler(
         request: Request, exc: IntegrityError
-    ) -> HTTPException:
+    ) -> Response:
         """Handle IntegrityError exceptions."""
         if "(psycopg2.errors.UniqueViolation)" in exc.args[0]:
             message = exc.args[0].split("DETAIL:  ")[1].split("\n")[0]
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail=message,
-            )
-        raise HTTPException(
-            status_code=status.HTTP_306_RESERVED,
-            detail=exc.args,
-        ) from exc
+            return error_response(status.HTTP_409_CONFLICT, message)
+        return error_response(status.HTTP_306_RESERVED, exc.args)
 
     @app.exception_handler(SQLAlchemyError)
     async def sqlalchemy_exception_handler(
         request: Request, exc: SQLAlchemyError
-    ) -> HTTPException:
+    ) -> Response:
         """Handle SQLAlchemy errors."""
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=exc.args,
-        ) from exc
+        return error_response(status.HTTP_500_INTERNAL_SERVER_ERROR, exc.args)
 
     @app.exception_handler(EmailNotValidError)
     async def email_not_valid_exception_handler(
         request: Request, exc: EmailNotValidError
-    ) -> HTTPException:
+    ) -> Response:
         """Handle EmailNotValidError exceptions."""
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=exc.args[0],
-        ) from exc
+        return error_response(status.HTTP_422_UNPROCESSABLE_ENTITY, exc.args[0])
 
     @app.exception_handler(HTTPException)
     async def custom_http_exception_handler(
         request: Request, exc: HTTPException
-    ) -> JSONResponse:
+    ) -> Response:
         """Handle HTTP exceptions. Return a JSONResponse with the exception message."""
-        return JSONResponse(
-            status_code=exc.status_code,
-            content={"message": exc.detail},
-            headers=exc.headers,
-        )
+        return error_response(exc.status_code, exc.detail, exc.headers)
 
     @app.exception_handler(ValidationError)
     async def validation_exception_handler(
         request: Request, exc: ValidationError
-    ) -> HTTPException:
+    ) -> Response:
         """Handle ValidationError exceptions."""
         logging.error(f"Validation error: {exc.errors()}")
 
@@ -201,17 +197,14 @@ def register_exception_handlers(app: FastAPI) -> None:
             }
             for error in exc.errors()
         ]
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=errors,
-        )
+        return error_response(status.HTTP_422_UNPROCESSABLE_ENTITY, errors)
 
     @app.exception_handler(ValueError)
     async def value_error_exception_handler(
         request: Request, exc: ValueError
-    ) -> HTTPException:
+    ) -> Response:
         """Handle ValueError exceptions."""
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=exc.args[0] if len(exc.args) > 0 else exc.args,
-        ) from exc
+        return error_response(
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            exc.args[0] if len(exc.args) > 0 else exc.args,
+        )
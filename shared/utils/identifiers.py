@@ -0,0 +1,58 @@
+"""
+identifiers.py.
+
+Normalization of material identifiers and names into lookup keys.
+"""
+
+import re
+import unicodedata
+
+_NON_IDENTIFIER = re.compile(r"[^0-9X]")
+
+
+def _strip_identifier(value: str) -> str:
+    """Uppercase `value` and drop everything but digits and X."""
+    return _NON_IDENTIFIER.sub("", value.upper())
+
+
+def normalize_isbn(isbn: str) -> str | None:
+    """
+    Normalize an ISBN to its hyphen-free ISBN-13 form.
+
+    ISBN-10 values are converted, so both forms of a book share one key.
+    Other values are only stripped, and None is returned for values with no
+    identifier characters at all.
+    """
+    key = _strip_identifier(isbn)
+    if len(key) != 10 or not key[:9].isdigit():
+        return key or None
+    body = "978" + key[:9]
+    total = sum(int(digit) * (1 if i % 2 == 0 else 3) for i, digit in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+
+def normalize_issn(issn: str) -> str | None:
+    """Normalize an ISSN to its hyphen-free form, or None if nothing is left."""
+    return _strip_identifier(issn) or None
+
+
+def fold_key(text: str) -> str:
+    """
+    Fold `text` into a case and accent insensitive collation key.
+
+    Keys compare like the folded text, so a prefix of a name is a prefix of
+    its key and prefix matches become index range scans.
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+def fold_email(email: str) -> str:
+    """Fold an email into a case insensitive lookup key."""
+    return email.strip().lower()
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    """Return the smallest key greater than every key starting with `prefix`."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
@@ -0,0 +1,432 @@
+"""
+invalidation.py.
+
+Cross-worker cache invalidation bus. Sessions collect the tables they write,
+by flushing instances and their association collections or by executing
+INSERT, UPDATE and DELETE statements, and once the transaction commits the bus
+evicts the matching keys in this worker and broadcasts the tags to every other
+worker through a transport. Raw SQL text is not inspected.
+"""
+
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterable
+from itertools import chain
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import (
+    Column,
+    Float,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    TableClause,
+    event,
+    func,
+    inspect,
+    select,
+)
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.sql.dml import UpdateBase
+
+from config.settings import settings
+from db.database import engine
+
+Message = dict[str, Any]
+Subscriber = Callable[[frozenset[str]], None]
+
+logger = logging.getLogger(__name__)
+
+
+class Transport:
+    """Base class for invalidation transports."""
+
+    name = "base"
+
+    def start(self, on_message: Callable[[Message], None]) -> None:
+        """Start delivering messages from other workers to `on_message`."""
+
+    def send(self, message: Message) -> None:
+        """Broadcast `message` to the other workers."""
+
+    def stop(self) -> None:
+        """Stop listening and release resources."""
+
+
+class LocalTransport(Transport):
+    """Single-worker transport: invalidations never leave the process."""
+
+    name = "local"
+
+
+class SocketTransport(Transport):
+    """
+    UDP transport between the workers of one host.
+
+    Each worker binds a loopback port and registers it as a file in a shared
+    directory; a publish sends one datagram to every registered port.
+    """
+
+    name = "socket"
+
+    def __init__(self, directory: str) -> None:
+        """Initialize the transport."""
+        self.directory = Path(directory)
+        self._sock: socket.socket | None = None
+        self._port_file: Path | None = None
+        self._port = 0
+
+    def start(self, on_message: Callable[[Message], None]) -> None:
+        """Bind a port, register it and start the receiver thread."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind(("127.0.0.1", 0))
+        self._port = self._sock.getsockname()[1]
+        self._port_file = self.directory / f"{os.getpid()}-{self._port}.port"
+        self._port_file.write_text(str(self._port))
+        threading.Thread(
+            target=self._receive, args=(self._sock, on_message), daemon=True
+        ).start()
+
+    def send(self, message: Message) -> None:
+        """Send `message` to every other registered worker."""
+        if self._sock is None:
+            return
+        data = json.dumps(message).encode()
+        for port_file in self.directory.glob("*.port"):
+            try:
+                port = int(port_file.read_text())
+                if port != self._port:
+                    self._sock.sendto(data, ("127.0.0.1", port))
+            except (OSError, ValueError):
+                continue
+
+    def stop(self) -> None:
+        """Unregister the port and close the socket."""
+        if self._port_file is not None:
+            self._port_file.unlink(missing_ok=True)
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    @staticmethod
+    def _receive(sock: socket.socket, on_message: Callable[[Message], None]) -> None:
+        """Deliver datagrams until the socket is closed."""
+        while True:
+            try:
+                data, _ = sock.recvfrom(65535)
+            except OSError:
+                return
+            try:
+                message = json.loads(data)
+            except ValueError:
+                logger.warning("Dropped a malformed cache invalidation datagram")
+                continue
+            on_message(message)
+
+
+invalidations_table = Table(
+    "cache_invalidations",
+    MetaData(),
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("payload", String, nullable=False),
+    Column("created_at", Float, nullable=False),
+    # Never reuse ids of pruned rows, which pollers would skip as already seen
+    sqlite_autoincrement=True,
+)
+
+
+class SqliteTransport(Transport):
+    """Change-table transport: publishes are rows that every worker polls."""
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        poll_interval: float,
+        retention: float = 60.0,
+        prune_interval: float = 10.0,
+    ) -> None:
+        """Initialize the transport."""
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self._stop = threading.Event()
+
+    def start(self, on_message: Callable[[Message], None]) -> None:
+        """Create the change table and start the poller thread."""
+        invalidations_table.create(engine, checkfirst=True)
+        with engine.connect() as conn:
+            last_id = conn.execute(
+                select(invalidations_table.c.id).order_by(
+                    invalidations_table.c.id.desc()
+                )
+            ).scalar()
+        self._stop.clear()
+        threading.Thread(
+            target=self._poll, args=(last_id or 0, on_message), daemon=True
+        ).start()
+
+    def send(self, message: Message) -> None:
+        """Append `message` to the change table."""
+        with engine.begin() as conn:
+            conn.execute(
+                invalidations_table.insert().values(
+                    payload=json.dumps(message), created_at=time.time()
+                )
+            )
+
+    def stop(self) -> None:
+        """Stop the poller thread."""
+        self._stop.set()
+
+    def _poll(self, last_id: int, on_message: Callable[[Message], None]) -> None:
+        """Deliver new rows and prune expired ones until stopped."""
+        table = invalidations_table
+        last_prune = time.monotonic()
+        while not self._stop.wait(self.poll_interval):
+            try:
+                with engine.begin() as conn:
+                    rows = conn.execute(
+                        select(table.c.id, table.c.payload)
+                        .where(table.c.id > last_id)
+                        .order_by(table.c.id)
+                    ).all()
+                    if time.monotonic() - last_prune >= self.prune_interval:
+                        last_prune = time.monotonic()
+                        # The newest row is kept, so ids keep growing even on
+                        # tables created before AUTOINCREMENT
+                        conn.execute(
+                            table.delete().where(
+                                table.c.created_at < time.time() - self.retention,
+                                table.c.id
+                                < select(func.max(table.c.id)).scalar_subquery(),
+                            )
+                        )
+            except Exception:
+                logger.exception("Polling cache invalidations failed")
+                continue
+            for row_id, payload in rows:
+                last_id = row_id
+                on_message(json.loads(payload))
+
+
+class PostgresTransport(Transport):
+    """
+    LISTEN/NOTIFY transport on the Postgres database.
+
+    A dropped listening connection is reopened with exponential backoff;
+    notifications sent meanwhile are lost, so the entries they would have
+    evicted live until their TTL.
+    """
+
+    name = "postgres"
+
+    def __init__(
+        self,
+        conninfo: str,
+        channel: str,
+        min_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+    ) -> None:
+        """Initialize the transport."""
+        self.conninfo = conninfo
+        self.channel = channel
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._send_conn: Any = None
+
+    def start(self, on_message: Callable[[Message], None]) -> None:
+        """Open a listening connection and start the receiver thread."""
+        listen_conn = self._connect_listener()
+        self._stop.clear()
+        threading.Thread(
+            target=self._listen, args=(listen_conn, on_message), daemon=True
+        ).start()
+
+    def send(self, message: Message) -> None:
+        """Notify the channel with `message`."""
+        import psycopg
+
+        with self._lock:
+            if self._send_conn is None or self._send_conn.closed:
+                self._send_conn = psycopg.connect(self.conninfo, autocommit=True)
+            self._send_conn.execute(
+                "SELECT pg_notify(%s, %s)", (self.channel, json.dumps(message))
+            )
+
+    def stop(self) -> None:
+        """Stop the receiver thread and close the sending connection."""
+        self._stop.set()
+        with self._lock:
+            if self._send_conn is not None:
+                self._send_conn.close()
+                self._send_conn = None
+
+    def _connect_listener(self) -> Any:
+        """Open a connection listening on the channel."""
+        import psycopg
+
+        conn = psycopg.connect(self.conninfo, autocommit=True)
+        conn.execute(f"LISTEN {self.channel}")
+        return conn
+
+    def _listen(self, conn: Any, on_message: Callable[[Message], None]) -> None:
+        """Deliver notifications until stopped, reconnecting when dropped."""
+        backoff = self.min_backoff
+        while not self._stop.is_set():
+            if conn is None:
+                try:
+                    conn = self._connect_listener()
+                except Exception:
+                    logger.exception(
+                        "Reconnecting the cache invalidation listener failed, "
+                        "retrying in %.1f s",
+                        backoff,
+                    )
+                    self._stop.wait(backoff)
+                    backoff = min(backoff * 2, self.max_backoff)
+                    continue
+                logger.warning(
+                    "Cache invalidation listener reconnected; invalidations "
+                    "sent while it was down were missed"
+                )
+                backoff = self.min_backoff
+            try:
+                with conn:
+                    while not self._stop.is_set():
+                        for notify in conn.notifies(timeout=1.0):
+                            on_message(json.loads(notify.payload))
+            except Exception:
+                if not self._stop.is_set():
+                    logger.exception("Cache invalidation listener lost its connection")
+            conn = None
+
+
+class InvalidationBus:
+    """Fan out committed invalidation tags to local caches and other workers."""
+
+    def __init__(self, transport: Transport) -> None:
+        """Initialize the bus."""
+        self.transport = transport
+        self.origin = uuid.uuid4().hex
+        self._subscribers: list[Subscriber] = []
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        """Call `subscriber` with the tags of every invalidation."""
+        self._subscribers.append(subscriber)
+
+    def publish(self, tags: Iterable[str]) -> None:
+        """Evict `tags` in this worker and broadcast them to the others."""
+        tags = frozenset(tags)
+        if not tags:
+            return
+        self._deliver(tags)
+        try:
+            self.transport.send({"origin": self.origin, "tags": sorted(tags)})
+        except Exception:
+            logger.exception("Broadcasting cache invalidation failed")
+
+    def start(self) -> None:
+        """Start receiving invalidations from the other workers."""
+        self.transport.start(self._on_message)
+
+    def stop(self) -> None:
+        """Stop receiving invalidations."""
+        self.transport.stop()
+
+    def _on_message(self, message: Message) -> None:
+        """Deliver a message from another worker."""
+        if message.get("origin") != self.origin:
+            self._deliver(frozenset(message.get("tags", ())))
+
+    def _deliver(self, tags: frozenset[str]) -> None:
+        """Call every subscriber with `tags`."""
+        for subscriber in self._subscribers:
+            try:
+                subscriber(tags)
+            except Exception:
+                logger.exception("Cache invalidation subscriber failed")
+
+
+def build_transport() -> Transport:
+    """Build the transport selected in the settings."""
+    if settings.INVALIDATION_TRANSPORT == "socket":
+        return SocketTransport(
+            settings.INVALIDATION_SOCKET_DIR
+            or os.path.join(tempfile.gettempdir(), "library-api-invalidation")
+        )
+    if settings.INVALIDATION_TRANSPORT == "sqlite":
+        return SqliteTransport(settings.INVALIDATION_POLL_INTERVAL_MS / 1000)
+    if settings.INVALIDATION_TRANSPORT == "postgres":
+        return PostgresTransport(
+            settings.DATABASE_URL.replace("+psycopg", ""),
+            settings.INVALIDATION_CHANNEL,
+        )
+    return LocalTransport()
+
+
+invalidation_bus = InvalidationBus(build_transport())
+
+
+def _pending_tags(session: Session) -> set[str]:
+    """Return the tables written by the current transaction of `session`."""
+    return session.info.setdefault("invalidation_tags", set())
+
+
+def has_pending_writes(session: Session) -> bool:
+    """Return True if the current transaction of `session` wrote any table."""
+    return bool(session.info.get("invalidation_tags"))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_invalidation_tags(session: Session, flush_context: Any) -> None:
+    """
+    Remember the tables written by a flush until the transaction ends.
+
+    Besides the tables of the flushed instances, these are the association
+    tables of the many-to-many collections they changed (e.g. library_users).
+    """
+    tags = _pending_tags(session)
+    for instance in chain(session.new, session.dirty, session.deleted):
+        state = inspect(instance)
+        tags.update(table.name for table in state.mapper.tables)
+        for relationship in state.mapper.relationships:
+            secondary = relationship.secondary
+            if isinstance(secondary, TableClause) and (
+                instance in session.deleted
+                or state.attrs[relationship.key].history.has_changes()
+            ):
+                tags.add(secondary.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_statement_invalidation_tags(orm_execute_state: ORMExecuteState) -> None:
+    """Remember the table written by an INSERT, UPDATE or DELETE statement."""
+    statement = orm_execute_state.statement
+    if isinstance(statement, UpdateBase) and isinstance(statement.table, TableClause):
+        _pending_tags(orm_execute_state.session).add(statement.table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_invalidation_tags(session: Session) -> None:
+    """Publish the tables written by a committed transaction."""
+    tags = session.info.pop("invalidation_tags", None)
+    if tags:
+        invalidation_bus.publish(tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidation_tags(session: Session) -> None:
+    """Forget the tables written by a rolled back transaction."""
+    session.info.pop("invalidation_tags", None)
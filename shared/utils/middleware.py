@@ -2,13 +2,11 @@
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
-from slowapi.util import get_remote_address
 
-limiter = Limiter(key_func=get_remote_address, default_limits=["100/minute"])
+from shared.utils.compression import CompressionMiddleware
+from shared.utils.ratelimit import RateLimitMiddleware
+from shared.utils.shedding import LoadSheddingMiddleware
+
 origins = [
     "http://localhost:5173",
     "http://localhost:5174",
@@ -17,14 +15,13 @@ origins = [
 
 def register_middleware(app: FastAPI) -> None:
     """Register middleware."""
-    # Requirements for slowapi middleware
-    app.state.limiter = limiter
-
-    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)  # type: ignore
-
     # TODO: Add Method not found response
 
-    # Middleware
+    # Middleware, outermost last
+    app.add_middleware(CompressionMiddleware)
+    app.add_middleware(RateLimitMiddleware)
+    app.add_middleware(LoadSheddingMiddleware)
+    # Outermost, so the 429 and 503 answered by the limiters get CORS headers
     app.add_middleware(
         CORSMiddleware,
         allow_origins=origins,
@@ -39,7 +36,8 @@ def register_middleware(app: FastAPI) -> None:
             "X-Prev",
             "X-Limit",
             "X-Offset",
+            "X-Total-Capped",
+            "X-Possible-Duplicates",
+            "Retry-After",
         ],
     )
-    app.add_middleware(SlowAPIMiddleware)
-    app.add_middleware(GZipMiddleware, minimum_size=1000)
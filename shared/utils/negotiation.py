@@ -0,0 +1,265 @@
+"""
+negotiation.py.
+
+`Accept`-based content negotiation for bulk reads. Besides JSON, row DTOs can
+be returned as MessagePack or as an Apache Arrow IPC stream, whose columns
+load into pandas without parsing. Both encoders are optional dependencies (the
+`formats` extra): a format whose package is not installed is not offered.
+"""
+
+import importlib
+import io
+from collections.abc import Iterable, Iterator
+from datetime import date, datetime
+from enum import Enum
+from importlib.util import find_spec
+from types import ModuleType
+from typing import Annotated, Any, get_args
+
+from fastapi import Depends, Request, Response
+from pydantic import BaseModel
+
+from config.settings import settings
+from shared.utils.errors import NotAcceptableError
+from shared.utils.fieldsets import Tree, nested_schema
+from shared.utils.serialization import dump_rows, json_response
+
+# Optional dependencies, installed with the `formats` extra
+msgpack: ModuleType | None = (
+    importlib.import_module("msgpack") if find_spec("msgpack") else None
+)
+pa: ModuleType | None = (
+    importlib.import_module("pyarrow") if find_spec("pyarrow") else None
+)
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+# Older names still sent by some MessagePack clients
+ALIASES = {"application/x-msgpack": MSGPACK, "application/vnd.msgpack": MSGPACK}
+WILDCARDS = frozenset({"*/*", "application/*"})
+
+
+def available_media_types() -> list[str]:
+    """Return the media types whose encoder is installed, JSON first."""
+    media_types = [JSON]
+    if msgpack is not None:
+        media_types.append(MSGPACK)
+    if pa is not None:
+        media_types.append(ARROW_STREAM)
+    return media_types
+
+
+def _parse_accept(header: str) -> list[str]:
+    """Return the media ranges of an Accept header by decreasing quality."""
+    ranges: list[tuple[float, int, str]] = []
+    for position, item in enumerate(header.split(",")):
+        media, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media and quality > 0:
+            media = media.lower()
+            ranges.append((-quality, position, ALIASES.get(media, media)))
+    return [media for _, _, media in sorted(ranges)]
+
+
+def preferred_media_type(request: Request) -> str | None:
+    """Return the available media type the client prefers, or None."""
+    header = request.headers.get("accept")
+    if not header:
+        return JSON
+    available = available_media_types()
+    for media in _parse_accept(header):
+        if media in WILDCARDS:
+            return JSON
+        if media in available:
+            return media
+    return None
+
+
+def negotiate(request: Request) -> str:
+    """Return the media type of a bulk response, or raise if none is acceptable."""
+    media_type = preferred_media_type(request)
+    if media_type is None:
+        raise NotAcceptableError(available_media_types())
+    return media_type
+
+
+MediaTypeDep = Annotated[str, Depends(negotiate)]
+
+
+def _required(module: ModuleType | None) -> ModuleType:
+    """Return the module of a negotiated encoder, refusing it if not installed."""
+    if module is None:
+        raise NotAcceptableError(available_media_types())
+    return module
+
+
+def _msgpack_default(value: Any) -> Any:
+    """Encode the values MessagePack has no type for, as JSON responses do."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} as MessagePack.")
+
+
+def _arrow_type(annotation: Any) -> tuple[Any, bool]:
+    """Return the Arrow type of a scalar field, and whether it holds enums."""
+    arrow = _required(pa)
+    base = next(
+        (arg for arg in get_args(annotation) if arg is not type(None)), annotation
+    )
+    if isinstance(base, type):
+        if issubclass(base, Enum):
+            return arrow.string(), True
+        if issubclass(base, bool):
+            return arrow.bool_(), False
+        if issubclass(base, int):
+            return arrow.int64(), False
+        if issubclass(base, float):
+            return arrow.float64(), False
+        if issubclass(base, datetime):
+            return arrow.timestamp("us"), False
+        if issubclass(base, date):
+            return arrow.date32(), False
+    return arrow.string(), False
+
+
+def _arrow_columns(
+    schema: type[BaseModel], include: Tree | None, prefix: tuple[str, ...] = ()
+) -> list[tuple[tuple[str, ...], Any, bool]]:
+    """Return the path, Arrow type and enum flag of each flattened column."""
+    columns: list[tuple[tuple[str, ...], Any, bool]] = []
+    for name, info in schema.model_fields.items():
+        if include is not None and name not in include:
+            continue
+        path = (*prefix, name)
+        child_schema = nested_schema(info.annotation)
+        if child_schema is not None:
+            child_include = (include[name] or None) if include is not None else None
+            columns += _arrow_columns(child_schema, child_include, path)
+        else:
+            columns.append((path, *_arrow_type(info.annotation)))
+    return columns
+
+
+def _column_values(
+    rows: list[dict[str, Any]], path: tuple[str, ...], is_enum: bool
+) -> list[Any]:
+    """Return the values of one flattened column of the row DTOs."""
+    values: list[Any] = []
+    for row in rows:
+        value: Any = row
+        for name in path:
+            value = value.get(name) if value is not None else None
+        values.append(value.value if is_enum and value is not None else value)
+    return values
+
+
+def _drain(sink: io.BytesIO) -> bytes:
+    """Return and clear what was written to `sink`."""
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+def arrow_stream(
+    schema: type[BaseModel],
+    batches: Iterable[list[dict[str, Any]]],
+    include: Tree | None = None,
+) -> Iterator[bytes]:
+    """
+    Encode batches of row DTOs as an Arrow IPC stream, one record batch each.
+
+    Nested schemas are flattened into dotted column names (e.g.
+    `material.title`), so every column is a primitive Arrow array.
+    """
+    arrow = _required(pa)
+    columns = _arrow_columns(schema, include)
+    arrow_schema = arrow.schema(
+        [arrow.field(".".join(path), arrow_type) for path, arrow_type, _ in columns]
+    )
+    sink = io.BytesIO()
+    with arrow.ipc.new_stream(sink, arrow_schema) as writer:
+        yield _drain(sink)
+        for rows in batches:
+            if not rows:
+                continue
+            arrays = [
+                arrow.array(_column_values(rows, path, is_enum), type=arrow_type)
+                for path, arrow_type, is_enum in columns
+            ]
+            writer.write_batch(arrow.record_batch(arrays, schema=arrow_schema))
+            yield _drain(sink)
+    yield _drain(sink)
+
+
+def _chunks(rows: list[dict[str, Any]], size: int) -> Iterator[list[dict[str, Any]]]:
+    """Split a list of row DTOs into consecutive chunks."""
+    for start in range(0, len(rows), size):
+        yield rows[start : start + size]
+
+
+def encode_rows(
+    media_type: str,
+    schema: type[BaseModel],
+    rows: list[dict[str, Any]],
+    include: Tree | None = None,
+) -> bytes:
+    """Encode a list of row DTOs of `schema` in the negotiated media type."""
+    if media_type == MSGPACK:
+        return _required(msgpack).packb(rows, default=_msgpack_default)
+    if media_type == ARROW_STREAM:
+        batches = _chunks(rows, settings.EXPORT_BATCH_ROWS)
+        return b"".join(arrow_stream(schema, batches, include))
+    return dump_rows(rows)
+
+
+def rows_response(
+    media_type: str,
+    schema: type[BaseModel],
+    rows: list[dict[str, Any]],
+    response: Response | None = None,
+    include: Tree | None = None,
+) -> Response:
+    """Wrap row DTOs encoded in the negotiated media type in a response."""
+    encoded = json_response(
+        encode_rows(media_type, schema, rows, include), response, media_type=media_type
+    )
+    encoded.headers["Vary"] = "Accept"
+    return encoded
+
+
+def stream_rows(
+    media_type: str,
+    schema: type[BaseModel],
+    batches: Iterable[list[dict[str, Any]]],
+    include: Tree | None = None,
+) -> Iterator[bytes]:
+    """
+    Encode batches of row DTOs as they are read, for export endpoints.
+
+    JSON is streamed as one array, MessagePack as a sequence of maps (read
+    with `msgpack.Unpacker`) and Arrow as an IPC stream.
+    """
+    if media_type == ARROW_STREAM:
+        yield from arrow_stream(schema, batches, include)
+    elif media_type == MSGPACK:
+        packer = _required(msgpack).Packer(default=_msgpack_default)
+        for rows in batches:
+            yield b"".join(packer.pack(row) for row in rows)
+    else:
+        separator = b"["
+        for rows in batches:
+            if rows:
+                yield separator + dump_rows(rows)[1:-1]
+                separator = b","
+        yield b"[]" if separator == b"[" else b"]"
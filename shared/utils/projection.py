@@ -0,0 +1,115 @@
+"""
+projection.py.
+
+Read-only data access that bypasses the ORM. A response schema is compiled
+into a Core `select()` of its columns, with an outer join per nested to-one
+relationship, and its DTOs are built straight from the result rows as plain
+dicts shaped like the schema. No entities enter the identity map, no
+attribute is instrumented and no model is validated, so ORM instances are
+only materialized for writes.
+"""
+
+from collections.abc import Callable, Hashable, Iterable
+from functools import cache
+from typing import Any, cast
+
+from pydantic import BaseModel
+from sqlalchemy import ColumnElement, Row, Select, inspect, select
+from sqlalchemy.orm import aliased
+
+from shared.utils.fieldsets import Tree, nested_schema
+
+Builder = Callable[[Row[Any]], dict[str, Any]]
+
+
+class Projection:
+    """Core projection of a response schema and the builder of its DTOs."""
+
+    def __init__(
+        self, schema: type[BaseModel], model: type[Any], include: Tree | None = None
+    ) -> None:
+        """Compile the columns and joins of `schema`, restricted to `include`."""
+        self.schema = schema
+        self.model = model
+        self.columns: list[ColumnElement[Any]] = []
+        self.joins: list[tuple[Any, Any]] = []
+        self._build, _ = self._plan(schema, model, model, include)
+
+    def _plan(
+        self,
+        schema: type[BaseModel],
+        model: type[Any],
+        entity: Any,
+        include: Tree | None,
+    ) -> tuple[Builder, int]:
+        """Add the columns of one schema level; return its row builder and key."""
+        mapper = inspect(model)
+        # (field, row position, nested builder) in schema order; the position
+        # of a nested schema is that of its primary key, or -1
+        plan: list[tuple[str, int, Builder | None]] = []
+        for name, info in schema.model_fields.items():
+            if include is not None and name not in include:
+                continue
+            child_schema = nested_schema(info.annotation)
+            if name in mapper.relationships and child_schema is not None:
+                relationship = mapper.relationships[name]
+                if relationship.uselist:
+                    raise TypeError(f"Cannot project to-many relationship '{name}'.")
+                target = aliased(relationship.mapper.class_)
+                self.joins.append((target, getattr(entity, name)))
+                child, child_key = self._plan(
+                    child_schema,
+                    relationship.mapper.class_,
+                    target,
+                    include[name] if include is not None else None,
+                )
+                plan.append((name, child_key, child))
+            elif name in mapper.column_attrs:
+                plan.append((name, len(self.columns), None))
+                self.columns.append(getattr(entity, name))
+            else:
+                raise TypeError(f"Field '{name}' is not a column of {model.__name__}.")
+
+        def build(row: Row[Any]) -> dict[str, Any]:
+            dto: dict[str, Any] = {}
+            for name, position, child in plan:
+                if child is None:
+                    dto[name] = row[position]
+                # A NULL primary key means the outer join found no row
+                elif position >= 0 and row[position] is None:
+                    dto[name] = None
+                else:
+                    dto[name] = child(row)
+            return dto
+
+        key = next(
+            (pos for name, pos, child in plan if name == "id" and child is None), -1
+        )
+        return build, key
+
+    def select(self) -> Select[Any]:
+        """Return the select of the projected columns, joined from the model."""
+        stmt = select(*self.columns).select_from(self.model)
+        for target, relationship in self.joins:
+            stmt = stmt.outerjoin(relationship.of_type(target))
+        return stmt
+
+    def build(self, rows: Iterable[Row[Any]]) -> list[dict[str, Any]]:
+        """Build the DTOs of the projected rows."""
+        return [self._build(row) for row in rows]
+
+
+@cache
+def _full_projection(schema: type[BaseModel], model: type[Any]) -> Projection:
+    """Return the cached projection of every field of `schema`."""
+    return Projection(schema, model)
+
+
+def project(
+    schema: type[BaseModel], model: type[Any], include: Tree | None = None
+) -> Projection:
+    """Return the projection of `schema` over `model`, restricted to `include`."""
+    if include is None:
+        # A mapped class is hashable, which `type[Any]` does not tell mypy
+        return _full_projection(schema, cast(Hashable, model))
+    return Projection(schema, model, include)
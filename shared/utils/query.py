@@ -0,0 +1,202 @@
+"""
+query.py.
+
+Declarative filter, sort and pagination engine for list endpoints. Each list
+endpoint declares a `QuerySpec` whitelisting the indexed columns it may filter
+and sort on; `CommonParameters` and typed filter models are compiled into SQL.
+"""
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic import BaseModel
+from sqlalchemy import (
+    Column,
+    PrimaryKeyConstraint,
+    Select,
+    UniqueConstraint,
+    func,
+    select,
+    text,
+)
+from sqlalchemy.orm import InstrumentedAttribute, Session
+
+from db.database import engine
+from shared.utils.deps import CommonParameters, SortEnum
+
+RANGE_SUFFIXES = {"_min": "__ge__", "_max": "__le__"}
+
+
+def is_indexed(column: Column[Any]) -> bool:
+    """Return True if `column` leads an index, a unique constraint or the pk."""
+    if column.index or column.unique:
+        return True
+    table: Any = column.table
+    leading = [next(iter(index.columns)) for index in table.indexes]
+    # Foreign keys are constraints too, but they are not backed by an index
+    leading += [
+        next(iter(constraint.columns))
+        for constraint in table.constraints
+        if isinstance(constraint, (PrimaryKeyConstraint, UniqueConstraint))
+        and len(constraint.columns) > 0
+    ]
+    return any(column is other for other in leading)
+
+
+@dataclass(frozen=True)
+class QuerySpec:
+    """
+    Whitelist of the columns a list endpoint can filter and sort on.
+
+    Attributes:
+        - filters: Columns accepted by `filter`/`filter_value` and by typed
+          filter fields. A `<name>_min`/`<name>_max` filter field is compiled
+          into a range on column `<name>`.
+        - sortable: Columns accepted by `sort`.
+        - default_sort: Column used when no `sort` is requested.
+    """
+
+    filters: Mapping[str, InstrumentedAttribute[Any]]
+    sortable: Mapping[str, InstrumentedAttribute[Any]]
+    default_sort: str = "id"
+
+    def __post_init__(self) -> None:
+        """Check that every whitelisted column is indexed."""
+        for name, attribute in {**self.filters, **self.sortable}.items():
+            if not is_indexed(attribute.property.columns[0]):
+                raise TypeError(f"Column '{name}' must be indexed to filter or sort")
+        if self.default_sort not in self.sortable:
+            raise TypeError(f"Default sort '{self.default_sort}' is not sortable")
+
+
+def bytewise(column: InstrumentedAttribute[Any]) -> Any:
+    """
+    Return `column` compared and sorted bytewise, like the folded keys are.
+
+    Prefix ranges of keys only hold in byte order, which is the default on
+    SQLite but on Postgres needs the "C" collation, in the index as well.
+    """
+    if engine.dialect.name == "postgresql":
+        return column.collate("C")
+    return column
+
+
+def create_bytewise_indexes(*columns: InstrumentedAttribute[Any]) -> None:
+    """Create the "C" collation indexes `bytewise` ranges need on Postgres."""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        for column in columns:
+            table = column.class_.__tablename__
+            conn.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table}_{column.key}_c "
+                    f'ON {table} ({column.key} COLLATE "C")'
+                )
+            )
+
+
+def _coerce(attribute: InstrumentedAttribute[Any], value: str) -> Any:
+    """Convert a query string value to the python type of a column."""
+    try:
+        return attribute.type.python_type(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid value for filter '{attribute.key}': {value}.")
+
+
+def apply_filters(
+    stmt: Select[Any],
+    spec: QuerySpec,
+    commons: CommonParameters,
+    filters: BaseModel | None = None,
+) -> Select[Any]:
+    """Add the WHERE clauses of the generic and typed filters to `stmt`."""
+    if commons.filter is not None:
+        attribute = spec.filters.get(commons.filter)
+        if attribute is None:
+            raise ValueError(
+                f"Filtering by '{commons.filter}' is not allowed. "
+                f"Allowed filters: {', '.join(sorted(spec.filters))}."
+            )
+        if commons.filter_value is None:
+            stmt = stmt.where(attribute.is_(None))
+        else:
+            stmt = stmt.where(attribute == _coerce(attribute, commons.filter_value))
+
+    if filters is not None:
+        for name, value in filters.model_dump(exclude_none=True).items():
+            operator = "__eq__"
+            for suffix, range_operator in RANGE_SUFFIXES.items():
+                if name.endswith(suffix) and name[: -len(suffix)] in spec.filters:
+                    name, operator = name[: -len(suffix)], range_operator
+            attribute = spec.filters.get(name)
+            if attribute is None:
+                raise ValueError(f"Filtering by '{name}' is not allowed.")
+            stmt = stmt.where(getattr(attribute, operator)(value))
+    return stmt
+
+
+def apply_sort(
+    stmt: Select[Any], spec: QuerySpec, commons: CommonParameters
+) -> Select[Any]:
+    """Add the ORDER BY of the requested sort to `stmt`."""
+    sort = commons.sort or spec.default_sort
+    attribute = spec.sortable.get(sort)
+    if attribute is None:
+        raise ValueError(
+            f"Sorting by '{sort}' is not allowed. "
+            f"Allowed sorts: {', '.join(sorted(spec.sortable))}."
+        )
+    clause = attribute.desc() if commons.order == SortEnum.DESC else attribute.asc()
+    tiebreaker = spec.sortable[spec.default_sort]
+    if attribute is tiebreaker:
+        return stmt.order_by(clause)
+    return stmt.order_by(clause, tiebreaker)
+
+
+def apply_query_params(
+    stmt: Select[Any],
+    spec: QuerySpec,
+    commons: CommonParameters,
+    filters: BaseModel | None = None,
+) -> Select[Any]:
+    """Compile the filters and sort of a list request into `stmt`."""
+    return apply_sort(apply_filters(stmt, spec, commons, filters), spec, commons)
+
+
+def count_rows(session: Session, stmt: Select[Any]) -> int:
+    """Count the rows `stmt` would return, ignoring its order and pagination."""
+    subquery = stmt.order_by(None).limit(None).offset(None).subquery()
+    return session.execute(select(func.count()).select_from(subquery)).scalar_one()
+
+
+def paginate(stmt: Select[Any], commons: CommonParameters) -> Select[Any]:
+    """Apply the offset and limit of a list request to `stmt`."""
+    return stmt.offset(commons.offset).limit(commons.limit)
+
+
+def db_read_page(
+    session: Session,
+    stmt: Select[Any],
+    spec: QuerySpec,
+    commons: CommonParameters,
+    filters: BaseModel | None = None,
+) -> tuple[list[Any], int]:
+    """Read one page of ORM entities matching a list request, and the total."""
+    stmt = apply_query_params(stmt, spec, commons, filters)
+    total = count_rows(session, stmt)
+    return list(session.scalars(paginate(stmt, commons)).unique()), total
+
+
+def db_read_row_page(
+    session: Session,
+    stmt: Select[Any],
+    spec: QuerySpec,
+    commons: CommonParameters,
+    filters: BaseModel | None = None,
+) -> tuple[list[Any], int]:
+    """Read one page of column projections matching a list request, and the total."""
+    stmt = apply_query_params(stmt, spec, commons, filters)
+    total = count_rows(session, stmt)
+    return list(session.execute(paginate(stmt, commons))), total
@@ -0,0 +1,387 @@
+"""
+ratelimit.py.
+
+Token-bucket rate limiting keyed by the authenticated user (the JWT subject),
+or by client IP for anonymous requests. Each request spends the cost of its
+route from the bucket, which refills at the configured rate.
+
+Buckets are decided locally, so admitting a request never waits on I/O. A
+background thread periodically flushes the tokens spent since the last
+flush to a shared store, which applies them to the bucket every worker sees
+and returns its level; the local bucket is then resynced. With the
+"database" store all workers share one limit, give or take one flush
+interval of overshoot.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Any
+
+from jose import JWTError, jwt
+from sqlalchemy import Column, Float, MetaData, String, Table, case, select
+from sqlalchemy.dialects import postgresql, sqlite
+from starlette import status
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config.settings import settings
+from db.database import engine
+from shared.utils.handlers import error_response
+
+logger = logging.getLogger(__name__)
+
+# Tokens spent by routes heavier than a plain request, by method and path
+ROUTE_COSTS: dict[tuple[str, str], float] = {
+    # bcrypt check of the password
+    ("POST", f"{settings.API_V1_STR}/login"): 10,
+    # bcrypt hash of the new password
+    ("POST", f"{settings.API_V1_STR}/user/"): 10,
+    # Streams the whole inventory
+    ("GET", f"{settings.API_V1_STR}/inventory/export"): 20,
+}
+# CORS preflights are free
+FREE_METHODS = frozenset({"OPTIONS"})
+
+
+def route_cost(method: str, path: str) -> float:
+    """Return the tokens a request to `path` spends."""
+    if method in FREE_METHODS:
+        return 0
+    return ROUTE_COSTS.get((method, path), 1)
+
+
+def _token_expiry(payload: dict[str, Any]) -> float | None:
+    """Return when a token expires: its `exp`, or the `expire` the API issues."""
+    exp = payload.get("exp")
+    if isinstance(exp, int | float):
+        return float(exp)
+    expire = payload.get("expire")
+    if isinstance(expire, str):
+        try:
+            return datetime.fromisoformat(expire).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _token_claims(token: str) -> tuple[str, float] | None:
+    """Return the subject of a signed access token and its expiry, or None."""
+    try:
+        payload = jwt.decode(
+            token, key=settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        )
+    except JWTError:
+        return None
+    subject = payload.get("subject")
+    expires_at = _token_expiry(payload)
+    if not isinstance(subject, str) or expires_at is None:
+        return None
+    return subject, expires_at
+
+
+def _token_subject(token: str) -> str | None:
+    """Return the subject of a valid access token, or None once it expired."""
+    claims = _token_claims(token)
+    # Checked on every call, since the decoded claims are cached
+    if claims is None or claims[1] <= time.time():
+        return None
+    return claims[0]
+
+
+def principal(scope: Scope) -> str:
+    """Return the bucket key of a request: its user, or else its client IP."""
+    authorization = Headers(scope=scope).get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        subject = _token_subject(token)
+        if subject is not None:
+            return f"user:{subject}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitStore:
+    """Base class for the shared store of bucket levels."""
+
+    name = "base"
+
+    def consume(
+        self, costs: dict[str, float], now: float, capacity: float, rate: float
+    ) -> dict[str, float]:
+        """Refill and spend `costs` from each bucket; return their new levels."""
+        raise NotImplementedError
+
+    def prune(self, before: float) -> None:
+        """Drop buckets untouched since `before`, which are full again anyway."""
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Per-worker stand-in: each worker enforces the limit on its own."""
+
+    name = "memory"
+
+    def __init__(self) -> None:
+        """Initialize the store."""
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def consume(
+        self, costs: dict[str, float], now: float, capacity: float, rate: float
+    ) -> dict[str, float]:
+        """Refill and spend `costs` from each bucket; return their new levels."""
+        levels: dict[str, float] = {}
+        for key, cost in costs.items():
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate) - cost
+            self._buckets[key] = (tokens, now)
+            levels[key] = tokens
+        return levels
+
+    def prune(self, before: float) -> None:
+        """Drop buckets untouched since `before`, which are full again anyway."""
+        for key, (_, updated_at) in list(self._buckets.items()):
+            if updated_at < before:
+                del self._buckets[key]
+
+
+rate_limits_table = Table(
+    "rate_limit_buckets",
+    MetaData(),
+    Column("key", String, primary_key=True),
+    Column("tokens", Float, nullable=False),
+    Column("updated_at", Float, nullable=False),
+)
+
+
+class DatabaseRateLimitStore(RateLimitStore):
+    """Buckets shared by every worker through a table of the app database."""
+
+    name = "database"
+
+    def __init__(self) -> None:
+        """Initialize the store and create its table."""
+        rate_limits_table.create(engine, checkfirst=True)
+        self._insert: Any = (
+            postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert
+        )
+
+    def consume(
+        self, costs: dict[str, float], now: float, capacity: float, rate: float
+    ) -> dict[str, float]:
+        """Refill and spend `costs` from each bucket; return their new levels."""
+        table = rate_limits_table
+        # Refilled in the upsert itself, so concurrent flushes never lose spends
+        refilled = table.c.tokens + (now - table.c.updated_at) * rate
+        with engine.begin() as conn:
+            for key, cost in costs.items():
+                stmt = self._insert(table).values(
+                    key=key, tokens=capacity - cost, updated_at=now
+                )
+                conn.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[table.c.key],
+                        set_={
+                            "tokens": case(
+                                (refilled > capacity, capacity), else_=refilled
+                            )
+                            - cost,
+                            "updated_at": now,
+                        },
+                    )
+                )
+            rows = conn.execute(
+                select(table.c.key, table.c.tokens).where(table.c.key.in_(costs))
+            ).all()
+        return {key: tokens for key, tokens in rows}
+
+    def prune(self, before: float) -> None:
+        """Drop buckets untouched since `before`, which are full again anyway."""
+        with engine.begin() as conn:
+            conn.execute(
+                rate_limits_table.delete().where(
+                    rate_limits_table.c.updated_at < before
+                )
+            )
+
+
+@dataclass
+class Bucket:
+    """Local view of a principal's bucket."""
+
+    tokens: float
+    updated_at: float
+    # Tokens spent here and not yet flushed to the store
+    pending: float = 0.0
+
+
+class RateLimiter:
+    """Local token buckets kept in sync with a shared store."""
+
+    def __init__(
+        self,
+        store: RateLimitStore,
+        per_minute: float,
+        burst: float,
+        sync_interval: float,
+        max_keys: int,
+    ) -> None:
+        """Initialize the limiter."""
+        self.store = store
+        self.rate = per_minute / 60
+        self.capacity = burst
+        self.sync_interval = sync_interval
+        self.max_keys = max_keys
+        self.admitted = 0
+        self.rejected = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self._buckets: OrderedDict[str, Bucket] = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._last_prune = 0.0
+
+    def acquire(self, key: str, cost: float) -> float:
+        """Spend `cost` tokens of `key`; return 0, or the seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = Bucket(self.capacity, now)
+                # Dropped buckets are refetched from the store on their next flush
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            bucket.tokens = min(
+                self.capacity, bucket.tokens + (now - bucket.updated_at) * self.rate
+            )
+            bucket.updated_at = now
+            if bucket.tokens < cost:
+                self.rejected += 1
+                return (cost - bucket.tokens) / self.rate
+            bucket.tokens -= cost
+            bucket.pending += cost
+            self.admitted += 1
+            return 0.0
+
+    def flush(self) -> None:
+        """Send the pending spends to the store and resync the local buckets."""
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Flush. Caller holds the flush lock."""
+        now = time.monotonic()
+        with self._lock:
+            costs = {
+                key: bucket.pending
+                for key, bucket in self._buckets.items()
+                if bucket.pending
+            }
+            for key in costs:
+                self._buckets[key].pending = 0.0
+        if costs:
+            try:
+                # The store keeps wall-clock times, shared by every worker
+                levels = self.store.consume(
+                    costs, time.time(), self.capacity, self.rate
+                )
+            except Exception:
+                self.flush_errors += 1
+                logger.exception("Flushing rate limit buckets failed")
+                with self._lock:
+                    for key, cost in costs.items():
+                        if key in self._buckets:
+                            self._buckets[key].pending += cost
+                return
+            with self._lock:
+                for key, level in levels.items():
+                    bucket = self._buckets.get(key)
+                    if bucket is not None:
+                        # Spends admitted during the flush are not in `level` yet
+                        bucket.tokens = level - bucket.pending
+                        bucket.updated_at = now
+            self.flushes += 1
+        if now - self._last_prune > 60:
+            self._last_prune = now
+            try:
+                self.store.prune(time.time() - self.capacity / self.rate)
+            except Exception:
+                logger.exception("Pruning rate limit buckets failed")
+
+    def start(self) -> None:
+        """Start flushing in a background thread."""
+        self._stop.clear()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self) -> None:
+        """Flush once more and stop the background thread."""
+        self._stop.set()
+        self.flush()
+
+    def stats(self) -> dict[str, Any]:
+        """Return the limiter metrics."""
+        return {
+            "store": self.store.name,
+            "per_minute": self.rate * 60,
+            "burst": self.capacity,
+            "tracked_keys": len(self._buckets),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+        }
+
+    def _run(self) -> None:
+        """Flush every sync interval until stopped."""
+        while not self._stop.wait(self.sync_interval):
+            self.flush()
+
+
+class RateLimitMiddleware:
+    """Reject requests whose principal has run out of tokens with a 429."""
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter | None = None) -> None:
+        """Initialize the middleware."""
+        self.app = app
+        self.limiter = limiter or rate_limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Spend the cost of an HTTP request, or answer it with a 429."""
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        cost = route_cost(scope["method"], scope["path"])
+        wait = self.limiter.acquire(principal(scope), cost) if cost else 0.0
+        if wait:
+            response = error_response(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                "Rate limit exceeded",
+                {"Retry-After": str(math.ceil(wait))},
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+def build_rate_limit_store() -> RateLimitStore:
+    """Build the rate limit store selected in the settings."""
+    if settings.RATE_LIMIT_STORE == "database":
+        return DatabaseRateLimitStore()
+    return MemoryRateLimitStore()
+
+
+rate_limiter = RateLimiter(
+    build_rate_limit_store(),
+    settings.RATE_LIMIT_PER_MINUTE,
+    settings.RATE_LIMIT_BURST,
+    settings.RATE_LIMIT_SYNC_MS / 1000,
+    settings.RATE_LIMIT_MAX_KEYS,
+)
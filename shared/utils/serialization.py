@@ -0,0 +1,71 @@
+"""
+serialization.py.
+
+Fast response path for read endpoints. ORM objects are validated once into
+the response schema and dumped straight to JSON bytes, so FastAPI neither
+re-validates nor re-serializes the returned model. Routes keep declaring
+`response_model` in their decorator for the OpenAPI documentation.
+"""
+
+from functools import cache
+from typing import Any
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+# Recomputed for every response, so never copied from the route's response
+COMPUTED_HEADERS = frozenset({"content-length", "content-type"})
+
+
+@cache
+def get_adapter(schema: Any) -> TypeAdapter[Any]:
+    """Return the cached TypeAdapter of a response schema."""
+    return TypeAdapter(schema)
+
+
+def dump_json(schema: Any, value: Any, **options: Any) -> bytes:
+    """
+    Validate `value` from attributes as `schema` and dump it to JSON bytes.
+
+    `options` are passed to `TypeAdapter.dump_json` (e.g. `exclude_none`).
+    """
+    adapter = get_adapter(schema)
+    return adapter.dump_json(
+        adapter.validate_python(value, from_attributes=True), **options
+    )
+
+
+def dump_rows(value: Any) -> bytes:
+    """
+    Dump row DTOs, plain dicts already shaped like their schema, to JSON bytes.
+
+    Values come from typed columns, so they are serialized by inference
+    without validation.
+    """
+    return get_adapter(Any).dump_json(value)
+
+
+def json_response(
+    body: bytes,
+    response: Response | None = None,
+    status_code: int = 200,
+    media_type: str = "application/json",
+) -> Response:
+    """
+    Wrap pre-serialized JSON in a response.
+
+    FastAPI does not merge the headers of the route's `response: Response`
+    parameter into a returned response, so they are copied here.
+    """
+    headers = (
+        {
+            name: value
+            for name, value in response.headers.items()
+            if name not in COMPUTED_HEADERS
+        }
+        if response is not None
+        else None
+    )
+    return Response(
+        body, status_code=status_code, media_type=media_type, headers=headers
+    )
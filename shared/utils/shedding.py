@@ -0,0 +1,238 @@
+"""
+shedding.py.
+
+Adaptive concurrency limiting and load shedding. Requests are grouped in
+route classes (auth, reads, writes), each with its own limit of requests in
+flight. Limits adapt AIMD-style: every request that starts its response
+within the class's latency target raises the limit a little, and a slow or
+failed one cuts it by a fraction, so the limit settles where the workers
+and the database pool keep up.
+
+A request over the limit waits briefly for a free slot and is otherwise
+shed at once with a 503 and `Retry-After`, instead of queueing until it
+times out. System endpoints (health and metrics) are never limited, and
+authenticated writes may use some headroom above their class's limit.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any
+
+from starlette import status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.settings import settings
+from shared.utils.handlers import error_response
+from shared.utils.ratelimit import principal
+
+# Routes whose cost is dominated by bcrypt
+AUTH_ROUTES = frozenset(
+    {
+        ("POST", f"{settings.API_V1_STR}/login"),
+        ("POST", f"{settings.API_V1_STR}/user/"),
+    }
+)
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+HEALTH_PREFIX = f"{settings.API_V1_STR}/system/"
+# Weight of the newest sample in the latency and queueing averages
+EWMA_WEIGHT = 0.1
+
+
+def route_class(method: str, path: str) -> str:
+    """Return the class of a request: health, auth, reads or writes."""
+    if path.startswith(HEALTH_PREFIX):
+        return "health"
+    if (method, path) in AUTH_ROUTES:
+        return "auth"
+    return "reads" if method in READ_METHODS else "writes"
+
+
+class AdaptiveLimit:
+    """AIMD concurrency limit of one route class, with its admission queue."""
+
+    def __init__(
+        self,
+        name: str,
+        target_latency: float,
+        initial: float,
+        minimum: float,
+        maximum: float,
+        backoff: float = 0.9,
+    ) -> None:
+        """Initialize the limit."""
+        self.name = name
+        self.target_latency = target_latency
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+        self.latency = 0.0
+        self.queue_delay = 0.0
+        self._last_decrease = 0.0
+        # Priority waiters are woken first
+        self._waiters: tuple[deque[asyncio.Future[None]], ...] = (deque(), deque())
+
+    def capacity(self, priority: bool) -> int:
+        """Return how many requests may be in flight for a request."""
+        headroom = settings.SHEDDING_PRIORITY_HEADROOM if priority else 0.0
+        return max(1, math.floor(self.limit * (1 + headroom)))
+
+    async def acquire(self, priority: bool, max_wait: float, max_queue: int) -> bool:
+        """Take a slot, waiting at most `max_wait`; return False to shed."""
+        if self.in_flight < self.capacity(priority) and not any(self._waiters):
+            self.in_flight += 1
+            self._admit(0.0)
+            return True
+        if len(self._waiters[0]) + len(self._waiters[1]) >= max_queue:
+            self.shed += 1
+            return False
+        started = time.monotonic()
+        waiters = self._waiters[0 if priority else 1]
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, max_wait)
+        except (TimeoutError, asyncio.CancelledError) as exc:
+            if waiter in waiters:
+                waiters.remove(waiter)
+            elif waiter.done() and not waiter.cancelled():
+                # Handed a slot just as the wait ended: pass it on
+                self.release()
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            self.shed += 1
+            return False
+        # The releasing request already counted this one in flight
+        self._admit(time.monotonic() - started)
+        return True
+
+    def release(self) -> None:
+        """Free a slot and hand it to the next waiter that fits."""
+        self.in_flight -= 1
+        for priority, waiters in zip((True, False), self._waiters, strict=True):
+            while waiters and self.in_flight < self.capacity(priority):
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    # Counted from now, so no other request takes the slot
+                    self.in_flight += 1
+                    waiter.set_result(None)
+
+    def record(self, latency: float, failed: bool) -> None:
+        """Adapt the limit to the latency of a request: AIMD."""
+        self.latency += EWMA_WEIGHT * (latency - self.latency)
+        now = time.monotonic()
+        if failed or latency > self.target_latency:
+            # At most one cut per target latency, for the requests already
+            # in flight when the overload started
+            if now - self._last_decrease > self.target_latency:
+                self.limit = max(self.minimum, self.limit * self.backoff)
+                self._last_decrease = now
+        elif self.in_flight >= self.limit / 2:
+            # Only grow while the limit is actually used
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the metrics of the class."""
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters[0]) + len(self._waiters[1]),
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "latency_ms": round(self.latency * 1000, 2),
+            "queue_delay_ms": round(self.queue_delay * 1000, 2),
+        }
+
+    def _admit(self, waited: float) -> None:
+        """Count an admitted request and the time it queued."""
+        self.admitted += 1
+        self.queue_delay += EWMA_WEIGHT * (waited - self.queue_delay)
+
+
+class LoadShedder:
+    """Adaptive limits of every route class."""
+
+    def __init__(self) -> None:
+        """Initialize one limit per route class."""
+        targets = {
+            "auth": settings.SHEDDING_AUTH_TARGET_MS,
+            "reads": settings.SHEDDING_READ_TARGET_MS,
+            "writes": settings.SHEDDING_WRITE_TARGET_MS,
+        }
+        self.limits = {
+            name: AdaptiveLimit(
+                name,
+                target / 1000,
+                settings.SHEDDING_INITIAL_LIMIT,
+                settings.SHEDDING_MIN_LIMIT,
+                settings.SHEDDING_MAX_LIMIT,
+            )
+            for name, target in targets.items()
+        }
+
+    def stats(self) -> dict[str, Any]:
+        """Return the metrics of every route class."""
+        return {name: limit.stats() for name, limit in self.limits.items()}
+
+
+class LoadSheddingMiddleware:
+    """Admit requests within their class's adaptive limit, shed the rest."""
+
+    def __init__(self, app: ASGIApp, shedder: LoadShedder | None = None) -> None:
+        """Initialize the middleware."""
+        self.app = app
+        self.shedder = shedder or load_shedder
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Run an HTTP request within its class's limit, or answer a 503."""
+        if scope["type"] != "http" or not settings.SHEDDING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        kind = route_class(scope["method"], scope["path"])
+        if kind == "health":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.shedder.limits[kind]
+        priority = kind == "writes" and principal(scope).startswith("user:")
+        admitted = await limit.acquire(
+            priority,
+            settings.SHEDDING_MAX_QUEUE_MS / 1000,
+            settings.SHEDDING_MAX_QUEUE,
+        )
+        if not admitted:
+            response = error_response(
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                "Server overloaded, try again later",
+                {"Retry-After": str(settings.SHEDDING_RETRY_AFTER_SECONDS)},
+            )
+            await response(scope, receive, send)
+            return
+
+        started = time.monotonic()
+        recorded = False
+
+        async def send_timed(message: Message) -> None:
+            nonlocal recorded
+            # Time to the response start, so streamed bodies do not count
+            if message["type"] == "http.response.start" and not recorded:
+                recorded = True
+                limit.record(time.monotonic() - started, message["status"] >= 500)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        except Exception:
+            if not recorded:
+                limit.record(time.monotonic() - started, failed=True)
+            raise
+        finally:
+            limit.release()
+
+
+load_shedder = LoadShedder()
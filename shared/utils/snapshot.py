@@ -0,0 +1,83 @@
+"""
+snapshot.py.
+
+In-memory snapshots of database tables, refreshed off the request path.
+Readers always get the last snapshot built; only the very first read of a
+worker builds one synchronously. A reported write starts a rebuild in a
+background thread, and writes reported while it runs trigger one more, so
+a snapshot lags the table by about one rebuild and no request ever pays
+for scanning the whole table.
+"""
+
+import logging
+import threading
+
+from sqlalchemy.orm import Session
+
+from db.database import engine
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotStore[T]:
+    """Base class for an in-memory snapshot rebuilt in the background."""
+
+    def __init__(self) -> None:
+        """Initialize the store."""
+        self.rebuilds = 0
+        self._snapshot: T | None = None
+        # Serializes builds
+        self._lock = threading.Lock()
+        # Guards the rebuild flags
+        self._state_lock = threading.Lock()
+        self._stale = False
+        self._rebuilding = False
+
+    def build(self, session: Session) -> T:
+        """Build a snapshot of the table with `session`."""
+        raise NotImplementedError
+
+    def load(self, session: Session) -> T:
+        """Build the snapshot with `session` and serve it from now on."""
+        with self._lock:
+            snapshot = self.build(session)
+            self._snapshot = snapshot
+            self.rebuilds += 1
+            return snapshot
+
+    def get(self) -> T:
+        """Return the snapshot, building it on the first call."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with Session(engine) as session:
+                snapshot = self.load(session)
+        return snapshot
+
+    def refresh(self) -> None:
+        """Rebuild the snapshot in the background after a write."""
+        if self._snapshot is None and not self._lock.locked():
+            # Never read yet: the first read builds it
+            return
+        with self._state_lock:
+            self._stale = True
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild, daemon=True).start()
+
+    def _rebuild(self) -> None:
+        """Rebuild until no write was reported during the last rebuild."""
+        while True:
+            with self._state_lock:
+                if not self._stale:
+                    self._rebuilding = False
+                    return
+                self._stale = False
+            try:
+                with Session(engine) as session:
+                    self.load(session)
+            except Exception:
+                logger.exception("Rebuilding %s failed", type(self).__name__)
+                with self._state_lock:
+                    self._rebuilding = False
+                return
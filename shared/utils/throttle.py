@@ -0,0 +1,299 @@
+"""
+throttle.py.
+
+Brute-force throttling of logins. Failed attempts are tracked per username
+and per client IP in a sliding window; once either collects too many, later
+attempts are rejected before the password is checked, so a credential
+stuffing run cannot keep bcrypt busy. Each new lockout of a key lasts
+twice as long as the previous one, until a window passes without failures.
+
+Windows live in memory, one ring buffer of failure times per key. With the
+"database" store they are also kept in a table of the app database, so
+every worker sees the failures and lockouts of the others.
+"""
+
+import logging
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any
+
+from sqlalchemy import (
+    Column,
+    Float,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    select,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config.settings import settings
+from db.database import engine
+from shared.utils.errors import TooManyAttemptsError
+from shared.utils.identifiers import fold_key
+
+logger = logging.getLogger(__name__)
+
+
+class FailureWindow:
+    """Ring buffer of the latest failure times of one key, and its lockout."""
+
+    __slots__ = ("blocked_until", "head", "strikes", "times")
+
+    def __init__(self, size: int) -> None:
+        """Initialize an empty window of `size` failures."""
+        self.times = array("d", bytes(8 * size))
+        self.head = 0
+        # Lockouts since the key last went a whole window without failures
+        self.strikes = 0
+        self.blocked_until = 0.0
+
+    def add(
+        self, now: float, window: float, backoff: float, max_backoff: float
+    ) -> bool:
+        """Record a failure; return True if it starts a lockout."""
+        if now - self.times[self.head - 1] > window:
+            self.strikes = 0
+        self.times[self.head] = now
+        self.head = (self.head + 1) % len(self.times)
+        # The slot about to be overwritten holds the oldest of the last failures
+        if now - self.times[self.head] > window:
+            return False
+        self.strikes += 1
+        self.blocked_until = now + min(max_backoff, backoff * 2 ** (self.strikes - 1))
+        return True
+
+
+class ThrottleStore:
+    """Base class for the shared store of failure windows."""
+
+    name = "base"
+
+    def load(self, key: str, size: int) -> FailureWindow | None:
+        """Return the stored window of `key`, or None."""
+        return None
+
+    def save(self, key: str, failures: FailureWindow, now: float) -> None:
+        """Store the window of `key`."""
+
+    def delete(self, key: str) -> None:
+        """Forget the window of `key`."""
+
+    def prune(self, before: float) -> None:
+        """Drop the windows untouched since `before`."""
+
+
+class MemoryThrottleStore(ThrottleStore):
+    """Per-worker stand-in: windows only live in the tracker's memory."""
+
+    name = "memory"
+
+
+login_failures_table = Table(
+    "login_failures",
+    MetaData(),
+    Column("key", String, primary_key=True),
+    Column("times", LargeBinary, nullable=False),
+    Column("head", Integer, nullable=False),
+    Column("strikes", Integer, nullable=False),
+    Column("blocked_until", Float, nullable=False),
+    Column("updated_at", Float, nullable=False),
+)
+
+
+class DatabaseThrottleStore(ThrottleStore):
+    """Windows shared by every worker through a table of the app database."""
+
+    name = "database"
+
+    def __init__(self) -> None:
+        """Initialize the store and create its table."""
+        login_failures_table.create(engine, checkfirst=True)
+        self._insert: Any = (
+            postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert
+        )
+
+    def load(self, key: str, size: int) -> FailureWindow | None:
+        """Return the stored window of `key`, or None."""
+        table = login_failures_table
+        with engine.connect() as conn:
+            row = conn.execute(
+                select(
+                    table.c.times, table.c.head, table.c.strikes, table.c.blocked_until
+                ).where(table.c.key == key)
+            ).first()
+        if row is None:
+            return None
+        failures = FailureWindow(size)
+        times = array("d", row.times)
+        if len(times) == size:
+            failures.times, failures.head = times, row.head
+        failures.strikes = row.strikes
+        failures.blocked_until = row.blocked_until
+        return failures
+
+    def save(self, key: str, failures: FailureWindow, now: float) -> None:
+        """Store the window of `key`."""
+        values = {
+            "times": failures.times.tobytes(),
+            "head": failures.head,
+            "strikes": failures.strikes,
+            "blocked_until": failures.blocked_until,
+            "updated_at": now,
+        }
+        stmt = self._insert(login_failures_table).values(key=key, **values)
+        with engine.begin() as conn:
+            conn.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[login_failures_table.c.key], set_=values
+                )
+            )
+
+    def delete(self, key: str) -> None:
+        """Forget the window of `key`."""
+        with engine.begin() as conn:
+            conn.execute(
+                login_failures_table.delete().where(login_failures_table.c.key == key)
+            )
+
+    def prune(self, before: float) -> None:
+        """Drop the windows untouched since `before`."""
+        with engine.begin() as conn:
+            conn.execute(
+                login_failures_table.delete().where(
+                    login_failures_table.c.updated_at < before
+                )
+            )
+
+
+class LoginThrottle:
+    """Sliding-window failure tracker of logins, per username and per IP."""
+
+    def __init__(
+        self,
+        store: ThrottleStore,
+        window: float,
+        user_failures: int,
+        ip_failures: int,
+        backoff: float,
+        max_backoff: float,
+        max_keys: int,
+    ) -> None:
+        """Initialize the throttle."""
+        self.store = store
+        self.window = window
+        self.sizes = {"user": user_failures, "ip": ip_failures}
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_keys = max_keys
+        self.failures = 0
+        self.lockouts = 0
+        self.throttled = {"user": 0, "ip": 0}
+        self._windows: OrderedDict[str, FailureWindow] = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+    def check(self, username: str, client_ip: str | None = None) -> None:
+        """Raise TooManyAttemptsError if the username or the IP is locked out."""
+        now = time.time()
+        for kind, key in self._keys(username, client_ip):
+            failures = self._window(kind, key)
+            if failures is not None and failures.blocked_until > now:
+                with self._lock:
+                    self.throttled[kind] += 1
+                raise TooManyAttemptsError(failures.blocked_until - now)
+
+    def record_failure(self, username: str, client_ip: str | None = None) -> None:
+        """Record a failed attempt of the username from the IP."""
+        now = time.time()
+        for kind, key in self._keys(username, client_ip):
+            failures = self._window(kind, key) or FailureWindow(self.sizes[kind])
+            with self._lock:
+                self.failures += 1
+                if failures.add(now, self.window, self.backoff, self.max_backoff):
+                    self.lockouts += 1
+                self._remember(key, failures)
+            self._persist(self.store.save, key, failures, now)
+        if now - self._last_prune > 60:
+            self._last_prune = now
+            self._persist(self.store.prune, now - self.window - self.max_backoff)
+
+    def record_success(self, username: str) -> None:
+        """Clear the failures of a username after it logged in."""
+        key = self._key("user", username)
+        with self._lock:
+            self._windows.pop(key, None)
+        self._persist(self.store.delete, key)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the throttle metrics."""
+        return {
+            "store": self.store.name,
+            "tracked_keys": len(self._windows),
+            "failures": self.failures,
+            "lockouts": self.lockouts,
+            "throttled_by_username": self.throttled["user"],
+            "throttled_by_ip": self.throttled["ip"],
+        }
+
+    @staticmethod
+    def _key(kind: str, value: str) -> str:
+        """Return the tracking key of a username or an IP."""
+        return f"{kind}:{fold_key(value) if kind == 'user' else value}"
+
+    def _keys(self, username: str, client_ip: str | None) -> list[tuple[str, str]]:
+        """Return the kinds and keys an attempt is tracked under."""
+        keys = [("user", self._key("user", username))]
+        if client_ip:
+            keys.append(("ip", self._key("ip", client_ip)))
+        return keys
+
+    def _window(self, kind: str, key: str) -> FailureWindow | None:
+        """Return the window of `key`, from the store when it is shared."""
+        try:
+            failures = self.store.load(key, self.sizes[kind])
+        except Exception:
+            logger.exception("Loading login failures failed")
+            failures = None
+        with self._lock:
+            if failures is not None:
+                self._remember(key, failures)
+                return failures
+            return self._windows.get(key)
+
+    def _remember(self, key: str, failures: FailureWindow) -> None:
+        """Keep the window of `key` in memory. Caller holds the lock."""
+        self._windows[key] = failures
+        self._windows.move_to_end(key)
+        while len(self._windows) > self.max_keys:
+            self._windows.popitem(last=False)
+
+    @staticmethod
+    def _persist(operation: Any, *args: Any) -> None:
+        """Run a store write, logging failures so logins keep working."""
+        try:
+            operation(*args)
+        except Exception:
+            logger.exception("Storing login failures failed")
+
+
+def build_throttle_store() -> ThrottleStore:
+    """Build the login throttle store selected in the settings."""
+    if settings.LOGIN_THROTTLE_STORE == "database":
+        return DatabaseThrottleStore()
+    return MemoryThrottleStore()
+
+
+login_throttle = LoginThrottle(
+    build_throttle_store(),
+    settings.LOGIN_THROTTLE_WINDOW_SECONDS,
+    settings.LOGIN_THROTTLE_USER_FAILURES,
+    settings.LOGIN_THROTTLE_IP_FAILURES,
+    settings.LOGIN_THROTTLE_BACKOFF_SECONDS,
+    settings.LOGIN_THROTTLE_MAX_BACKOFF_SECONDS,
+    settings.LOGIN_THROTTLE_MAX_KEYS,
+)
@@ -1,4 +1,5 @@
 import re
+from collections.abc import Sequence
 from typing import Any, TypeVar
 
 from sqlalchemy import UniqueConstraint, select
@@ -22,12 +23,15 @@ def validate_email_format(email: str) -> bool:
 
 
 def validate_entity_existence(
-    session: Session, entity_type: type[T], entity_id: int
+    session: Session,
+    entity_type: type[T],
+    entity_id: int,
+    options: Sequence[Any] = (),
 ) -> T:
     """Valida la existencia de una entidad en la base de datos y la devuelve."""
     if entity_id <= 0:
         raise ValueError(f"ID invalid: {entity_id}.")
-    entity = session.get(entity_type, entity_id)
+    entity = session.get(entity_type, entity_id, options=options)
     if not entity:
         raise NotFoundError(entity_type.__name__, "id", entity_id)
     return entity
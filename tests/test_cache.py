@@ -0,0 +1,90 @@
+"""Tests of the tag-invalidated response cache and its backends."""
+
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from shared.utils.cache import (
+    CacheBackend,
+    MemoryCacheBackend,
+    ResponseCache,
+    SqliteCacheBackend,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request: pytest.FixtureRequest, tmp_path: Path) -> CacheBackend:
+    """Return each cache backend, empty."""
+    if request.param == "sqlite":
+        return SqliteCacheBackend(str(tmp_path / "cache.db"), 100, 1 << 20)
+    return MemoryCacheBackend(100, 1 << 20)
+
+
+def cached_app(cache: ResponseCache, rows: list[str]) -> TestClient:
+    """Return a client of an app serving `rows` from a route cached by table."""
+    app = FastAPI()
+
+    @app.get("/materials")
+    @cache.cached("materials")
+    async def read_materials(request: Request) -> list[str]:
+        return list(rows)
+
+    return TestClient(app)
+
+
+def test_backends_are_abstract() -> None:
+    class PartialBackend(CacheBackend):
+        def get(self, key: str) -> bytes | None:
+            return None
+
+    with pytest.raises(TypeError):
+        PartialBackend()  # type: ignore[abstract]
+
+
+def test_invalidation_evicts_the_tagged_responses(backend: CacheBackend) -> None:
+    cache = ResponseCache(backend, 60)
+    rows = ["Libro 1"]
+    client = cached_app(cache, rows)
+
+    first = client.get("/materials")
+    assert (first.headers["X-Cache"], first.json()) == ("MISS", ["Libro 1"])
+    rows.append("Libro 2")
+    second = client.get("/materials")
+    assert (second.headers["X-Cache"], second.json()) == ("HIT", ["Libro 1"])
+
+    assert cache.invalidate("authors") == 0
+    assert cache.invalidate("materials") == 1
+    third = client.get("/materials")
+    assert (third.headers["X-Cache"], third.json()) == ("MISS", ["Libro 1", "Libro 2"])
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_stale_write_racing_an_invalidation_is_dropped(
+    backend: CacheBackend,
+) -> None:
+    generations = backend.generations(["materials"])
+    # A write commits while the response is being built
+    backend.invalidate_tags(["materials"])
+    backend.set("key", b"stale", ["materials"], 60, generations)
+    assert backend.get("key") is None
+
+    backend.set("key", b"fresh", ["materials"], 60, backend.generations(["materials"]))
+    assert backend.get("key") == b"fresh"
+
+
+def test_response_built_during_a_write_is_not_cached(backend: CacheBackend) -> None:
+    cache = ResponseCache(backend, 60)
+    rows = ["Libro 1"]
+    app = FastAPI()
+
+    @app.get("/materials")
+    @cache.cached("materials")
+    async def read_materials(request: Request) -> list[str]:
+        cache.invalidate("materials")
+        return list(rows)
+
+    client = TestClient(app)
+    assert client.get("/materials").headers["X-Cache"] == "MISS"
+    assert client.get("/materials").headers["X-Cache"] == "MISS"
@@ -0,0 +1,116 @@
+"""Tests of the single-flight coalescing of concurrent loads."""
+
+import asyncio
+import threading
+
+import pytest
+
+from shared.utils.coalescing import RequestCoalescer
+
+
+class Loader:
+    """Loader that blocks in its thread until released, counting its calls."""
+
+    def __init__(self, result: str, error: Exception | None = None) -> None:
+        """Initialize the loader."""
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.released = threading.Event()
+
+    def __call__(self) -> str:
+        """Wait for the release, then return the result or raise the error."""
+        self.calls += 1
+        self.released.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+async def started(coalescer: RequestCoalescer, key: str) -> None:
+    """Wait until a load of `key` is in flight."""
+    while key not in coalescer._inflight:
+        await asyncio.sleep(0)
+
+
+def test_followers_share_the_leaders_result() -> None:
+    async def scenario() -> tuple[list[str], int]:
+        coalescer = RequestCoalescer(5, 10)
+        loader = Loader("material")
+        leader = asyncio.create_task(coalescer.run("m:1", loader))
+        await started(coalescer, "m:1")
+        followers = [
+            asyncio.create_task(coalescer.run("m:1", loader)) for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        loader.released.set()
+        results = await asyncio.gather(leader, *followers)
+        assert coalescer.key_stats("m:1") == {
+            "leaders": 1,
+            "followers": 3,
+            "timeouts": 0,
+        }
+        assert "m:1" not in str(coalescer.stats())
+        return results, loader.calls
+
+    assert asyncio.run(scenario()) == (["material"] * 4, 1)
+
+
+def test_followers_get_the_leaders_error() -> None:
+    async def scenario() -> tuple[list[str | BaseException], int]:
+        coalescer = RequestCoalescer(5, 10)
+        loader = Loader("material", LookupError("gone"))
+        leader = asyncio.create_task(coalescer.run("m:1", loader))
+        await started(coalescer, "m:1")
+        follower = asyncio.create_task(coalescer.run("m:1", loader))
+        await asyncio.sleep(0)
+        loader.released.set()
+        results = await asyncio.gather(leader, follower, return_exceptions=True)
+        return list(results), loader.calls
+
+    results, calls = asyncio.run(scenario())
+    assert [type(result) for result in results] == [LookupError, LookupError]
+    assert calls == 1
+
+
+def test_slow_leader_makes_followers_load_themselves() -> None:
+    async def scenario() -> tuple[str, int]:
+        coalescer = RequestCoalescer(0.01, 10)
+        slow = Loader("slow")
+        leader = asyncio.create_task(coalescer.run("m:1", slow))
+        await started(coalescer, "m:1")
+        fast = Loader("fast")
+        fast.released.set()
+        try:
+            result = await coalescer.run("m:1", fast)
+        finally:
+            slow.released.set()
+        await leader
+        return result, coalescer.stats()["timeouts"]
+
+    assert asyncio.run(scenario()) == ("fast", 1)
+
+
+def test_cancelled_leader_hands_over_to_a_follower() -> None:
+    async def scenario() -> tuple[list[str], int]:
+        coalescer = RequestCoalescer(5, 10)
+        stuck = Loader("stuck")
+        leader = asyncio.create_task(coalescer.run("m:1", stuck))
+        await started(coalescer, "m:1")
+        loader = Loader("material")
+        followers = [
+            asyncio.create_task(coalescer.run("m:1", loader)) for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        leader.cancel()
+        try:
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            await started(coalescer, "m:1")
+            loader.released.set()
+            results = await asyncio.wait_for(asyncio.gather(*followers), 1)
+        finally:
+            stuck.released.set()
+        return results, loader.calls
+
+    assert asyncio.run(scenario()) == (["material"] * 2, 1)
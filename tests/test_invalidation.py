@@ -0,0 +1,130 @@
+"""Tests of the tables collected by sessions for cache invalidation."""
+
+from collections.abc import Iterator
+from typing import Self
+
+import pytest
+from sqlalchemy import create_engine, delete, update
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app import models  # noqa: F401
+from app.models.author import DBAuthor
+from app.models.base import Base
+from app.models.library import DBLibrary
+from app.models.user import DBUser
+from shared.utils.invalidation import Message, PostgresTransport, invalidation_bus
+
+
+@pytest.fixture
+def published() -> Iterator[list[frozenset[str]]]:
+    """Record the tags published on the bus."""
+    tags: list[frozenset[str]] = []
+    invalidation_bus.subscribe(tags.append)
+    yield tags
+    invalidation_bus._subscribers.remove(tags.append)
+
+
+@pytest.fixture
+def session() -> Iterator[Session]:
+    """Return a session on an empty in-memory database."""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(DBAuthor(name="Borges"))
+        session.add(DBLibrary(name="Central", address="Calle 1"))
+        session.add(DBUser(username="lector", email="lector@example.com", password="x"))
+        session.commit()
+        yield session
+
+
+def test_flushed_instances_publish_their_tables(
+    session: Session, published: list[frozenset[str]]
+) -> None:
+    session.add(DBAuthor(name="Cortázar"))
+    session.commit()
+    assert published[-1] == {"authors"}
+
+
+def test_changed_collections_publish_their_association_table(
+    session: Session, published: list[frozenset[str]]
+) -> None:
+    user = session.query(DBUser).one()
+    user.libraries.append(session.query(DBLibrary).one())
+    session.commit()
+    assert "library_users" in published[-1]
+
+
+def test_statements_publish_their_tables(
+    session: Session, published: list[frozenset[str]]
+) -> None:
+    session.execute(update(DBAuthor).values(name="Jorge Luis Borges"))
+    session.execute(delete(Base.metadata.tables["libraries"]))
+    session.commit()
+    assert published[-1] == {"authors", "libraries"}
+
+
+def test_rolled_back_writes_publish_nothing(
+    session: Session, published: list[frozenset[str]]
+) -> None:
+    session.execute(delete(DBAuthor))
+    session.rollback()
+    session.commit()
+    assert published == []
+
+
+class Notify:
+    """A notification of the fake listening connection."""
+
+    def __init__(self, payload: str) -> None:
+        """Initialize the notification."""
+        self.payload = payload
+
+
+class ListenConnection:
+    """Fake listening connection that delivers notifications or drops."""
+
+    def __init__(self, notifies: list[Notify], drops: bool) -> None:
+        """Initialize the connection."""
+        self._notifies = notifies
+        self._drops = drops
+
+    def __enter__(self) -> Self:
+        """Use the connection."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Close the connection."""
+
+    def notifies(self, timeout: float) -> Iterator[Notify]:
+        """Yield the notifications, then drop the connection if it drops."""
+        yield from self._notifies
+        self._notifies = []
+        if self._drops:
+            raise ConnectionError("server closed the connection")
+
+
+def test_postgres_listener_reconnects_with_backoff(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    transport = PostgresTransport("", "cache_invalidation", 0.01, 0.02)
+    attempts: list[str] = []
+
+    def connect_listener() -> ListenConnection:
+        attempts.append("connect")
+        if len(attempts) == 1:
+            raise ConnectionError("server starting up")
+        return ListenConnection([Notify('{"tags": ["authors"]}')], drops=False)
+
+    messages: list[Message] = []
+
+    def on_message(message: Message) -> None:
+        messages.append(message)
+        if len(messages) == 2:
+            transport._stop.set()
+
+    monkeypatch.setattr(transport, "_connect_listener", connect_listener)
+    dropped = ListenConnection([Notify('{"tags": ["materials"]}')], drops=True)
+    transport._listen(dropped, on_message)
+    assert messages == [{"tags": ["materials"]}, {"tags": ["authors"]}]
+    assert attempts == ["connect", "connect"]
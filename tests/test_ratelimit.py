@@ -0,0 +1,166 @@
+"""Tests of the token buckets of the rate limiter and their store sync."""
+
+from datetime import UTC, datetime
+
+import pytest
+from jose import jwt
+
+from config.settings import settings
+from shared.utils import ratelimit
+from shared.utils.ratelimit import (
+    MemoryRateLimitStore,
+    RateLimiter,
+    RateLimitStore,
+    principal,
+)
+
+
+class Clock:
+    """Monotonic and wall-clock time under the test's control."""
+
+    def __init__(self) -> None:
+        """Start at an arbitrary time."""
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+class FailingStore(RateLimitStore):
+    """Store whose every flush fails."""
+
+    def consume(
+        self, costs: dict[str, float], now: float, capacity: float, rate: float
+    ) -> dict[str, float]:
+        """Fail."""
+        raise ConnectionError("store unavailable")
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    """Freeze the limiter's clocks."""
+    clock = Clock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock)
+    monkeypatch.setattr(ratelimit.time, "time", clock)
+    return clock
+
+
+def limiter(store: RateLimitStore | None = None, max_keys: int = 100) -> RateLimiter:
+    """Return a limiter of 60 tokens a minute (one a second) and a burst of 10."""
+    return RateLimiter(store or MemoryRateLimitStore(), 60, 10, 1.0, max_keys)
+
+
+def test_admits_the_burst_then_asks_to_wait(clock: Clock) -> None:
+    limit = limiter()
+    assert all(limit.acquire("ip:a", 1) == 0 for _ in range(10))
+    assert limit.acquire("ip:a", 1) == pytest.approx(1.0)
+    assert limit.acquire("ip:a", 4) == pytest.approx(4.0)
+    assert (limit.admitted, limit.rejected) == (10, 2)
+
+
+def test_buckets_refill_at_the_rate_up_to_the_burst(clock: Clock) -> None:
+    limit = limiter()
+    assert limit.acquire("ip:a", 10) == 0
+    clock.now += 3
+    assert limit.acquire("ip:a", 3) == 0
+    assert limit.acquire("ip:a", 1) > 0
+    clock.now += 3600
+    assert limit.acquire("ip:a", 10) == 0
+    assert limit.acquire("ip:a", 1) > 0
+
+
+def test_buckets_are_per_key(clock: Clock) -> None:
+    limit = limiter()
+    assert limit.acquire("user:a", 10) == 0
+    assert limit.acquire("user:a", 1) > 0
+    assert limit.acquire("user:b", 10) == 0
+
+
+def test_flush_spends_pending_tokens_in_the_store(clock: Clock) -> None:
+    store = MemoryRateLimitStore()
+    limit = limiter(store)
+    limit.acquire("ip:a", 4)
+    limit.flush()
+    assert store.consume({"ip:a": 0}, clock.now, 10, 1) == {"ip:a": 6}
+    assert limit._buckets["ip:a"].pending == 0
+    assert limit.flushes == 1
+
+
+def test_flush_resyncs_with_spends_of_other_workers(clock: Clock) -> None:
+    store = MemoryRateLimitStore()
+    first, second = limiter(store), limiter(store)
+    first.acquire("user:a", 4)
+    second.acquire("user:a", 5)
+    first.flush()
+    second.flush()
+    assert second._buckets["user:a"].tokens == pytest.approx(1)
+    # Unaware of the other spends until its next flush: at most one interval
+    # of overshoot
+    assert first.acquire("user:a", 1) == 0
+    first.flush()
+    assert first._buckets["user:a"].tokens == pytest.approx(0)
+    assert first.acquire("user:a", 1) > 0
+
+
+def test_spends_admitted_during_a_flush_are_kept(
+    clock: Clock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    store = MemoryRateLimitStore()
+    limit = limiter(store)
+    consume = store.consume
+
+    def consume_while_admitting(*args: object) -> dict[str, float]:
+        limit.acquire("ip:a", 2)
+        return consume(*args)  # type: ignore[arg-type]
+
+    monkeypatch.setattr(store, "consume", consume_while_admitting)
+    limit.acquire("ip:a", 3)
+    limit.flush()
+    bucket = limit._buckets["ip:a"]
+    assert bucket.pending == 2
+    assert bucket.tokens == pytest.approx(5)
+
+
+def test_failed_flush_keeps_the_spends_pending(clock: Clock) -> None:
+    limit = limiter(FailingStore())
+    limit.acquire("ip:a", 3)
+    limit.flush()
+    assert limit._buckets["ip:a"].pending == 3
+    assert (limit.flushes, limit.flush_errors) == (0, 1)
+
+
+def test_least_recently_used_buckets_are_dropped(clock: Clock) -> None:
+    limit = limiter(max_keys=2)
+    limit.acquire("ip:a", 1)
+    limit.acquire("ip:b", 1)
+    limit.acquire("ip:a", 1)
+    limit.acquire("ip:c", 1)
+    assert list(limit._buckets) == ["ip:a", "ip:c"]
+
+
+def bearer_scope(token: str) -> dict[str, object]:
+    """Return the scope of a request from 10.0.0.1 with a bearer token."""
+    return {
+        "type": "http",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+        "client": ("10.0.0.1", 50000),
+    }
+
+
+def test_tokens_key_by_user_until_they_expire(clock: Clock) -> None:
+    expire = datetime.fromtimestamp(clock.now + 60, UTC).isoformat()
+    token = jwt.encode(
+        {"subject": "lector", "scopes": [], "expire": expire},
+        key=settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+    assert principal(bearer_scope(token)) == "user:lector"
+    clock.now += 61
+    assert principal(bearer_scope(token)) == "ip:10.0.0.1"
+
+
+def test_invalid_tokens_key_by_ip(clock: Clock) -> None:
+    unsigned = jwt.encode({"subject": "lector"}, key="other", algorithm="HS256")
+    assert principal(bearer_scope(unsigned)) == "ip:10.0.0.1"
+    assert principal(bearer_scope("not-a-token")) == "ip:10.0.0.1"
@@ -0,0 +1,173 @@
+"""Tests of the adaptive concurrency limits and the load shedding middleware."""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from config.settings import settings
+from shared.utils import shedding
+from shared.utils.middleware import register_middleware
+from shared.utils.shedding import AdaptiveLimit
+
+
+class Clock:
+    """Monotonic time under the test's control."""
+
+    def __init__(self) -> None:
+        """Start at an arbitrary time."""
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    """Freeze the limits' clock."""
+    clock = Clock()
+    monkeypatch.setattr(shedding.time, "monotonic", clock)
+    return clock
+
+
+def adaptive_limit(initial: float = 1) -> AdaptiveLimit:
+    """Return a limit with a 100 ms latency target, between 1 and 10."""
+    return AdaptiveLimit("reads", 0.1, initial, 1, 10)
+
+
+def test_admits_up_to_the_limit_then_sheds() -> None:
+    async def scenario() -> list[bool]:
+        limit = adaptive_limit(2)
+        return [await limit.acquire(False, 0.01, 10) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [True, True, False]
+
+
+def test_full_queue_sheds_without_waiting() -> None:
+    async def scenario() -> tuple[bool, int]:
+        limit = adaptive_limit()
+        await limit.acquire(False, 1, 0)
+        return await limit.acquire(False, 1, 0), limit.shed
+
+    assert asyncio.run(scenario()) == (False, 1)
+
+
+def test_release_hands_the_slot_to_priority_waiters_first() -> None:
+    async def scenario() -> list[str]:
+        limit = adaptive_limit()
+        await limit.acquire(False, 1, 10)
+        admitted: list[str] = []
+
+        async def request(name: str, priority: bool) -> None:
+            if await limit.acquire(priority, 1, 10):
+                admitted.append(name)
+                await asyncio.sleep(0)
+                limit.release()
+
+        tasks = [
+            asyncio.create_task(request("anonymous", False)),
+            asyncio.create_task(request("user", True)),
+        ]
+        await asyncio.sleep(0)
+        limit.release()
+        await asyncio.gather(*tasks)
+        assert limit.in_flight == 0
+        return admitted
+
+    assert asyncio.run(scenario()) == ["user", "anonymous"]
+
+
+def test_timeout_after_handoff_passes_the_slot_on(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async def scenario() -> tuple[bool, int, int]:
+        limit = adaptive_limit()
+        await limit.acquire(False, 1, 10)
+
+        async def handed_off_then_timed_out(
+            waiter: asyncio.Future[None], timeout: float
+        ) -> None:
+            # The holder releases, handing its slot over, as the wait expires
+            limit.release()
+            assert waiter.done()
+            raise TimeoutError
+
+        monkeypatch.setattr(shedding.asyncio, "wait_for", handed_off_then_timed_out)
+        admitted = await limit.acquire(False, 1, 10)
+        return admitted, limit.in_flight, limit.shed
+
+    assert asyncio.run(scenario()) == (False, 0, 1)
+
+
+def test_cancel_after_handoff_never_leaks_the_slot() -> None:
+    async def scenario() -> tuple[bool, int]:
+        limit = adaptive_limit()
+        await limit.acquire(False, 1, 10)
+        waiting = asyncio.create_task(limit.acquire(False, 1, 10))
+        await asyncio.sleep(0)
+        limit.release()
+        waiting.cancel()
+        try:
+            admitted = await waiting
+        except asyncio.CancelledError:
+            admitted = False
+        return admitted, limit.in_flight
+
+    # Python < 3.12 admits a waiter cancelled once its slot was handed over
+    admitted, in_flight = asyncio.run(scenario())
+    assert in_flight == int(admitted)
+
+
+def test_fast_requests_grow_the_limit_while_it_is_used(clock: Clock) -> None:
+    limit = adaptive_limit(4)
+    limit.record(0.01, failed=False)
+    assert limit.limit == 4
+    limit.in_flight = 2
+    limit.record(0.01, failed=False)
+    assert limit.limit == pytest.approx(4.25)
+    limit.limit = 10
+    limit.record(0.01, failed=False)
+    assert limit.limit == 10
+
+
+def test_slow_or_failed_requests_back_off_once_per_target(clock: Clock) -> None:
+    limit = adaptive_limit(10)
+    limit.record(0.5, failed=False)
+    assert limit.limit == pytest.approx(9)
+    # Requests already in flight when the overload started
+    limit.record(0.5, failed=False)
+    limit.record(0.01, failed=True)
+    assert limit.limit == pytest.approx(9)
+    clock.now += 0.2
+    limit.record(0.01, failed=True)
+    assert limit.limit == pytest.approx(8.1)
+
+
+def test_backoff_stops_at_the_minimum(clock: Clock) -> None:
+    limit = adaptive_limit(1.05)
+    for _ in range(3):
+        clock.now += 1
+        limit.record(1, failed=True)
+    assert limit.limit == 1
+
+
+def test_shed_requests_get_cors_headers(monkeypatch: pytest.MonkeyPatch) -> None:
+    app = FastAPI()
+    register_middleware(app)
+
+    @app.get("/items")
+    async def items() -> list[int]:
+        return []
+
+    monkeypatch.setattr(settings, "SHEDDING_MAX_QUEUE", 0)
+    monkeypatch.setattr(shedding.load_shedder.limits["reads"], "limit", 1)
+    monkeypatch.setattr(shedding.load_shedder.limits["reads"], "in_flight", 1)
+    response = TestClient(app).get(
+        "/items", headers={"Origin": "http://localhost:5173"}
+    )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(settings.SHEDDING_RETRY_AFTER_SECONDS)
+    assert response.headers["Access-Control-Allow-Origin"] == "http://localhost:5173"
+    assert "Retry-After" in response.headers["Access-Control-Expose-Headers"]